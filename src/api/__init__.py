@@ -0,0 +1 @@
+# API HTTP/JSON
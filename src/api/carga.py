@@ -0,0 +1,225 @@
+"""
+Generador de carga local para la API HTTP de la biblioteca
+Uso: python -m api.carga [--url http://127.0.0.1:8080] [--clientes 16]
+                         [--duracion 10] [--escenario mixto] [--json]
+
+Cada cliente es un hilo con su propia conexión persistente (keep-alive).
+Al terminar informa, por operación, la latencia p50/p95/p99 y los pedidos
+por segundo. Los préstamos que queden abiertos se devuelven al final.
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from benchmark.medicion import percentil
+
+ESCENARIOS = {
+    'busqueda': {'busqueda': 1.0},
+    'prestamos': {'prestamo': 0.5, 'devolucion': 0.5},
+    'mixto': {'busqueda': 0.7, 'prestamo': 0.15, 'devolucion': 0.15},
+}
+
+
+class ClienteAPI:
+    """Conexión HTTP persistente que mide cada pedido"""
+
+    def __init__(self, host: str, puerto: int):
+        self.host = host
+        self.puerto = puerto
+        self.conexion = None
+
+    def pedir(self, metodo: str, ruta: str, datos: Optional[dict] = None) -> Tuple[int, object, float]:
+        """Hacer un pedido y devolver (estado, respuesta JSON, segundos)"""
+        cuerpo = json.dumps(datos).encode("utf-8") if datos is not None else None
+        encabezados = {'Content-Type': 'application/json'} if cuerpo else {}
+        if self.conexion is None:
+            self.conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=30)
+        inicio = time.perf_counter()
+        try:
+            self.conexion.request(metodo, ruta, body=cuerpo, headers=encabezados)
+            respuesta = self.conexion.getresponse()
+            contenido = respuesta.read()
+        except (OSError, http.client.HTTPException):
+            self.cerrar()
+            raise
+        segundos = time.perf_counter() - inicio
+        if respuesta.will_close:
+            self.cerrar()
+        return respuesta.status, json.loads(contenido) if contenido else None, segundos
+
+    def cerrar(self):
+        if self.conexion is not None:
+            self.conexion.close()
+            self.conexion = None
+
+
+class Medicion:
+    """Latencias y resultados de un tipo de operación"""
+
+    def __init__(self):
+        self.latencias: List[float] = []
+        self.rechazados = 0  # Respuestas 4xx (p. ej. sin ejemplares disponibles)
+        self.errores = 0  # Respuestas 5xx y fallas de conexión
+
+    def registrar(self, estado: Optional[int], segundos: float = 0.0):
+        if estado is None or estado >= 500:
+            self.errores += 1
+            return
+        self.latencias.append(segundos)
+        if estado >= 400:
+            self.rechazados += 1
+
+    def unir(self, otra: 'Medicion'):
+        self.latencias.extend(otra.latencias)
+        self.rechazados += otra.rechazados
+        self.errores += otra.errores
+
+
+class GeneradorCarga:
+    """Clientes concurrentes que repiten una mezcla de operaciones durante un tiempo"""
+
+    def __init__(self, url: str, clientes: int, duracion: float, escenario: str):
+        partes = urlsplit(url)
+        self.host = partes.hostname or "127.0.0.1"
+        self.puerto = partes.port or 80
+        self.clientes = clientes
+        self.duracion = duracion
+        self.mezcla = ESCENARIOS[escenario]
+        self.escenario = escenario
+        self.isbns: List[str] = []
+        self.socios: List[int] = []
+        self.terminos: List[str] = []
+
+    def preparar(self):
+        """Tomar libros, socios y términos de búsqueda de la propia API"""
+        cliente = ClienteAPI(self.host, self.puerto)
+        try:
+            _, libros, _ = cliente.pedir("GET", "/libros?disponibles=1&limite=200")
+            _, socios, _ = cliente.pedir("GET", "/socios?activos=1&limite=200")
+        finally:
+            cliente.cerrar()
+        self.isbns = [libro['isbn'] for libro in libros['elementos']]
+        self.socios = [socio['id_socio'] for socio in socios['elementos']
+                       if socio['saldo_multas'] == 0]
+        palabras = {palabra.lower() for libro in libros['elementos']
+                    for palabra in libro['titulo'].split() if len(palabra) > 3}
+        self.terminos = sorted(palabras) or ["libro"]
+        if 'prestamo' in self.mezcla and (not self.isbns or not self.socios):
+            raise RuntimeError("Se necesitan libros disponibles y socios activos sin multas")
+
+    def _cliente(self, numero: int, fin: float, mediciones: Dict[str, Medicion]):
+        """Bucle de un cliente; cada uno usa socios propios para no competir por su cupo"""
+        azar = random.Random(numero)
+        socios = self.socios[numero::self.clientes] or self.socios
+        operaciones, pesos = zip(*self.mezcla.items())
+        pendientes: List[int] = []
+        cliente = ClienteAPI(self.host, self.puerto)
+
+        while time.perf_counter() < fin:
+            operacion = azar.choices(operaciones, pesos)[0]
+            if operacion == 'devolucion' and not pendientes:
+                operacion = 'prestamo'
+            try:
+                if operacion == 'busqueda':
+                    termino = quote(azar.choice(self.terminos))
+                    estado, _, segundos = cliente.pedir("GET", f"/libros/buscar?q={termino}")
+                elif operacion == 'prestamo':
+                    datos = {'id_socio': azar.choice(socios), 'isbn': azar.choice(self.isbns)}
+                    estado, respuesta, segundos = cliente.pedir("POST", "/prestamos", datos)
+                    if estado == 201:
+                        pendientes.append(respuesta['id_prestamo'])
+                else:
+                    id_prestamo = pendientes.pop(azar.randrange(len(pendientes)))
+                    estado, _, segundos = cliente.pedir(
+                        "POST", f"/prestamos/{id_prestamo}/devolucion")
+                mediciones[operacion].registrar(estado, segundos)
+            except (OSError, http.client.HTTPException, ValueError):
+                mediciones[operacion].registrar(None)
+
+        if pendientes:
+            try:
+                cliente.pedir("POST", "/devoluciones", {'ids': pendientes})
+            except (OSError, http.client.HTTPException):
+                pass
+        cliente.cerrar()
+
+    def ejecutar(self) -> dict:
+        """Correr la prueba y devolver el informe"""
+        self.preparar()
+        por_cliente = [defaultdict(Medicion) for _ in range(self.clientes)]
+        inicio = time.perf_counter()
+        fin = inicio + self.duracion
+        hilos = [threading.Thread(target=self._cliente, args=(numero, fin, por_cliente[numero]))
+                 for numero in range(self.clientes)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        transcurrido = time.perf_counter() - inicio
+
+        mediciones = defaultdict(Medicion)
+        for medicion_cliente in por_cliente:
+            for operacion, medicion in medicion_cliente.items():
+                mediciones[operacion].unir(medicion)
+                mediciones['total'].unir(medicion)
+
+        informe = {'escenario': self.escenario, 'clientes': self.clientes,
+                   'segundos': round(transcurrido, 3), 'operaciones': {}}
+        for operacion in [*self.mezcla, 'total']:
+            medicion = mediciones[operacion]
+            latencias = sorted(medicion.latencias)
+            informe['operaciones'][operacion] = {
+                'pedidos': len(latencias),
+                'rechazados': medicion.rechazados,
+                'errores': medicion.errores,
+                'pedidos_por_segundo': round(len(latencias) / transcurrido, 1),
+                'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+                'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+                'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+            }
+        return informe
+
+
+def mostrar_informe(informe: dict):
+    """Imprimir el informe como tabla"""
+    print(f"Escenario: {informe['escenario']} - {informe['clientes']} clientes, "
+          f"{informe['segundos']:.1f} s")
+    print(f"{'Operación':<12}{'Pedidos':>9}{'Rech.':>7}{'Err.':>6}{'Ped/s':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for operacion, datos in informe['operaciones'].items():
+        print(f"{operacion:<12}{datos['pedidos']:>9}{datos['rechazados']:>7}{datos['errores']:>6}"
+              f"{datos['pedidos_por_segundo']:>9.1f}{datos['p50_ms']:>9.2f}"
+              f"{datos['p95_ms']:>9.2f}{datos['p99_ms']:>9.2f}")
+
+
+def main():
+    """Punto de entrada del generador de carga"""
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de la biblioteca")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--clientes", type=int, default=16, help="Conexiones concurrentes")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de prueba")
+    parser.add_argument("--escenario", choices=sorted(ESCENARIOS), default="mixto")
+    parser.add_argument("--json", action="store_true", help="Informe en formato JSON")
+    args = parser.parse_args()
+
+    try:
+        informe = GeneradorCarga(args.url, args.clientes, args.duracion, args.escenario).ejecutar()
+    except (OSError, RuntimeError) as e:
+        print(f"✗ No se pudo ejecutar la prueba: {e}")
+        return 1
+    if args.json:
+        print(json.dumps(informe, indent=2, ensure_ascii=False))
+    else:
+        mostrar_informe(informe)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
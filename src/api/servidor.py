@@ -0,0 +1,439 @@
+"""
+Servidor HTTP/JSON de la biblioteca sobre asyncio
+Uso: python -m api.servidor [--host 127.0.0.1] [--puerto 8080] [--silencioso]
+                            [--agrupar] [--lote 64] [--espera-ms 5]
+
+Atiende muchas conexiones persistentes (keep-alive) en un único event loop;
+el trabajo con la BD lo hacen los controladores asíncronos en los hilos del
+EjecutorBD.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+from datetime import date
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from controller.libro_controller import LibroControllerAsync
+from controller.prestamo_controller import PrestamoControllerAsync
+from controller.socio_controller import SocioControllerAsync
+from dal.ejecutor import EjecutorBD
+from dal.escritor_agrupado import EscritorAgrupado
+from model.libro import Libro
+from model.prestamo import Prestamo
+from model.socio import Socio
+
+
+class ErrorHTTP(Exception):
+    """Error a devolver al cliente con un código HTTP"""
+
+    def __init__(self, estado: HTTPStatus, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.mensaje = mensaje
+
+
+def _serializar(valor: Any) -> Any:
+    """Convertir modelos y fechas a tipos de JSON"""
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Libro):
+        return {
+            'isbn': valor.isbn,
+            'titulo': valor.titulo,
+            'autor': valor.autor,
+            'categoria': valor.categoria,
+            'total_ejemplares': valor.total_ejemplares,
+            'ejemplares_disponibles': valor.ejemplares_disponibles
+        }
+    if isinstance(valor, Socio):
+        return {
+            'id_socio': valor.id_socio,
+            'nombre': valor.nombre,
+            'email': valor.email,
+            'telefono': valor.telefono,
+            'fecha_registro': valor.fecha_registro,
+            'activo': valor.activo,
+            'libros_prestados': valor.libros_prestados,
+            'saldo_multas': valor.saldo_multas
+        }
+    if isinstance(valor, Prestamo):
+        return {
+            'id_prestamo': valor.id_prestamo,
+            'id_socio': valor.socio.id_socio,
+            'isbn': valor.libro.isbn,
+            'socio_nombre': valor.socio.nombre,
+            'libro_titulo': valor.libro.titulo,
+            'fecha_prestamo': valor.fecha_prestamo,
+            'fecha_devolucion_esperada': valor.fecha_devolucion_esperada,
+            'fecha_devolucion_real': valor.fecha_devolucion_real,
+            'estado': valor.estado
+        }
+    raise TypeError(f"No se puede convertir a JSON: {type(valor).__name__}")
+
+
+def a_json(datos: Any) -> bytes:
+    """Cuerpo JSON de una respuesta"""
+    return json.dumps(datos, default=_serializar, ensure_ascii=False).encode("utf-8")
+
+
+MAX_ID = 2 ** 63 - 1  # Mayor entero que acepta SQLite
+
+
+def _entero(valor: Any, nombre: str) -> int:
+    # bool es subclase de int: true/false no son números válidos
+    if isinstance(valor, bool):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"'{nombre}' debe ser un número entero")
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"'{nombre}' debe ser un número entero")
+
+
+def _id(valor: Any, nombre: str) -> int:
+    """Identificador entero positivo que entra en un INTEGER de SQLite"""
+    identificador = _entero(valor, nombre)
+    if not 0 < identificador <= MAX_ID:
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"'{nombre}' fuera de rango")
+    return identificador
+
+
+def _requerido(cuerpo: dict, nombre: str) -> Any:
+    if cuerpo.get(nombre) in (None, ""):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"Falta el campo '{nombre}'")
+    return cuerpo[nombre]
+
+
+def _cursor(consulta: Dict[str, str]) -> Optional[tuple]:
+    """El cursor de paginación viaja como JSON (el 'siguiente' de la página anterior)"""
+    if not consulta.get('cursor'):
+        return None
+    try:
+        cursor = json.loads(consulta['cursor'])
+    except ValueError:
+        cursor = None
+    if not isinstance(cursor, list) or len(cursor) != 2:
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "'cursor' inválido")
+    return tuple(cursor)
+
+
+def _limite(consulta: Dict[str, str], defecto: int = 20, maximo: int = 200) -> int:
+    limite = _entero(consulta.get('limite', defecto), 'limite')
+    return max(1, min(limite, maximo))
+
+
+def _verdadero(consulta: Dict[str, str], nombre: str) -> bool:
+    return consulta.get(nombre, '').lower() in ('1', 'true', 'si', 'sí')
+
+
+def _pagina(resultado: tuple) -> dict:
+    elementos, siguiente = resultado
+    return {'elementos': elementos, 'siguiente': siguiente}
+
+
+Manejador = Callable[..., Awaitable[Tuple[HTTPStatus, Any]]]
+
+
+class ServidorAPI:
+    """Rutas de la API y atención de conexiones HTTP/1.1"""
+
+    TIMEOUT_INACTIVIDAD = 30.0  # Segundos que se mantiene abierta una conexión sin pedidos
+    TAMANO_MAXIMO_CUERPO = 1024 * 1024
+
+    def __init__(self):
+        self.libros = LibroControllerAsync()
+        self.socios = SocioControllerAsync()
+        self.prestamos = PrestamoControllerAsync()
+        self.rutas: List[Tuple[str, Pattern, Manejador]] = []
+        self._registrar_rutas()
+
+    def _ruta(self, metodo: str, patron: str, manejador: Manejador):
+        self.rutas.append((metodo, re.compile(f"^{patron}$"), manejador))
+
+    def _registrar_rutas(self):
+        self._ruta("GET", r"/libros", self.listar_libros)
+        self._ruta("POST", r"/libros", self.crear_libro)
+        self._ruta("GET", r"/libros/buscar", self.buscar_libros)
+        self._ruta("GET", r"/libros/(?P<isbn>[^/]+)", self.buscar_libro)
+        self._ruta("DELETE", r"/libros/(?P<isbn>[^/]+)", self.eliminar_libro)
+        self._ruta("GET", r"/libros/(?P<isbn>[^/]+)/disponibilidad", self.disponibilidad)
+        self._ruta("GET", r"/socios", self.listar_socios)
+        self._ruta("POST", r"/socios", self.registrar_socio)
+        self._ruta("GET", r"/socios/buscar", self.buscar_socios)
+        self._ruta("GET", r"/socios/(?P<id_socio>\d+)", self.buscar_socio)
+        self._ruta("POST", r"/socios/(?P<id_socio>\d+)/pagos", self.pagar_multa)
+        self._ruta("POST", r"/socios/(?P<id_socio>\d+)/activar", self.activar_socio)
+        self._ruta("POST", r"/socios/(?P<id_socio>\d+)/desactivar", self.desactivar_socio)
+        self._ruta("GET", r"/prestamos", self.listar_prestamos)
+        self._ruta("POST", r"/prestamos", self.realizar_prestamo)
+        self._ruta("POST", r"/prestamos/(?P<id_prestamo>\d+)/devolucion", self.registrar_devolucion)
+        self._ruta("POST", r"/devoluciones", self.registrar_devoluciones)
+        self._ruta("GET", r"/estado", self.estado)
+
+    # --- Libros ---
+
+    async def listar_libros(self, consulta, cuerpo):
+        pagina = await self.libros.listar_pagina(_cursor(consulta), _limite(consulta),
+                                                 _verdadero(consulta, 'disponibles'))
+        return HTTPStatus.OK, _pagina(pagina)
+
+    async def crear_libro(self, consulta, cuerpo):
+        creado = await self.libros.crear_libro(
+            str(_requerido(cuerpo, 'isbn')), str(_requerido(cuerpo, 'titulo')),
+            str(_requerido(cuerpo, 'autor')), str(cuerpo.get('categoria', '')),
+            _entero(cuerpo.get('total_ejemplares', 1), 'total_ejemplares')
+        )
+        if not creado:
+            raise ErrorHTTP(HTTPStatus.CONFLICT, "No se pudo crear el libro")
+        return HTTPStatus.CREATED, {'isbn': cuerpo['isbn']}
+
+    async def buscar_libros(self, consulta, cuerpo):
+        texto = consulta.get('q', '')
+        return HTTPStatus.OK, await self.libros.buscar_libros(texto, _limite(consulta))
+
+    async def buscar_libro(self, consulta, cuerpo, isbn):
+        libro = await self.libros.buscar_libro(isbn)
+        if not libro:
+            raise ErrorHTTP(HTTPStatus.NOT_FOUND, f"No existe libro con ISBN {isbn}")
+        return HTTPStatus.OK, libro
+
+    async def eliminar_libro(self, consulta, cuerpo, isbn):
+        if not await self.libros.eliminar_libro(isbn):
+            raise ErrorHTTP(HTTPStatus.CONFLICT, "No se pudo eliminar el libro")
+        return HTTPStatus.OK, {'isbn': isbn}
+
+    async def disponibilidad(self, consulta, cuerpo, isbn):
+        disponible = await self.prestamos.verificar_disponibilidad(isbn)
+        return HTTPStatus.OK, {'isbn': isbn, 'disponible': disponible}
+
+    # --- Socios ---
+
+    async def listar_socios(self, consulta, cuerpo):
+        pagina = await self.socios.listar_pagina(_cursor(consulta), _limite(consulta),
+                                                 _verdadero(consulta, 'activos'))
+        return HTTPStatus.OK, _pagina(pagina)
+
+    async def registrar_socio(self, consulta, cuerpo):
+        id_socio = await self.socios.registrar_socio(
+            str(_requerido(cuerpo, 'nombre')), str(_requerido(cuerpo, 'email')),
+            str(cuerpo.get('telefono', ''))
+        )
+        if not id_socio:
+            raise ErrorHTTP(HTTPStatus.CONFLICT, "No se pudo registrar el socio")
+        return HTTPStatus.CREATED, {'id_socio': id_socio}
+
+    async def buscar_socios(self, consulta, cuerpo):
+        resultados = await self.socios.buscar_socios(consulta.get('q', ''),
+                                                     _limite(consulta, defecto=10))
+        return HTTPStatus.OK, [dict(_serializar(socio), similitud=round(similitud, 3))
+                               for socio, similitud in resultados]
+
+    async def buscar_socio(self, consulta, cuerpo, id_socio):
+        id_socio = _id(id_socio, 'id_socio')
+        socio = await self.socios.buscar_socio(id_socio)
+        if not socio:
+            raise ErrorHTTP(HTTPStatus.NOT_FOUND, f"No existe socio con ID {id_socio}")
+        return HTTPStatus.OK, socio
+
+    async def pagar_multa(self, consulta, cuerpo, id_socio):
+        id_socio = _id(id_socio, 'id_socio')
+        try:
+            monto = float(_requerido(cuerpo, 'monto'))
+        except (TypeError, ValueError):
+            raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "'monto' debe ser un número")
+        if not await self.socios.pagar_multa(id_socio, monto):
+            raise ErrorHTTP(HTTPStatus.CONFLICT, "No se pudo registrar el pago")
+        return HTTPStatus.OK, {'id_socio': id_socio, 'monto': monto}
+
+    async def activar_socio(self, consulta, cuerpo, id_socio):
+        id_socio = _id(id_socio, 'id_socio')
+        if not await self.socios.activar_socio(id_socio):
+            raise ErrorHTTP(HTTPStatus.CONFLICT, "No se pudo activar el socio")
+        return HTTPStatus.OK, {'id_socio': id_socio, 'activo': True}
+
+    async def desactivar_socio(self, consulta, cuerpo, id_socio):
+        id_socio = _id(id_socio, 'id_socio')
+        if not await self.socios.desactivar_socio(id_socio):
+            raise ErrorHTTP(HTTPStatus.CONFLICT, "No se pudo desactivar el socio")
+        return HTTPStatus.OK, {'id_socio': id_socio, 'activo': False}
+
+    # --- Préstamos ---
+
+    async def listar_prestamos(self, consulta, cuerpo):
+        pagina = await self.prestamos.listar_prestamos_activos_pagina(_cursor(consulta),
+                                                                      _limite(consulta))
+        return HTTPStatus.OK, _pagina(pagina)
+
+    async def realizar_prestamo(self, consulta, cuerpo):
+        """Un libro ('isbn') o varios a la vez ('isbns', todos o ninguno)"""
+        id_socio = _id(_requerido(cuerpo, 'id_socio'), 'id_socio')
+        if 'isbns' in cuerpo:
+            isbns = cuerpo['isbns']
+            if (not isinstance(isbns, list) or not isbns
+                    or not all(isinstance(isbn, str) and isbn for isbn in isbns)):
+                raise ErrorHTTP(HTTPStatus.BAD_REQUEST,
+                                "'isbns' debe ser una lista no vacía de ISBN (texto)")
+            prestamos = await self.prestamos.realizar_prestamos(id_socio, isbns)
+            if not prestamos:
+                raise ErrorHTTP(HTTPStatus.CONFLICT, "No se pudieron realizar los préstamos")
+            return HTTPStatus.CREATED, prestamos
+        prestamo = await self.prestamos.realizar_prestamo(id_socio, str(_requerido(cuerpo, 'isbn')))
+        if not prestamo:
+            raise ErrorHTTP(HTTPStatus.CONFLICT, "No se pudo realizar el préstamo")
+        return HTTPStatus.CREATED, prestamo
+
+    async def registrar_devolucion(self, consulta, cuerpo, id_prestamo):
+        id_prestamo = _id(id_prestamo, 'id_prestamo')
+        if not await self.prestamos.registrar_devolucion(id_prestamo):
+            raise ErrorHTTP(HTTPStatus.CONFLICT, "No se pudo registrar la devolución")
+        return HTTPStatus.OK, {'id_prestamo': id_prestamo, 'devuelto': True}
+
+    async def registrar_devoluciones(self, consulta, cuerpo):
+        ids = _requerido(cuerpo, 'ids')
+        if not isinstance(ids, list):
+            raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "'ids' debe ser una lista")
+        ids = [_id(id_prestamo, 'ids') for id_prestamo in ids]
+        return HTTPStatus.OK, await self.prestamos.registrar_devoluciones(ids)
+
+    async def estado(self, consulta, cuerpo):
+        return HTTPStatus.OK, EjecutorBD.get_instance().estadisticas()
+
+    # --- HTTP ---
+
+    async def despachar(self, metodo: str, destino: str, cuerpo: bytes) -> Tuple[HTTPStatus, Any]:
+        """Resolver la ruta de un pedido y ejecutar su manejador"""
+        url = urlsplit(destino)
+        ruta = url.path.rstrip("/") or "/"
+        consulta = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+        metodo_valido = False
+        for metodo_ruta, patron, manejador in self.rutas:
+            coincidencia = patron.match(ruta)
+            if not coincidencia:
+                continue
+            if metodo_ruta != metodo:
+                metodo_valido = True
+                continue
+            datos = {}
+            if cuerpo:
+                try:
+                    datos = json.loads(cuerpo)
+                except ValueError:
+                    raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "El cuerpo no es JSON válido")
+                if not isinstance(datos, dict):
+                    raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "El cuerpo debe ser un objeto JSON")
+            parametros = {clave: unquote(valor) for clave, valor in coincidencia.groupdict().items()}
+            return await manejador(consulta, datos, **parametros)
+        if metodo_valido:
+            raise ErrorHTTP(HTTPStatus.METHOD_NOT_ALLOWED, f"Método {metodo} no permitido")
+        raise ErrorHTTP(HTTPStatus.NOT_FOUND, f"No existe la ruta {ruta}")
+
+    async def _leer_pedido(self, reader: asyncio.StreamReader) -> Optional[tuple]:
+        """Leer un pedido HTTP/1.1: (método, destino, versión, encabezados, cuerpo)"""
+        linea = await asyncio.wait_for(reader.readline(), self.TIMEOUT_INACTIVIDAD)
+        if not linea:
+            return None
+        partes = linea.decode("latin-1").split()
+        if len(partes) != 3:
+            raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "Línea de pedido inválida")
+        metodo, destino, version = partes
+
+        encabezados = {}
+        while True:
+            linea = await reader.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            encabezados[nombre.strip().lower()] = valor.strip()
+
+        if 'transfer-encoding' in encabezados:
+            raise ErrorHTTP(HTTPStatus.LENGTH_REQUIRED, "Se requiere Content-Length")
+        largo = _entero(encabezados.get('content-length', 0), 'Content-Length')
+        if largo > self.TAMANO_MAXIMO_CUERPO:
+            raise ErrorHTTP(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Cuerpo demasiado grande")
+        cuerpo = await reader.readexactly(largo) if largo else b""
+        return metodo.upper(), destino, version, encabezados, cuerpo
+
+    @staticmethod
+    def _respuesta(estado: HTTPStatus, datos: Any, mantener: bool) -> bytes:
+        cuerpo = a_json(datos)
+        encabezado = (
+            f"HTTP/1.1 {estado.value} {estado.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(cuerpo)}\r\n"
+            f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n"
+        )
+        return encabezado.encode("latin-1") + cuerpo
+
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atender los pedidos de una conexión hasta que se cierre"""
+        try:
+            while True:
+                mantener = False
+                try:
+                    pedido = await self._leer_pedido(reader)
+                    if pedido is None:
+                        break
+                    metodo, destino, version, encabezados, cuerpo = pedido
+                    conexion = encabezados.get('connection', '').lower()
+                    mantener = (conexion != 'close' if version == "HTTP/1.1"
+                                else conexion == 'keep-alive')
+                    estado, datos = await self.despachar(metodo, destino, cuerpo)
+                except ErrorHTTP as error:
+                    estado, datos = error.estado, {'error': error.mensaje}
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    print(f"Error al atender el pedido: {e}")
+                    estado, datos = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Error interno"}
+                writer.write(self._respuesta(estado, datos, mantener))
+                await writer.drain()
+                if not mantener:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def servir(host: str = "127.0.0.1", puerto: int = 8080):
+    """Iniciar el servidor y atender hasta que se interrumpa"""
+    api = ServidorAPI()
+    servidor = await asyncio.start_server(api.atender, host, puerto, backlog=1024)
+    print(f"API de la biblioteca escuchando en http://{host}:{puerto}")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        EjecutorBD.get_instance().cerrar()
+
+
+def main():
+    """Punto de entrada del servidor"""
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON de la biblioteca")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--silencioso", action="store_true",
+                        help="No mostrar los mensajes de cada operación (pruebas de carga)")
+    parser.add_argument("--agrupar", action="store_true",
+                        help="Confirmar las escrituras en lotes (group commit)")
+    parser.add_argument("--lote", type=int, default=EscritorAgrupado.MAX_OPERACIONES,
+                        help="Máximo de operaciones por lote")
+    parser.add_argument("--espera-ms", type=float, default=EscritorAgrupado.ESPERA_MS,
+                        help="Espera máxima para completar un lote")
+    args = parser.parse_args()
+    if args.agrupar:
+        EjecutorBD.get_instance().activar_agrupado(args.lote, args.espera_ms)
+    if args.silencioso:
+        sys.stdout = open(os.devnull, "w", encoding="utf-8")
+    try:
+        asyncio.run(servir(args.host, args.puerto))
+    except KeyboardInterrupt:
+        print("\nServidor detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Generación de datos sintéticos reproducibles para los benchmarks
+"""
+import random
+from datetime import date, timedelta
+from typing import Iterator, Tuple
+
+from dal.database_manager import DatabaseManager
+from model.prestamo import Prestamo
+from repository.libro_repository import LibroRepository
+
+PALABRAS = ("historia", "noche", "ciudad", "río", "guerra", "amor", "tiempo", "mar",
+            "casa", "sombra", "jardín", "viaje", "memoria", "silencio", "fuego",
+            "invierno", "camino", "espejo", "isla", "montaña", "secreto", "luz")
+NOMBRES = ("Ana", "Juan", "María", "Pedro", "Lucía", "Carlos", "Sofía", "Diego",
+           "Valentina", "Martín", "Camila", "Jorge", "Elena", "Pablo", "Laura")
+APELLIDOS = ("Pérez", "González", "Rodríguez", "López", "Martínez", "García",
+             "Fernández", "Sánchez", "Romero", "Díaz", "Álvarez", "Torres")
+CATEGORIAS = ("Novela", "Ensayo", "Poesía", "Historia", "Ciencia", "Infantil",
+              "Fantasía", "Policial", "Biografía", "Distopía")
+TAMANO_LOTE = 10000
+
+
+def isbn(numero: int) -> str:
+    """ISBN sintético del libro número `numero`"""
+    return f"978-{numero:09d}"
+
+
+class GeneradorDatos:
+    """
+    Carga `cantidad` libros, socios y préstamos con una semilla fija.
+    Uno de cada diez préstamos queda activo (algunos vencidos) y el resto
+    devuelto; los activos corresponden a los primeros socios y libros, así
+    que los socios y libros a partir de `activos` quedan libres para los
+    préstamos del benchmark. Los contadores quedan consistentes.
+    """
+
+    def __init__(self, cantidad: int, semilla: int = 42):
+        self.cantidad = cantidad
+        self.activos = cantidad // 10
+        self.azar = random.Random(semilla)
+        self.hoy = date.today()
+        self.db_manager = DatabaseManager.get_instance()
+        self.db_manager.connect()
+
+    def _libros(self) -> Iterator[Tuple]:
+        for numero in range(self.cantidad):
+            titulo = " ".join(self.azar.sample(PALABRAS, 3)).capitalize()
+            autor = f"{self.azar.choice(NOMBRES)} {self.azar.choice(APELLIDOS)}"
+            ejemplares = self.azar.randint(1, 5)
+            yield (isbn(numero), f"{titulo} {numero}", autor,
+                   self.azar.choice(CATEGORIAS), ejemplares, ejemplares)
+
+    def _socios(self) -> Iterator[Tuple]:
+        for numero in range(self.cantidad):
+            nombre = f"{self.azar.choice(NOMBRES)} {self.azar.choice(APELLIDOS)}"
+            registro = self.hoy - timedelta(days=self.azar.randint(0, 3650))
+            yield (nombre, f"socio{numero}@biblioteca.local", f"11-{numero:08d}",
+                   registro.isoformat())
+
+    def _prestamos(self) -> Iterator[Tuple]:
+        for numero in range(self.cantidad):
+            if numero < self.activos:
+                # Un préstamo activo por socio y por libro
+                inicio = self.hoy - timedelta(days=self.azar.randint(0, 30))
+                yield (numero + 1, isbn(numero), inicio.isoformat(),
+                       (inicio + timedelta(days=Prestamo.DIAS_PRESTAMO)).isoformat(),
+                       None, 'activo')
+            else:
+                inicio = self.hoy - timedelta(days=self.azar.randint(31, 730))
+                devolucion = inicio + timedelta(days=self.azar.randint(1, Prestamo.DIAS_PRESTAMO))
+                yield (self.azar.randint(1, self.cantidad), isbn(self.azar.randrange(self.cantidad)),
+                       inicio.isoformat(),
+                       (inicio + timedelta(days=Prestamo.DIAS_PRESTAMO)).isoformat(),
+                       devolucion.isoformat(), 'devuelto')
+
+    def _insertar(self, query: str, filas: Iterator[Tuple]):
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) == TAMANO_LOTE:
+                self.db_manager.execute_many(query, lote)
+                lote = []
+        if lote:
+            self.db_manager.execute_many(query, lote)
+
+    def generar(self):
+        """Cargar los datos en la base configurada (que debe estar vacía)"""
+        with self.db_manager.transaccion():
+            self._insertar('''
+                INSERT INTO libros (isbn, titulo, autor, categoria,
+                                    total_ejemplares, ejemplares_disponibles)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', self._libros())
+            self._insertar('''
+                INSERT INTO socios (nombre, email, telefono, fecha_registro)
+                VALUES (?, ?, ?, ?)
+            ''', self._socios())
+            self._insertar('''
+                INSERT INTO prestamos (id_socio, isbn, fecha_prestamo, fecha_devolucion_esperada,
+                                       fecha_devolucion_real, estado)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', self._prestamos())
+            # Cada activo es el único de su socio y de su libro
+            self.db_manager.execute_query('''
+                UPDATE libros SET ejemplares_disponibles = ejemplares_disponibles - 1
+                WHERE isbn IN (SELECT isbn FROM prestamos WHERE estado = 'activo')
+            ''')
+            self.db_manager.execute_query('''
+                UPDATE socios SET libros_prestados = 1
+                WHERE id_socio IN (SELECT id_socio FROM prestamos WHERE estado = 'activo')
+            ''')
+        # Los libros se cargaron por SQL: el índice de texto se arma de una vez
+        LibroRepository().reconstruir_indice_texto()
@@ -0,0 +1,23 @@
+"""
+Utilidades de medición compartidas por los benchmarks
+"""
+from typing import Dict, List
+
+
+def percentil(ordenados: List[float], porcentaje: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, max(0, round(porcentaje / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def resumir_latencias(segundos: List[float]) -> Dict[str, float]:
+    """Latencias p50/p95/p99 y máxima, en milisegundos"""
+    ordenados = sorted(segundos)
+    return {
+        'p50_ms': round(percentil(ordenados, 50) * 1000, 3),
+        'p95_ms': round(percentil(ordenados, 95) * 1000, 3),
+        'p99_ms': round(percentil(ordenados, 99) * 1000, 3),
+        'max_ms': round(ordenados[-1] * 1000, 3) if ordenados else 0.0,
+    }
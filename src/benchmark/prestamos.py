@@ -0,0 +1,134 @@
+"""
+Benchmark del ritmo de préstamos y devoluciones según el perfil de SQLite
+Uso: python -m benchmark.prestamos [--perfiles seguro rendimiento]
+                                   [--prestamos 2000] [--directorio DIR] [--json]
+
+Cada perfil se mide en un proceso aparte, sobre una base nueva, eligiendo
+la base y el perfil con BIBLIOTECA_DB_PATH y BIBLIOTECA_DB_PERFIL. Cada
+préstamo y cada devolución es su propia transacción, como en el mostrador.
+Conviene usar --directorio en el disco real: en un tmpfs el fsync no cuesta
+nada y los perfiles se parecen más de lo que lo harían en producción.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from benchmark.medicion import resumir_latencias
+from dal.database_manager import DatabaseManager
+from model.libro import Libro
+from model.socio import Socio
+from repository.libro_repository import LibroRepository
+from repository.socio_repository import SocioRepository
+from service.prestamo_service import PrestamoService
+
+SRC = Path(__file__).resolve().parent.parent
+
+
+def medir(cantidad: int) -> dict:
+    """Cargar datos y medir préstamos y devoluciones (en el proceso hijo)"""
+    cantidad_libros = max(1000, cantidad)
+    LibroRepository().crear_lote([
+        Libro(f"bench-{i:07d}", f"Libro {i}", f"Autor {i % 500}", "Benchmark", 5, 5)
+        for i in range(cantidad_libros)
+    ])
+    SocioRepository().crear_lote([
+        Socio(0, f"Socio {i}", f"socio{i}@bench.local") for i in range(cantidad)
+    ])
+    db = DatabaseManager.get_instance()
+    with db.conexion() as conexion:
+        id_inicial = conexion.execute("SELECT MIN(id_socio) FROM socios").fetchone()[0]
+
+    service = PrestamoService()
+    latencias_prestamo: List[float] = []
+    latencias_devolucion: List[float] = []
+    ids = []
+    # Los servicios informan cada operación por consola: no es parte de la medición
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        for i in range(cantidad):
+            t = time.perf_counter()
+            prestamo = service.realizar_prestamo(id_inicial + i, f"bench-{i * 7 % cantidad_libros:07d}")
+            latencias_prestamo.append(time.perf_counter() - t)
+            if prestamo:
+                ids.append(prestamo.id_prestamo)
+        segundos_prestamos = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for id_prestamo in ids:
+            t = time.perf_counter()
+            service.registrar_devolucion(id_prestamo)
+            latencias_devolucion.append(time.perf_counter() - t)
+        segundos_devoluciones = time.perf_counter() - inicio
+
+    return {
+        'perfil': db.perfil,
+        'pragmas': db.pragmas(),
+        'prestamos': len(ids),
+        'prestamos_por_segundo': round(len(ids) / segundos_prestamos, 1),
+        'devoluciones_por_segundo': round(len(ids) / segundos_devoluciones, 1),
+        'latencia_prestamo': resumir_latencias(latencias_prestamo),
+        'latencia_devolucion': resumir_latencias(latencias_devolucion),
+    }
+
+
+def medir_perfil(perfil: str, cantidad: int, directorio: str) -> dict:
+    """Medir un perfil en un proceso nuevo con su propia base"""
+    entorno = dict(os.environ,
+                   BIBLIOTECA_DB_PATH=os.path.join(directorio, f"{perfil}.db"),
+                   BIBLIOTECA_DB_PERFIL=perfil)
+    proceso = subprocess.run(
+        [sys.executable, "-m", "benchmark.prestamos", "--medir", "--prestamos", str(cantidad)],
+        cwd=SRC, env=entorno, capture_output=True, text=True, check=True
+    )
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def mostrar_resultados(resultados: List[dict]):
+    """Imprimir la comparación entre perfiles"""
+    base = resultados[0]['prestamos_por_segundo']
+    print(f"{'Perfil':<14}{'Préstamos/s':>13}{'Devol./s':>11}{'p50 ms':>9}{'p99 ms':>9}{'Mejora':>9}")
+    for resultado in resultados:
+        latencia = resultado['latencia_prestamo']
+        print(f"{resultado['perfil']:<14}{resultado['prestamos_por_segundo']:>13.1f}"
+              f"{resultado['devoluciones_por_segundo']:>11.1f}{latencia['p50_ms']:>9.3f}"
+              f"{latencia['p99_ms']:>9.3f}{resultado['prestamos_por_segundo'] / base:>8.2f}x")
+
+
+def main():
+    """Punto de entrada del benchmark"""
+    parser = argparse.ArgumentParser(description="Ritmo de préstamos por perfil de SQLite")
+    parser.add_argument("--perfiles", nargs="+", choices=sorted(DatabaseManager.PERFILES),
+                        default=["seguro", "rendimiento"])
+    parser.add_argument("--prestamos", type=int, default=2000, help="Préstamos a realizar")
+    parser.add_argument("--directorio", help="Dónde crear las bases temporales")
+    parser.add_argument("--json", action="store_true", help="Resultados en formato JSON")
+    parser.add_argument("--medir", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir(args.prestamos)))
+        return 0
+
+    with tempfile.TemporaryDirectory(dir=args.directorio) as directorio:
+        try:
+            resultados = [medir_perfil(perfil, args.prestamos, directorio) for perfil in args.perfiles]
+        except subprocess.CalledProcessError as e:
+            print(f"✗ Falló la medición: {e.stderr}")
+            return 1
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+    else:
+        mostrar_resultados(resultados)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
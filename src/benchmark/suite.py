@@ -0,0 +1,262 @@
+"""
+Suite de benchmarks de las capas de repositorio, servicio y controlador
+Uso: python -m benchmark.suite [--tamanos 10000 100000 1000000] [--operaciones 1000]
+                               [--semilla 42] [--directorio DIR] [--salida resultados.json]
+                               [--comparar anterior.json]
+
+Para cada tamaño se genera una base sintética (misma cantidad de libros,
+socios y préstamos) y se mide en un proceso aparte, así cada tamaño empieza
+con cachés vacías. El resultado es un JSON con la versión del código, el
+entorno y, por operación, p50/p95/p99/máximo y operaciones por segundo;
+--comparar lo contrasta con un resultado anterior para detectar regresiones.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from benchmark.datos import PALABRAS, GeneradorDatos, isbn
+from benchmark.medicion import resumir_latencias
+from controller.libro_controller import LibroController
+from controller.reporte_controller import ReporteController
+from dal.database_manager import DatabaseManager
+from repository.libro_repository import LibroRepository
+from repository.prestamo_repository import PrestamoRepository
+from repository.socio_repository import SocioRepository
+from service.libro_service import LibroService
+from service.prestamo_service import PrestamoService
+
+SRC = Path(__file__).resolve().parent.parent
+TAMANOS = [10000, 100000, 1000000]
+UMBRAL_REGRESION = 0.10  # Caída de operaciones/s a partir de la cual se marca
+
+
+def cronometrar(funcion: Callable, argumentos: Iterable[tuple]) -> dict:
+    """Ejecutar `funcion` una vez por juego de argumentos y resumir las latencias"""
+    latencias = []
+    inicio = time.perf_counter()
+    for args in argumentos:
+        t = time.perf_counter()
+        funcion(*args)
+        latencias.append(time.perf_counter() - t)
+    total = time.perf_counter() - inicio
+    return {
+        'operaciones': len(latencias),
+        'segundos': round(total, 4),
+        'operaciones_por_segundo': round(len(latencias) / total, 1) if total else 0.0,
+        **resumir_latencias(latencias),
+    }
+
+
+def _recorrer_paginas(listar: Callable, paginas: int):
+    """Avanzar `paginas` páginas siguiendo el cursor"""
+    cursor = None
+    for _ in range(paginas):
+        _, cursor = listar(cursor)
+        if cursor is None:
+            break
+
+
+class SuiteBenchmark:
+    """Operaciones medidas sobre una base ya generada"""
+
+    def __init__(self, cantidad: int, operaciones: int, semilla: int):
+        self.cantidad = cantidad
+        self.operaciones = operaciones
+        self.azar = random.Random(semilla)
+        self.libros = LibroRepository()
+        self.socios = SocioRepository()
+        self.prestamos = PrestamoRepository()
+        self.libro_service = LibroService()
+        self.prestamo_service = PrestamoService()
+        self.libro_controller = LibroController()
+        self.reporte_controller = ReporteController()
+        # Los préstamos activos generados ocupan los primeros socios y libros
+        self.primero_libre = GeneradorDatos(cantidad).activos
+
+    def _isbns_al_azar(self, cantidad: int) -> List[tuple]:
+        return [(isbn(self.azar.randrange(self.cantidad)),) for _ in range(cantidad)]
+
+    def ejecutar(self) -> Dict[str, dict]:
+        """Medir todas las operaciones, de la capa más baja a la más alta"""
+        n = self.operaciones
+        repeticiones_completas = 3  # listar_* traen la tabla entera
+        resultados = {}
+
+        # --- Repositorio ---
+        self.libros.cache.limpiar()
+        resultados['repositorio.buscar_por_isbn'] = cronometrar(
+            self.libros.buscar_por_isbn, self._isbns_al_azar(n))
+        calientes = self._isbns_al_azar(min(100, n))
+        resultados['repositorio.buscar_por_isbn_cacheado'] = cronometrar(
+            self.libros.buscar_por_isbn, [self.azar.choice(calientes) for _ in range(n)])
+        resultados['repositorio.libros.listar_pagina'] = cronometrar(
+            lambda: _recorrer_paginas(self.libros.listar_pagina, 10), [()] * (n // 10))
+        resultados['repositorio.socios.listar_pagina'] = cronometrar(
+            lambda: _recorrer_paginas(self.socios.listar_pagina, 10), [()] * (n // 10))
+        resultados['repositorio.prestamos.listar_activos_pagina'] = cronometrar(
+            lambda: _recorrer_paginas(self.prestamos.listar_activos_pagina, 10), [()] * (n // 10))
+        resultados['repositorio.libros.listar_todos'] = cronometrar(
+            self.libros.listar_todos, [()] * repeticiones_completas)
+        resultados['repositorio.libros.listar_disponibles'] = cronometrar(
+            self.libros.listar_disponibles, [()] * repeticiones_completas)
+        resultados['repositorio.socios.listar_todos'] = cronometrar(
+            self.socios.listar_todos, [()] * repeticiones_completas)
+        resultados['repositorio.prestamos.listar_activos'] = cronometrar(
+            self.prestamos.listar_activos, [()] * repeticiones_completas)
+
+        # --- Servicio ---
+        resultados['servicio.buscar_libros'] = cronometrar(
+            self.libro_service.buscar_libros,
+            [(self.azar.choice(PALABRAS), 20) for _ in range(n)])
+        libres = range(self.primero_libre, self.cantidad)
+        pedidos = [(numero + 1, isbn(numero))
+                   for numero in self.azar.sample(libres, min(n, len(libres)))]
+        prestamos = []
+        resultados['servicio.realizar_prestamo'] = cronometrar(
+            lambda id_socio, codigo: prestamos.append(
+                self.prestamo_service.realizar_prestamo(id_socio, codigo)), pedidos)
+        resultados['servicio.registrar_devolucion'] = cronometrar(
+            self.prestamo_service.registrar_devolucion,
+            [(prestamo.id_prestamo,) for prestamo in prestamos if prestamo])
+        resultados['servicio.realizar_prestamo']['fallidos'] = prestamos.count(None)
+
+        # --- Controlador ---
+        resultados['controlador.buscar_libro'] = cronometrar(
+            self.libro_controller.buscar_libro, self._isbns_al_azar(n))
+        resultados['controlador.resumen_general'] = cronometrar(
+            self.reporte_controller.resumen_general, [()] * max(1, n // 50))
+        resultados['controlador.libros_mas_prestados'] = cronometrar(
+            self.reporte_controller.libros_mas_prestados, [()] * max(1, n // 50))
+        resultados['controlador.socios_con_mas_prestamos'] = cronometrar(
+            self.reporte_controller.socios_con_mas_prestamos, [(10, 'ultimos_30_dias')] * max(1, n // 50))
+        return resultados
+
+
+def medir(cantidad: int, operaciones: int, semilla: int) -> dict:
+    """Generar la base y correr la suite (en el proceso hijo)"""
+    inicio = time.perf_counter()
+    GeneradorDatos(cantidad, semilla).generar()
+    generacion = time.perf_counter() - inicio
+    # Los servicios informan cada operación por consola: no es parte de la medición
+    with contextlib.redirect_stdout(io.StringIO()):
+        operaciones_medidas = SuiteBenchmark(cantidad, operaciones, semilla).ejecutar()
+    return {
+        'generacion_segundos': round(generacion, 2),
+        'tamano_base_mb': round(os.path.getsize(DatabaseManager.get_instance().database_path)
+                                / 1024 / 1024, 1),
+        'operaciones': operaciones_medidas,
+    }
+
+
+def medir_tamano(cantidad: int, operaciones: int, semilla: int, directorio: str) -> dict:
+    """Medir un tamaño en un proceso nuevo con su propia base"""
+    entorno = dict(os.environ, BIBLIOTECA_DB_PATH=os.path.join(directorio, f"suite_{cantidad}.db"))
+    proceso = subprocess.run(
+        [sys.executable, "-m", "benchmark.suite", "--medir", "--tamanos", str(cantidad),
+         "--operaciones", str(operaciones), "--semilla", str(semilla)],
+        cwd=SRC, env=entorno, capture_output=True, text=True, check=True
+    )
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def version_codigo() -> Optional[str]:
+    """Commit actual del repositorio, si se puede obtener"""
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=SRC,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual: dict, anterior: dict) -> List[str]:
+    """Operaciones cuyo ritmo cayó más que UMBRAL_REGRESION respecto de `anterior`"""
+    regresiones = []
+    print(f"{'Tamaño':>9}  {'Operación':<46}{'Antes op/s':>12}{'Ahora op/s':>12}{'Cambio':>9}",
+          file=sys.stderr)
+    for tamano, resultado in actual['resultados'].items():
+        previo = anterior.get('resultados', {}).get(tamano)
+        if not previo:
+            continue
+        for operacion, datos in resultado['operaciones'].items():
+            antes = previo['operaciones'].get(operacion, {}).get('operaciones_por_segundo')
+            if not antes:
+                continue
+            ahora = datos['operaciones_por_segundo']
+            cambio = ahora / antes - 1
+            marca = "  ✗" if cambio < -UMBRAL_REGRESION else ""
+            print(f"{tamano:>9}  {operacion:<46}{antes:>12.1f}{ahora:>12.1f}{cambio:>+9.1%}{marca}",
+                  file=sys.stderr)
+            if marca:
+                regresiones.append(f"{tamano}:{operacion}")
+    return regresiones
+
+
+def main():
+    """Punto de entrada de la suite"""
+    parser = argparse.ArgumentParser(description="Benchmarks de la biblioteca sobre datos sintéticos")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS,
+                        help="Cantidad de libros, socios y préstamos de cada base")
+    parser.add_argument("--operaciones", type=int, default=1000,
+                        help="Repeticiones de cada operación puntual")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--directorio", help="Dónde crear las bases temporales")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto, la consola)")
+    parser.add_argument("--comparar", help="Resultado JSON anterior contra el cual comparar")
+    parser.add_argument("--medir", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir(args.tamanos[0], args.operaciones, args.semilla)))
+        return 0
+
+    db = DatabaseManager.get_instance()
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'version': version_codigo(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'perfil': db.perfil,
+        'semilla': args.semilla,
+        'operaciones': args.operaciones,
+        'resultados': {},
+    }
+    with tempfile.TemporaryDirectory(dir=args.directorio) as directorio:
+        for tamano in args.tamanos:
+            print(f"Midiendo {tamano} registros...", file=sys.stderr)
+            try:
+                informe['resultados'][str(tamano)] = medir_tamano(
+                    tamano, args.operaciones, args.semilla, directorio)
+            except subprocess.CalledProcessError as e:
+                print(f"✗ Falló la medición de {tamano}: {e.stderr}", file=sys.stderr)
+                return 1
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(informe, archivo, indent=2, ensure_ascii=False)
+        print(f"✓ Resultados guardados en {args.salida}", file=sys.stderr)
+    else:
+        print(json.dumps(informe, indent=2, ensure_ascii=False))
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            regresiones = comparar(informe, json.load(archivo))
+        if regresiones:
+            print(f"✗ {len(regresiones)} operaciones más lentas que antes", file=sys.stderr)
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
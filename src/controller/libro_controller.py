@@ -1,6 +1,7 @@
 """
 Controlador para gestionar operaciones de libros
 """
+from dal.ejecutor import EjecutorBD
 from service.libro_service import LibroService
 
 
@@ -15,6 +16,10 @@ class LibroController:
         """Crear un nuevo libro"""
         return self.service.crear_libro(isbn, titulo, autor, categoria, total_ejemplares)
     
+    def importar_libros(self, ruta: str) -> dict:
+        """Importar libros desde un archivo CSV o JSONL"""
+        return self.service.importar_libros_desde_archivo(ruta)
+    
     def listar_todos(self):
         """Listar todos los libros"""
         return self.service.listar_todos_los_libros()
@@ -23,11 +28,65 @@ class LibroController:
         """Listar libros disponibles"""
         return self.service.listar_libros_disponibles()
     
+    def listar_pagina(self, cursor=None, limite: int = 20, solo_disponibles: bool = False):
+        """Listar una página de libros"""
+        return self.service.listar_libros_pagina(cursor, limite, solo_disponibles)
+    
     def buscar_libro(self, isbn: str):
         """Buscar libro por ISBN"""
         return self.service.buscar_libro(isbn)
     
+    def buscar_libros(self, texto: str, limite: int = 20):
+        """Buscar libros por título, autor o categoría"""
+        return self.service.buscar_libros(texto, limite)
+    
     def eliminar_libro(self, isbn: str) -> bool:
         """Eliminar un libro"""
         return self.service.eliminar_libro(isbn)
 
+
+class LibroControllerAsync:
+    """Versión asíncrona de LibroController: la BD se usa desde el EjecutorBD"""
+    
+    def __init__(self, controller: LibroController = None):
+        self.controller = controller or LibroController()
+        self.ejecutor = EjecutorBD.get_instance()
+    
+    async def crear_libro(self, isbn: str, titulo: str, autor: str,
+                          categoria: str = "", total_ejemplares: int = 1) -> bool:
+        """Crear un nuevo libro"""
+        return await self.ejecutor.escribir(self.controller.crear_libro, isbn, titulo,
+                                            autor, categoria, total_ejemplares)
+    
+    async def importar_libros(self, ruta: str) -> dict:
+        """Importar libros desde un archivo CSV o JSONL"""
+        return await self.ejecutor.escribir(self.controller.importar_libros, ruta)
+    
+    async def listar_todos(self):
+        """Listar todos los libros"""
+        return await self.ejecutor.leer(self.controller.listar_todos, clave=('libros',))
+    
+    async def listar_disponibles(self):
+        """Listar libros disponibles"""
+        return await self.ejecutor.leer(self.controller.listar_disponibles,
+                                        clave=('libros_disponibles',))
+    
+    async def listar_pagina(self, cursor=None, limite: int = 20, solo_disponibles: bool = False):
+        """Listar una página de libros"""
+        return await self.ejecutor.leer(self.controller.listar_pagina, cursor, limite,
+                                        solo_disponibles,
+                                        clave=('libros_pagina', cursor, limite, solo_disponibles))
+    
+    async def buscar_libro(self, isbn: str):
+        """Buscar libro por ISBN"""
+        return await self.ejecutor.leer(self.controller.buscar_libro, isbn,
+                                        clave=('libro', isbn))
+    
+    async def buscar_libros(self, texto: str, limite: int = 20):
+        """Buscar libros por título, autor o categoría"""
+        return await self.ejecutor.leer(self.controller.buscar_libros, texto, limite,
+                                        clave=('buscar_libros', texto, limite))
+    
+    async def eliminar_libro(self, isbn: str) -> bool:
+        """Eliminar un libro"""
+        return await self.ejecutor.escribir(self.controller.eliminar_libro, isbn)
@@ -1,6 +1,7 @@
 """
 Controlador para gestionar operaciones de préstamos
 """
+from dal.ejecutor import EjecutorBD
 from service.prestamo_service import PrestamoService
 
 
@@ -14,6 +15,14 @@ class PrestamoController:
         """Realizar un préstamo"""
         return self.service.realizar_prestamo(id_socio, isbn)
     
+    def realizar_prestamos(self, id_socio: int, isbns):
+        """Realizar varios préstamos a un mismo socio"""
+        return self.service.realizar_prestamos(id_socio, isbns)
+    
+    def registrar_devoluciones(self, ids_prestamo):
+        """Registrar la devolución de varios préstamos"""
+        return self.service.registrar_devoluciones(ids_prestamo)
+    
     def registrar_devolucion(self, id_prestamo: int) -> bool:
         """Registrar devolución de un libro"""
         return self.service.registrar_devolucion(id_prestamo)
@@ -22,7 +31,52 @@ class PrestamoController:
         """Listar préstamos activos"""
         return self.service.listar_prestamos_activos()
     
+    def listar_prestamos_activos_pagina(self, cursor=None, limite: int = 20):
+        """Listar una página de préstamos activos"""
+        return self.service.listar_prestamos_activos_pagina(cursor, limite)
+    
     def verificar_disponibilidad(self, isbn: str) -> bool:
         """Verificar disponibilidad de un libro"""
         return self.service.verificar_disponibilidad(isbn)
 
+
+class PrestamoControllerAsync:
+    """Versión asíncrona de PrestamoController: la BD se usa desde el EjecutorBD"""
+    
+    def __init__(self, controller: PrestamoController = None):
+        self.controller = controller or PrestamoController()
+        self.ejecutor = EjecutorBD.get_instance()
+    
+    async def realizar_prestamo(self, id_socio: int, isbn: str):
+        """Realizar un préstamo"""
+        return await self.ejecutor.escribir(self.controller.realizar_prestamo, id_socio, isbn)
+    
+    async def realizar_prestamos(self, id_socio: int, isbns):
+        """Realizar varios préstamos a un mismo socio"""
+        return await self.ejecutor.escribir(self.controller.realizar_prestamos,
+                                            id_socio, list(isbns))
+    
+    async def registrar_devoluciones(self, ids_prestamo):
+        """Registrar la devolución de varios préstamos"""
+        return await self.ejecutor.escribir(self.controller.registrar_devoluciones,
+                                            list(ids_prestamo))
+    
+    async def registrar_devolucion(self, id_prestamo: int) -> bool:
+        """Registrar devolución de un libro"""
+        return await self.ejecutor.escribir(self.controller.registrar_devolucion, id_prestamo)
+    
+    async def listar_prestamos_activos(self):
+        """Listar préstamos activos"""
+        return await self.ejecutor.leer(self.controller.listar_prestamos_activos,
+                                        clave=('prestamos_activos',))
+    
+    async def listar_prestamos_activos_pagina(self, cursor=None, limite: int = 20):
+        """Listar una página de préstamos activos"""
+        return await self.ejecutor.leer(self.controller.listar_prestamos_activos_pagina,
+                                        cursor, limite,
+                                        clave=('prestamos_activos_pagina', cursor, limite))
+    
+    async def verificar_disponibilidad(self, isbn: str) -> bool:
+        """Verificar disponibilidad de un libro"""
+        return await self.ejecutor.leer(self.controller.verificar_disponibilidad, isbn,
+                                        clave=('disponibilidad', isbn))
@@ -0,0 +1,23 @@
+"""
+Controlador para gestionar reportes
+"""
+from service.reporte_service import ReporteService
+
+
+class ReporteController:
+    """Controlador para coordinar los reportes"""
+    
+    def __init__(self):
+        self.service = ReporteService()
+    
+    def resumen_general(self) -> dict:
+        """Obtener el resumen general del sistema"""
+        return self.service.resumen_general()
+    
+    def libros_mas_prestados(self, limite: int = 10, periodo: str = 'historico'):
+        """Obtener el top de libros más prestados"""
+        return self.service.libros_mas_prestados(limite, periodo)
+    
+    def socios_con_mas_prestamos(self, limite: int = 10, periodo: str = 'historico'):
+        """Obtener el top de socios con más préstamos"""
+        return self.service.socios_con_mas_prestamos(limite, periodo)
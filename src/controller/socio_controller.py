@@ -1,6 +1,7 @@
 """
 Controlador para gestionar operaciones de socios
 """
+from dal.ejecutor import EjecutorBD
 from service.socio_service import SocioService
 
 
@@ -14,6 +15,10 @@ class SocioController:
         """Registrar un nuevo socio"""
         return self.service.registrar_socio(nombre, email, telefono)
     
+    def registrar_socios(self, ruta: str) -> dict:
+        """Registrar socios en lote desde un archivo CSV o JSONL"""
+        return self.service.registrar_socios_desde_archivo(ruta)
+    
     def listar_todos(self):
         """Listar todos los socios"""
         return self.service.listar_todos_los_socios()
@@ -22,10 +27,22 @@ class SocioController:
         """Listar socios activos"""
         return self.service.listar_socios_activos()
     
+    def listar_pagina(self, cursor=None, limite: int = 20, solo_activos: bool = False):
+        """Listar una página de socios"""
+        return self.service.listar_socios_pagina(cursor, limite, solo_activos)
+    
     def buscar_socio(self, id_socio: int):
         """Buscar socio por ID"""
         return self.service.buscar_socio(id_socio)
     
+    def buscar_socios(self, texto: str, limite: int = 10):
+        """Buscar socios por nombre o email"""
+        return self.service.buscar_socios(texto, limite)
+    
+    def pagar_multa(self, id_socio: int, monto: float) -> bool:
+        """Registrar un pago de multas"""
+        return self.service.pagar_multa(id_socio, monto)
+    
     def desactivar_socio(self, id_socio: int) -> bool:
         """Desactivar un socio"""
         return self.service.desactivar_socio(id_socio)
@@ -34,3 +51,55 @@ class SocioController:
         """Activar un socio"""
         return self.service.activar_socio(id_socio)
 
+
+class SocioControllerAsync:
+    """Versión asíncrona de SocioController: la BD se usa desde el EjecutorBD"""
+    
+    def __init__(self, controller: SocioController = None):
+        self.controller = controller or SocioController()
+        self.ejecutor = EjecutorBD.get_instance()
+    
+    async def registrar_socio(self, nombre: str, email: str, telefono: str = ""):
+        """Registrar un nuevo socio"""
+        return await self.ejecutor.escribir(self.controller.registrar_socio,
+                                            nombre, email, telefono)
+    
+    async def registrar_socios(self, ruta: str) -> dict:
+        """Registrar socios en lote desde un archivo CSV o JSONL"""
+        return await self.ejecutor.escribir(self.controller.registrar_socios, ruta)
+    
+    async def listar_todos(self):
+        """Listar todos los socios"""
+        return await self.ejecutor.leer(self.controller.listar_todos, clave=('socios',))
+    
+    async def listar_activos(self):
+        """Listar socios activos"""
+        return await self.ejecutor.leer(self.controller.listar_activos, clave=('socios_activos',))
+    
+    async def listar_pagina(self, cursor=None, limite: int = 20, solo_activos: bool = False):
+        """Listar una página de socios"""
+        return await self.ejecutor.leer(self.controller.listar_pagina, cursor, limite,
+                                        solo_activos,
+                                        clave=('socios_pagina', cursor, limite, solo_activos))
+    
+    async def buscar_socio(self, id_socio: int):
+        """Buscar socio por ID"""
+        return await self.ejecutor.leer(self.controller.buscar_socio, id_socio,
+                                        clave=('socio', id_socio))
+    
+    async def buscar_socios(self, texto: str, limite: int = 10):
+        """Buscar socios por nombre o email"""
+        return await self.ejecutor.leer(self.controller.buscar_socios, texto, limite,
+                                        clave=('buscar_socios', texto, limite))
+    
+    async def pagar_multa(self, id_socio: int, monto: float) -> bool:
+        """Registrar un pago de multas"""
+        return await self.ejecutor.escribir(self.controller.pagar_multa, id_socio, monto)
+    
+    async def desactivar_socio(self, id_socio: int) -> bool:
+        """Desactivar un socio"""
+        return await self.ejecutor.escribir(self.controller.desactivar_socio, id_socio)
+    
+    async def activar_socio(self, id_socio: int) -> bool:
+        """Activar un socio"""
+        return await self.ejecutor.escribir(self.controller.activar_socio, id_socio)
@@ -1,20 +1,297 @@
 """
 Data Access Layer - Patrón Singleton para gestión de base de datos
 """
+import functools
+import inspect
+import os
+import queue
 import sqlite3
 import threading
-from typing import Any, Tuple
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def con_conexion(metodo: Callable) -> Callable:
+    """
+    Decorador para métodos de repositorio: la conexión se toma del pool al
+    entrar y se devuelve al salir (en los generadores, al terminar el
+    recorrido). Si el hilo ya tenía una, por ejemplo dentro de una
+    transacción, se reutiliza.
+    """
+    if inspect.isgeneratorfunction(metodo):
+        @functools.wraps(metodo)
+        def recorrer(self, *args, **kwargs):
+            with self.db_manager.conexion():
+                yield from metodo(self, *args, **kwargs)
+        return recorrer
+    
+    @functools.wraps(metodo)
+    def ejecutar(self, *args, **kwargs):
+        with self.db_manager.conexion():
+            return metodo(self, *args, **kwargs)
+    return ejecutar
+
+
+class _ConexionPrestada:
+    """
+    Conexión del pool asignada a un hilo. Vive solo en el threading.local
+    del hilo: si el hilo termina sin liberarla, el finalizador la devuelve.
+    """
+    
+    def __init__(self, conexion: sqlite3.Connection, devolver: Callable):
+        self.conexion = conexion
+        self.devolver = weakref.finalize(self, devolver, conexion)
+        self.devolver.atexit = False
 
 
 class DatabaseManager:
     """
     Implementación del patrón Singleton para gestionar
     la conexión a la base de datos de forma centralizada.
-    Thread-safe.
+    Thread-safe: cada hilo toma prestada una conexión de un pool
+    acotado; las lecturas corren en paralelo (modo WAL) y las
+    escrituras transaccionales se serializan en un único escritor.
     """
     _instance = None
     _lock = threading.Lock()
     
+    TAMANO_POOL = 5
+    TIMEOUT_POOL = 30.0  # Segundos de espera por una conexión libre
+    
+    # Perfiles de PRAGMAs que se aplican a cada conexión nueva, en orden.
+    # 'seguro' confirma cada transacción con fsync (synchronous=FULL);
+    # 'rendimiento' hace fsync solo en los checkpoints del WAL: ante un corte
+    # de energía se pueden perder las últimas transacciones, pero la base
+    # nunca queda corrupta.
+    PERFILES = {
+        'seguro': {
+            'journal_mode': 'WAL',
+            'synchronous': 'FULL',
+            'busy_timeout': int(TIMEOUT_POOL * 1000),
+        },
+        'rendimiento': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -65536,  # En KiB: 64 MiB por conexión
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+            'busy_timeout': int(TIMEOUT_POOL * 1000),
+        },
+    }
+    PERFIL_POR_DEFECTO = 'seguro'
+    
+    # Migraciones del esquema: (versión, sentencias). Se aplican en orden
+    # sobre las tablas base y la versión alcanzada queda en PRAGMA user_version.
+    MIGRACIONES = [
+        (1, [
+            "CREATE INDEX IF NOT EXISTS idx_prestamos_estado_vencimiento "
+            "ON prestamos(estado, fecha_devolucion_esperada)",
+            "CREATE INDEX IF NOT EXISTS idx_prestamos_socio_activos "
+            "ON prestamos(id_socio) WHERE estado = 'activo'",
+            "CREATE INDEX IF NOT EXISTS idx_prestamos_isbn "
+            "ON prestamos(isbn, estado)",
+        ]),
+        (2, [
+            "CREATE INDEX IF NOT EXISTS idx_libros_titulo ON libros(titulo, isbn)",
+            "CREATE INDEX IF NOT EXISTS idx_socios_nombre ON socios(nombre, id_socio)",
+        ]),
+        (3, [
+            # Contadores de préstamos por libro y por socio (histórico y por día),
+            # mantenidos por trigger dentro de la misma transacción del préstamo
+            '''CREATE TABLE IF NOT EXISTS estadisticas_libros (
+                isbn TEXT PRIMARY KEY,
+                total_prestamos INTEGER NOT NULL DEFAULT 0
+            )''',
+            '''CREATE TABLE IF NOT EXISTS estadisticas_socios (
+                id_socio INTEGER PRIMARY KEY,
+                total_prestamos INTEGER NOT NULL DEFAULT 0
+            )''',
+            '''CREATE TABLE IF NOT EXISTS prestamos_diarios_libros (
+                fecha DATE NOT NULL,
+                isbn TEXT NOT NULL,
+                cantidad INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (fecha, isbn)
+            ) WITHOUT ROWID''',
+            '''CREATE TABLE IF NOT EXISTS prestamos_diarios_socios (
+                fecha DATE NOT NULL,
+                id_socio INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (fecha, id_socio)
+            ) WITHOUT ROWID''',
+            "CREATE INDEX IF NOT EXISTS idx_estadisticas_libros_total "
+            "ON estadisticas_libros(total_prestamos DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_estadisticas_socios_total "
+            "ON estadisticas_socios(total_prestamos DESC)",
+            "INSERT INTO estadisticas_libros (isbn, total_prestamos) "
+            "SELECT isbn, COUNT(*) FROM prestamos GROUP BY isbn",
+            "INSERT INTO estadisticas_socios (id_socio, total_prestamos) "
+            "SELECT id_socio, COUNT(*) FROM prestamos GROUP BY id_socio",
+            "INSERT INTO prestamos_diarios_libros (fecha, isbn, cantidad) "
+            "SELECT fecha_prestamo, isbn, COUNT(*) FROM prestamos GROUP BY fecha_prestamo, isbn",
+            "INSERT INTO prestamos_diarios_socios (fecha, id_socio, cantidad) "
+            "SELECT fecha_prestamo, id_socio, COUNT(*) FROM prestamos GROUP BY fecha_prestamo, id_socio",
+            '''CREATE TRIGGER IF NOT EXISTS trg_prestamos_estadisticas
+               AFTER INSERT ON prestamos
+               BEGIN
+                   INSERT INTO estadisticas_libros (isbn, total_prestamos)
+                   VALUES (NEW.isbn, 1)
+                   ON CONFLICT(isbn) DO UPDATE SET total_prestamos = total_prestamos + 1;
+                   INSERT INTO estadisticas_socios (id_socio, total_prestamos)
+                   VALUES (NEW.id_socio, 1)
+                   ON CONFLICT(id_socio) DO UPDATE SET total_prestamos = total_prestamos + 1;
+                   INSERT INTO prestamos_diarios_libros (fecha, isbn, cantidad)
+                   VALUES (NEW.fecha_prestamo, NEW.isbn, 1)
+                   ON CONFLICT(fecha, isbn) DO UPDATE SET cantidad = cantidad + 1;
+                   INSERT INTO prestamos_diarios_socios (fecha, id_socio, cantidad)
+                   VALUES (NEW.fecha_prestamo, NEW.id_socio, 1)
+                   ON CONFLICT(fecha, id_socio) DO UPDATE SET cantidad = cantidad + 1;
+               END''',
+        ]),
+        (4, [
+            # Libro de multas: cargos al devolver con retraso y pagos del socio;
+            # socios.saldo_multas guarda el saldo pendiente actualizado.
+            # Antes no se registraban los pagos: las multas históricas se
+            # cargan con su pago compensatorio, así nadie empieza debiendo
+            "ALTER TABLE socios ADD COLUMN saldo_multas REAL NOT NULL DEFAULT 0.0",
+            '''CREATE TABLE IF NOT EXISTS multas_movimientos (
+                id_movimiento INTEGER PRIMARY KEY AUTOINCREMENT,
+                id_socio INTEGER NOT NULL,
+                id_prestamo INTEGER,
+                tipo TEXT NOT NULL,
+                monto REAL NOT NULL,
+                fecha DATE DEFAULT CURRENT_DATE,
+                FOREIGN KEY (id_socio) REFERENCES socios(id_socio),
+                FOREIGN KEY (id_prestamo) REFERENCES prestamos(id_prestamo)
+            )''',
+            "CREATE INDEX IF NOT EXISTS idx_multas_movimientos_socio "
+            "ON multas_movimientos(id_socio)",
+            '''INSERT INTO multas_movimientos (id_socio, id_prestamo, tipo, monto, fecha)
+               SELECT id_socio, id_prestamo, 'cargo', multa, fecha_devolucion_real
+               FROM prestamos
+               WHERE estado = 'devuelto' AND multa > 0''',
+            '''INSERT INTO multas_movimientos (id_socio, id_prestamo, tipo, monto, fecha)
+               SELECT id_socio, id_prestamo, 'pago', -multa, fecha_devolucion_real
+               FROM prestamos
+               WHERE estado = 'devuelto' AND multa > 0''',
+            '''UPDATE socios
+               SET saldo_multas = (SELECT COALESCE(SUM(m.monto), 0)
+                                   FROM multas_movimientos m
+                                   WHERE m.id_socio = socios.id_socio)''',
+        ]),
+        (5, [
+            # Búsqueda de texto completo en el catálogo: índice FTS5 de
+            # contenido externo (lee las columnas de libros por rowid),
+            # sin distinguir acentos y con índices de prefijos. Las altas
+            # las indexa LibroRepository en bloque (un trigger por fila
+            # haría mucho más lenta la importación); bajas y cambios, los
+            # triggers
+            '''CREATE VIRTUAL TABLE IF NOT EXISTS libros_fts USING fts5(
+                titulo, autor, categoria,
+                content='libros', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )''',
+            "INSERT INTO libros_fts(libros_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')",
+            "INSERT INTO libros_fts(libros_fts) VALUES ('rebuild')",
+            '''CREATE TRIGGER IF NOT EXISTS trg_libros_fts_delete
+               AFTER DELETE ON libros
+               BEGIN
+                   INSERT INTO libros_fts (libros_fts, rowid, titulo, autor, categoria)
+                   VALUES ('delete', OLD.rowid, OLD.titulo, OLD.autor, OLD.categoria);
+               END''',
+            '''CREATE TRIGGER IF NOT EXISTS trg_libros_fts_update
+               AFTER UPDATE OF titulo, autor, categoria ON libros
+               BEGIN
+                   INSERT INTO libros_fts (libros_fts, rowid, titulo, autor, categoria)
+                   VALUES ('delete', OLD.rowid, OLD.titulo, OLD.autor, OLD.categoria);
+                   INSERT INTO libros_fts (rowid, titulo, autor, categoria)
+                   VALUES (NEW.rowid, NEW.titulo, NEW.autor, NEW.categoria);
+               END''',
+        ]),
+        (6, [
+            # El rowid implícito de libros (clave primaria TEXT) puede
+            # renumerarse con VACUUM y desalinear el índice de texto: la
+            # tabla se reconstruye con id_libro INTEGER PRIMARY KEY, alias
+            # estable del rowid, y el índice pasa a apoyarse en él
+            "DROP TRIGGER IF EXISTS trg_libros_fts_delete",
+            "DROP TRIGGER IF EXISTS trg_libros_fts_update",
+            "DROP TABLE IF EXISTS libros_fts",
+            '''CREATE TABLE libros_nueva (
+                id_libro INTEGER PRIMARY KEY,
+                isbn TEXT NOT NULL UNIQUE,
+                titulo TEXT NOT NULL,
+                autor TEXT NOT NULL,
+                categoria TEXT,
+                total_ejemplares INTEGER DEFAULT 1,
+                ejemplares_disponibles INTEGER DEFAULT 1
+            )''',
+            '''INSERT INTO libros_nueva (id_libro, isbn, titulo, autor, categoria,
+                                       total_ejemplares, ejemplares_disponibles)
+               SELECT rowid, isbn, titulo, autor, categoria,
+                      total_ejemplares, ejemplares_disponibles
+               FROM libros''',
+            "DROP TABLE libros",
+            "ALTER TABLE libros_nueva RENAME TO libros",
+            "CREATE INDEX IF NOT EXISTS idx_libros_titulo ON libros(titulo, isbn)",
+            '''CREATE VIRTUAL TABLE libros_fts USING fts5(
+                titulo, autor, categoria,
+                content='libros', content_rowid='id_libro',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )''',
+            "INSERT INTO libros_fts(libros_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')",
+            "INSERT INTO libros_fts(libros_fts) VALUES ('rebuild')",
+            '''CREATE TRIGGER trg_libros_fts_delete
+               AFTER DELETE ON libros
+               BEGIN
+                   INSERT INTO libros_fts (libros_fts, rowid, titulo, autor, categoria)
+                   VALUES ('delete', OLD.id_libro, OLD.titulo, OLD.autor, OLD.categoria);
+               END''',
+            '''CREATE TRIGGER trg_libros_fts_update
+               AFTER UPDATE OF titulo, autor, categoria ON libros
+               BEGIN
+                   INSERT INTO libros_fts (libros_fts, rowid, titulo, autor, categoria)
+                   VALUES ('delete', OLD.id_libro, OLD.titulo, OLD.autor, OLD.categoria);
+                   INSERT INTO libros_fts (rowid, titulo, autor, categoria)
+                   VALUES (NEW.id_libro, NEW.titulo, NEW.autor, NEW.categoria);
+               END''',
+        ]),
+        (7, [
+            # Contadores mensuales de préstamos: una ventana larga (p. ej. el
+            # año en curso) suma a lo sumo un mes parcial de contadores
+            # diarios y un contador por mes completo
+            '''CREATE TABLE IF NOT EXISTS prestamos_mensuales_libros (
+                mes TEXT NOT NULL,
+                isbn TEXT NOT NULL,
+                cantidad INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (mes, isbn)
+            ) WITHOUT ROWID''',
+            '''CREATE TABLE IF NOT EXISTS prestamos_mensuales_socios (
+                mes TEXT NOT NULL,
+                id_socio INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (mes, id_socio)
+            ) WITHOUT ROWID''',
+            "INSERT INTO prestamos_mensuales_libros (mes, isbn, cantidad) "
+            "SELECT strftime('%Y-%m', fecha), isbn, SUM(cantidad) "
+            "FROM prestamos_diarios_libros GROUP BY 1, isbn",
+            "INSERT INTO prestamos_mensuales_socios (mes, id_socio, cantidad) "
+            "SELECT strftime('%Y-%m', fecha), id_socio, SUM(cantidad) "
+            "FROM prestamos_diarios_socios GROUP BY 1, id_socio",
+            '''CREATE TRIGGER IF NOT EXISTS trg_prestamos_mensuales
+               AFTER INSERT ON prestamos
+               BEGIN
+                   INSERT INTO prestamos_mensuales_libros (mes, isbn, cantidad)
+                   VALUES (strftime('%Y-%m', NEW.fecha_prestamo), NEW.isbn, 1)
+                   ON CONFLICT(mes, isbn) DO UPDATE SET cantidad = cantidad + 1;
+                   INSERT INTO prestamos_mensuales_socios (mes, id_socio, cantidad)
+                   VALUES (strftime('%Y-%m', NEW.fecha_prestamo), NEW.id_socio, 1)
+                   ON CONFLICT(mes, id_socio) DO UPDATE SET cantidad = cantidad + 1;
+               END''',
+        ]),
+    ]
+    
     def __new__(cls):
         if cls._instance is None:
             with cls._lock:
@@ -26,8 +303,15 @@ class DatabaseManager:
     def __init__(self):
         if self._initialized:
             return
-        self.connection = None
-        self.database_path = "biblioteca.db"
+        # Configurables por entorno o con configurar() antes de conectar
+        self.database_path = os.environ.get("BIBLIOTECA_DB_PATH", "biblioteca.db")
+        self.perfil = os.environ.get("BIBLIOTECA_DB_PERFIL", self.PERFIL_POR_DEFECTO)
+        self.tamano_pool = self.TAMANO_POOL
+        self._pool = None
+        self._conexiones = []
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
+        self._lock_escritura = threading.RLock()
         self._initialized = True
     
     @classmethod
@@ -35,19 +319,119 @@ class DatabaseManager:
         """Método para obtener la única instancia"""
         return cls()
     
+    def configurar(self, database_path: Optional[str] = None, perfil: Optional[str] = None):
+        """Elegir el archivo de la base y el perfil de PRAGMAs (antes de conectar)"""
+        if self._pool is not None:
+            raise RuntimeError("La configuración debe cambiarse antes de connect()")
+        if perfil is not None and perfil not in self.PERFILES:
+            raise ValueError(f"Perfil desconocido: {perfil} (opciones: {', '.join(self.PERFILES)})")
+        if database_path is not None:
+            self.database_path = database_path
+        if perfil is not None:
+            self.perfil = perfil
+    
+    def pragmas(self) -> Dict[str, Any]:
+        """Valores vigentes de los PRAGMAs del perfil en la conexión actual"""
+        with self.conexion() as conexion:
+            return {nombre: conexion.execute(f"PRAGMA {nombre}").fetchone()[0]
+                    for nombre in self.PERFILES[self.perfil]}
+    
+    @property
+    def connection(self):
+        """Conexión asignada al hilo actual (None si no hay pool abierto)"""
+        if self._pool is None:
+            return None
+        return self._obtener_conexion()
+    
     def connect(self):
-        """Establecer conexión a la base de datos"""
-        if self.connection is None:
-            self.connection = sqlite3.connect(
-                self.database_path,
-                check_same_thread=False
-            )
-            self.connection.row_factory = sqlite3.Row
-            self._crear_tablas()
+        """Inicializar el pool de conexiones a la base de datos"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = queue.LifoQueue()
+                    conexion = self._nueva_conexion()
+                    self._crear_tablas(conexion)
+                    self._aplicar_migraciones(conexion)
+                    self._pool.put(conexion)
+    
+    def _nueva_conexion(self) -> sqlite3.Connection:
+        """Abrir una conexión nueva y registrarla en el pool"""
+        conexion = sqlite3.connect(
+            self.database_path,
+            timeout=self.TIMEOUT_POOL,
+            check_same_thread=False
+        )
+        conexion.row_factory = sqlite3.Row
+        for nombre, valor in self._pragmas_perfil().items():
+            conexion.execute(f"PRAGMA {nombre}={valor}")
+        self._conexiones.append(conexion)
+        return conexion
+    
+    def _pragmas_perfil(self) -> Dict[str, Any]:
+        pragmas = self.PERFILES.get(self.perfil)
+        if pragmas is None:
+            raise ValueError(f"Perfil desconocido: {self.perfil} "
+                             f"(opciones: {', '.join(self.PERFILES)})")
+        return pragmas
     
-    def _crear_tablas(self):
+    def _conexion_actual(self) -> Optional[sqlite3.Connection]:
+        """Conexión que tiene asignada el hilo actual, si tiene alguna"""
+        prestada = getattr(self._local, 'prestada', None)
+        return prestada.conexion if prestada is not None else None
+    
+    def _obtener_conexion(self) -> sqlite3.Connection:
+        """Devolver la conexión del hilo actual, tomándola del pool si hace falta"""
+        conexion = self._conexion_actual()
+        if conexion is not None:
+            return conexion
+        
+        try:
+            conexion = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                if len(self._conexiones) < self.tamano_pool:
+                    conexion = self._nueva_conexion()
+            if conexion is None:
+                try:
+                    conexion = self._pool.get(timeout=self.TIMEOUT_POOL)
+                except queue.Empty:
+                    raise RuntimeError("No hay conexiones libres en el pool")
+        
+        self._local.prestada = _ConexionPrestada(conexion, self._devolver)
+        return conexion
+    
+    def _devolver(self, conexion: sqlite3.Connection):
+        """Devolver una conexión al pool, revirtiendo lo que no se confirmó"""
+        with self._pool_lock:
+            # Si el pool se cerró (o se reabrió) la conexión ya no es suya
+            if conexion not in self._conexiones:
+                return
+            if conexion.in_transaction:
+                conexion.rollback()
+            self._pool.put(conexion)
+    
+    def liberar_conexion(self):
+        """Devolver al pool la conexión del hilo actual"""
+        prestada = getattr(self._local, 'prestada', None)
+        if prestada is None:
+            return
+        self._local.prestada = None
+        prestada.devolver()
+    
+    @contextmanager
+    def conexion(self):
+        """Tomar prestada una conexión durante un bloque with"""
+        propia = self._conexion_actual() is None
+        conexion = self._obtener_conexion()
+        try:
+            yield conexion
+        finally:
+            if propia and self._conexion_actual() is conexion:
+                self.liberar_conexion()
+    
+    def _crear_tablas(self, conexion: sqlite3.Connection):
         """Crear tablas si no existen"""
-        cursor = self.connection.cursor()
+        cursor = conexion.cursor()
         
         # Tabla de libros
         cursor.execute('''
@@ -90,27 +474,155 @@ class DatabaseManager:
             )
         ''')
         
-        self.connection.commit()
+        conexion.commit()
+    
+    def _aplicar_migraciones(self, conexion: sqlite3.Connection):
+        """Aplicar las migraciones pendientes según PRAGMA user_version"""
+        for version, sentencias in self.MIGRACIONES:
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                actual = conexion.execute("PRAGMA user_version").fetchone()[0]
+                if version > actual:
+                    for sentencia in sentencias:
+                        conexion.execute(sentencia)
+                    conexion.execute(f"PRAGMA user_version = {version}")
+                conexion.commit()
+            except Exception:
+                conexion.rollback()
+                raise
+    
+    def version_esquema(self) -> int:
+        """Versión del esquema aplicada en la base de datos"""
+        with self.conexion() as conexion:
+            return conexion.execute("PRAGMA user_version").fetchone()[0]
+    
+    def explicar(self, query: str, params: Tuple = ()) -> List[str]:
+        """Devolver el plan de ejecución (EXPLAIN QUERY PLAN) de una consulta"""
+        with self.conexion() as conexion:
+            cursor = conexion.execute(f"EXPLAIN QUERY PLAN {query}", params)
+            return [row['detail'] for row in cursor.fetchall()]
+    
+    def verificar_planes(self, consultas: List[Tuple[str, Tuple, str]]):
+        """
+        Verificar que cada consulta (sql, parámetros, índice esperado)
+        use su índice; lanza AssertionError con el plan si no lo hace.
+        """
+        for query, params, indice in consultas:
+            plan = self.explicar(query, params)
+            assert any(indice in paso for paso in plan), \
+                f"La consulta no usa {indice}: {' | '.join(plan)}"
     
     def execute_query(self, query: str, params: Tuple = ()) -> Any:
         """Ejecutar una consulta SQL"""
-        cursor = self.connection.cursor()
+        cursor = self._obtener_conexion().cursor()
         cursor.execute(query, params)
         return cursor
     
+    def execute_many(self, query: str, params_seq: Iterable[Tuple]) -> Any:
+        """Ejecutar una consulta SQL para cada juego de parámetros"""
+        cursor = self._obtener_conexion().cursor()
+        cursor.executemany(query, params_seq)
+        return cursor
+    
+    @contextmanager
+    def transaccion(self):
+        """
+        Unidad de trabajo: agrupa varias escrituras en una única transacción.
+        Solo un hilo escribe a la vez; el bloqueo de escritura de SQLite se
+        toma al inicio (BEGIN IMMEDIATE). Dentro del bloque, commit() no
+        confirma nada y rollback() marca el bloque para revertirse al salir.
+        Los bloques anidados se implementan con SAVEPOINT.
+        """
+        # La conexión se toma antes que el bloqueo: quien escribe nunca
+        # espera por el pool mientras los demás esperan por él
+        with self.conexion() as conexion, self._lock_escritura:
+            nivel = getattr(self._local, 'profundidad', 0)
+            if nivel == 0:
+                conexion.execute("BEGIN IMMEDIATE")
+                self._local.al_confirmar = []
+            else:
+                conexion.execute(f"SAVEPOINT tx_{nivel}")
+            revertir_externo = getattr(self._local, 'revertir', False) and nivel > 0
+            pendientes_previos = len(self._local.al_confirmar)
+            self._local.profundidad = nivel + 1
+            self._local.revertir = False
+            
+            try:
+                yield conexion
+            except Exception:
+                self._revertir_nivel(conexion, nivel, pendientes_previos)
+                self._local.revertir = revertir_externo
+                raise
+            finally:
+                self._local.profundidad = nivel
+            
+            if self._local.revertir:
+                self._revertir_nivel(conexion, nivel, pendientes_previos)
+            elif nivel == 0:
+                try:
+                    conexion.commit()
+                except Exception:
+                    conexion.rollback()
+                    raise
+                self._ejecutar_al_confirmar()
+            else:
+                conexion.execute(f"RELEASE tx_{nivel}")
+            self._local.revertir = revertir_externo
+    
+    def _revertir_nivel(self, conexion: sqlite3.Connection, nivel: int, pendientes: int):
+        """Revertir la transacción o el savepoint de un nivel"""
+        self._local.revertir = False
+        del self._local.al_confirmar[pendientes:]
+        if nivel == 0:
+            conexion.rollback()
+        else:
+            conexion.execute(f"ROLLBACK TO tx_{nivel}")
+            conexion.execute(f"RELEASE tx_{nivel}")
+    
+    def al_confirmar(self, accion: Callable[[], None]):
+        """
+        Ejecutar una acción cuando se confirme la unidad de trabajo actual
+        (se descarta si se revierte). Fuera de una transacción se ejecuta ya.
+        """
+        if self.en_transaccion():
+            self._local.al_confirmar.append(accion)
+        else:
+            accion()
+    
+    def _ejecutar_al_confirmar(self):
+        """Ejecutar las acciones registradas para después del commit"""
+        acciones, self._local.al_confirmar = self._local.al_confirmar, []
+        for accion in acciones:
+            accion()
+    
+    def en_transaccion(self) -> bool:
+        """Indica si el hilo actual está dentro de una unidad de trabajo"""
+        return getattr(self._local, 'profundidad', 0) > 0
+    
     def commit(self):
-        """Confirmar transacción"""
-        if self.connection:
-            self.connection.commit()
+        """Confirmar transacción (se difiere dentro de una unidad de trabajo)"""
+        if self.en_transaccion():
+            return
+        conexion = self._conexion_actual()
+        if conexion:
+            conexion.commit()
     
     def rollback(self):
-        """Revertir transacción"""
-        if self.connection:
-            self.connection.rollback()
+        """Revertir transacción (dentro de una unidad de trabajo, al salir del bloque)"""
+        if self.en_transaccion():
+            self._local.revertir = True
+            return
+        conexion = self._conexion_actual()
+        if conexion:
+            conexion.rollback()
     
     def close(self):
-        """Cerrar conexión"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-
+        """Cerrar todas las conexiones del pool"""
+        with self._pool_lock:
+            for conexion in self._conexiones:
+                conexion.close()
+            self._conexiones = []
+            self._pool = None
+        # Fuera del bloqueo: al descartarse, las conexiones prestadas
+        # intentan volver al pool
+        self._local = threading.local()
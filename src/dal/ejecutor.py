@@ -0,0 +1,145 @@
+"""
+Ejecutor de operaciones de BD para código asíncrono (asyncio)
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+from dal.database_manager import DatabaseManager
+from dal.escritor_agrupado import EscritorAgrupado
+
+
+class EjecutorBD:
+    """
+    Ejecuta en hilos las operaciones bloqueantes de la BD para que un event
+    loop no se detenga esperando a SQLite (Singleton).
+    Las escrituras van a un único hilo escritor, así nunca compiten por el
+    bloqueo de escritura; las lecturas se reparten entre varios hilos
+    lectores que, en modo WAL, no esperan a las escrituras.
+    Las lecturas con `clave` se agrupan: si ya hay una en curso con la misma
+    clave, las demás esperan su resultado en lugar de repetir la consulta
+    (el objeto devuelto es compartido).
+    Con activar_agrupado() las escrituras se confirman en lotes (ver
+    EscritorAgrupado) en lugar de una transacción por operación.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.db_manager = DatabaseManager.get_instance()
+        # Una conexión del pool queda para el hilo escritor
+        self.cantidad_lectores = max(1, self.db_manager.tamano_pool - 1)
+        self._escritor = None
+        self._lectores = None
+        self.agrupador = None
+        self._en_curso = {}  # (event loop, clave) -> tarea de la lectura
+        self._hilos_lock = threading.Lock()
+        self.lecturas = 0
+        self.agrupadas = 0
+        self.escrituras = 0
+        self._initialized = True
+
+    @classmethod
+    def get_instance(cls):
+        """Método para obtener la única instancia"""
+        return cls()
+
+    def _hilos(self):
+        """Crear los hilos la primera vez que se usan"""
+        if self._escritor is None:
+            with self._hilos_lock:
+                if self._escritor is None:
+                    self._lectores = ThreadPoolExecutor(self.cantidad_lectores,
+                                                        thread_name_prefix="bd-lector")
+                    self._escritor = ThreadPoolExecutor(1, thread_name_prefix="bd-escritor")
+
+    def _en_hilo(self, funcion: Callable, args: tuple) -> Any:
+        """Ejecutar la operación con una conexión del pool tomada solo mientras dura"""
+        with self.db_manager.conexion():
+            return funcion(*args)
+
+    def activar_agrupado(self, max_operaciones: int = EscritorAgrupado.MAX_OPERACIONES,
+                         espera_ms: float = EscritorAgrupado.ESPERA_MS):
+        """Confirmar las escrituras en lotes (group commit)"""
+        with self._hilos_lock:
+            if self.agrupador is None:
+                self.agrupador = EscritorAgrupado(max_operaciones, espera_ms)
+
+    async def _ejecutar(self, escritura: bool, funcion: Callable, args: tuple) -> Any:
+        if escritura and self.agrupador is not None:
+            return await asyncio.wrap_future(self.agrupador.enviar(funcion, *args))
+        self._hilos()
+        hilos = self._escritor if escritura else self._lectores
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(hilos, self._en_hilo, funcion, args)
+
+    async def leer(self, funcion: Callable, *args, clave: Optional[Hashable] = None) -> Any:
+        """Ejecutar una lectura en un hilo lector, agrupando las que comparten clave"""
+        self.lecturas += 1
+        try:
+            hash(clave)
+        except TypeError:  # p. ej. un cursor de paginación recibido como lista
+            clave = None
+        if clave is None:
+            return await self._ejecutar(False, funcion, args)
+
+        clave = (asyncio.get_running_loop(), clave)
+        tarea = self._en_curso.get(clave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(self._ejecutar(False, funcion, args))
+            self._en_curso[clave] = tarea
+            tarea.add_done_callback(lambda _tarea: self._terminar_lectura(clave, tarea))
+        else:
+            self.agrupadas += 1
+        # shield: si un solicitante se cancela, los demás siguen esperando
+        return await asyncio.shield(tarea)
+
+    def _terminar_lectura(self, clave: Hashable, tarea: asyncio.Future):
+        if self._en_curso.get(clave) is tarea:
+            del self._en_curso[clave]
+
+    async def escribir(self, funcion: Callable, *args) -> Any:
+        """Ejecutar una escritura en el hilo escritor"""
+        self.escrituras += 1
+        try:
+            return await self._ejecutar(True, funcion, args)
+        finally:
+            # Las lecturas que empiecen después no deben sumarse a una
+            # anterior a la escritura: podrían no ver sus cambios
+            loop = asyncio.get_running_loop()
+            for clave in [clave for clave in self._en_curso if clave[0] is loop]:
+                del self._en_curso[clave]
+
+    def estadisticas(self) -> dict:
+        """Contadores de lecturas, lecturas agrupadas y escrituras"""
+        estadisticas = {
+            'lecturas': self.lecturas,
+            'agrupadas': self.agrupadas,
+            'escrituras': self.escrituras,
+            'lectores': self.cantidad_lectores
+        }
+        if self.agrupador is not None:
+            estadisticas['confirmacion_agrupada'] = self.agrupador.estadisticas()
+        return estadisticas
+
+    def cerrar(self):
+        """Esperar las operaciones pendientes y detener los hilos"""
+        with self._hilos_lock:
+            if self.agrupador is not None:
+                self.agrupador.cerrar()
+                self.agrupador = None
+            if self._escritor is not None:
+                self._escritor.shutdown()
+                self._lectores.shutdown()
+                self._escritor = None
+                self._lectores = None
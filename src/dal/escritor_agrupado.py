@@ -0,0 +1,116 @@
+"""
+Confirmación agrupada (group commit) de escrituras
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+from dal.database_manager import DatabaseManager
+
+
+class EscritorAgrupado:
+    """
+    Hilo escritor que ejecuta las operaciones recibidas en lotes: hasta
+    `max_operaciones` por lote, esperando como mucho `espera_ms` desde la
+    primera. Cada lote es una única transacción (un solo commit, y con él
+    un solo fsync) y cada operación corre en su propio SAVEPOINT, así que
+    si una falla o se revierte no arrastra a las demás.
+    enviar() devuelve un Future que se resuelve recién después del commit
+    del lote, con el resultado de la operación o con su excepción.
+    """
+
+    MAX_OPERACIONES = 64
+    ESPERA_MS = 5.0
+
+    def __init__(self, max_operaciones: int = MAX_OPERACIONES, espera_ms: float = ESPERA_MS):
+        self.db_manager = DatabaseManager.get_instance()
+        self.max_operaciones = max_operaciones
+        self.espera = espera_ms / 1000
+        self.lotes = 0
+        self.operaciones = 0
+        self._cola: queue.Queue = queue.Queue()
+        self._cerrado = False
+        self._hilo = threading.Thread(target=self._procesar, name="bd-escritor-agrupado",
+                                      daemon=True)
+        self._hilo.start()
+
+    def enviar(self, funcion: Callable, *args) -> Future:
+        """Encolar una operación de escritura; devuelve un Future con su resultado"""
+        if self._cerrado:
+            raise RuntimeError("El escritor agrupado está cerrado")
+        futuro = Future()
+        self._cola.put((funcion, args, futuro))
+        return futuro
+
+    def _tomar_lote(self) -> List[Tuple[Callable, tuple, Future]]:
+        """Esperar la primera operación y juntar las que lleguen durante la espera"""
+        primera = self._cola.get()
+        if primera is None:
+            return []
+        lote = [primera]
+        limite = time.monotonic() + self.espera
+        while len(lote) < self.max_operaciones:
+            restante = limite - time.monotonic()
+            try:
+                operacion = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if operacion is None:
+                self._cola.put(None)  # Procesar este lote y luego terminar
+                break
+            lote.append(operacion)
+        return lote
+
+    def _procesar(self):
+        while True:
+            lote = self._tomar_lote()
+            if not lote:
+                return
+            # Las operaciones canceladas antes de empezar no se ejecutan
+            lote = [operacion for operacion in lote if operacion[2].set_running_or_notify_cancel()]
+            if lote:
+                self._ejecutar_lote(lote)
+
+    def _ejecutar_lote(self, lote: List[Tuple[Callable, tuple, Future]]):
+        """Ejecutar un lote en una transacción y resolver los futuros tras el commit"""
+        resultados = []
+        try:
+            with self.db_manager.conexion():
+                with self.db_manager.transaccion():
+                    for funcion, args, _ in lote:
+                        try:
+                            with self.db_manager.transaccion():
+                                resultados.append((True, funcion(*args)))
+                        except Exception as e:
+                            resultados.append((False, e))
+        except Exception as e:
+            # Falló el commit (o el BEGIN): no se confirmó ninguna operación
+            print(f"Error al confirmar un lote de {len(lote)} operaciones: {e}")
+            for _, _, futuro in lote:
+                futuro.set_exception(e)
+            return
+
+        self.lotes += 1
+        self.operaciones += len(lote)
+        for (_, _, futuro), (correcto, valor) in zip(lote, resultados):
+            if correcto:
+                futuro.set_result(valor)
+            else:
+                futuro.set_exception(valor)
+
+    def estadisticas(self) -> dict:
+        """Lotes confirmados y tamaño promedio"""
+        return {
+            'lotes': self.lotes,
+            'operaciones': self.operaciones,
+            'promedio_por_lote': self.operaciones / self.lotes if self.lotes else 0.0,
+            'pendientes': self._cola.qsize()
+        }
+
+    def cerrar(self):
+        """Confirmar lo pendiente y detener el hilo"""
+        if not self._cerrado:
+            self._cerrado = True
+            self._cola.put(None)
+            self._hilo.join()
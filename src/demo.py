@@ -11,6 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from controller.libro_controller import LibroController
 from controller.socio_controller import SocioController
 from controller.prestamo_controller import PrestamoController
+from controller.reporte_controller import ReporteController
 from dal.database_manager import DatabaseManager
 
 
@@ -35,6 +36,7 @@ def demo():
     libro_ctrl = LibroController()
     socio_ctrl = SocioController()
     prestamo_ctrl = PrestamoController()
+    reporte_ctrl = ReporteController()
     
     # 1. Verificar Singleton
     separador("1. VERIFICANDO PATRÓN SINGLETON")
@@ -45,6 +47,9 @@ def demo():
     print(f"¿Son la misma instancia? {db1 is db2}")
     print("✓ Patrón Singleton funcionando correctamente")
     
+    prestamo_ctrl.service.repo_prestamo.verificar_indices()
+    print(f"✓ Esquema en versión {db1.version_esquema()}: las consultas críticas usan sus índices")
+    
     # 2. Registrar libros
     separador("2. REGISTRANDO LIBROS EN EL CATÁLOGO")
     libros = [
@@ -136,27 +141,23 @@ def demo():
     
     # 10. Resumen final
     separador("10. RESUMEN FINAL DEL SISTEMA")
-    total_libros = len(libro_ctrl.listar_todos())
-    libros_disponibles = len(libro_ctrl.listar_disponibles())
-    total_socios = len(socio_ctrl.listar_todos())
-    socios_activos = len(socio_ctrl.listar_activos())
-    prestamos_activos = len(prestamo_ctrl.listar_prestamos_activos())
+    resumen = reporte_ctrl.resumen_general()
     
     print(f"📚 LIBROS")
-    print(f"   Total de títulos:      {total_libros}")
-    print(f"   Títulos disponibles:   {libros_disponibles}")
+    print(f"   Total de títulos:      {resumen['total_libros']}")
+    print(f"   Títulos disponibles:   {resumen['libros_disponibles']}")
     print(f"\n👥 SOCIOS")
-    print(f"   Total de socios:       {total_socios}")
-    print(f"   Socios activos:        {socios_activos}")
+    print(f"   Total de socios:       {resumen['total_socios']}")
+    print(f"   Socios activos:        {resumen['socios_activos']}")
     print(f"\n📖 PRÉSTAMOS")
-    print(f"   Préstamos activos:     {prestamos_activos}")
+    print(f"   Préstamos activos:     {resumen['prestamos_activos']}")
     
     # 11. Verificar arquitectura en capas
     separador("11. ARQUITECTURA EN CAPAS")
     print("✓ VIEW       → Menu (interfaz de usuario)")
-    print("✓ CONTROLLER → LibroController, SocioController, PrestamoController")
-    print("✓ SERVICE    → LibroService, SocioService, PrestamoService")
-    print("✓ REPOSITORY → LibroRepository, SocioRepository, PrestamoRepository")
+    print("✓ CONTROLLER → LibroController, SocioController, PrestamoController, ReporteController")
+    print("✓ SERVICE    → LibroService, SocioService, PrestamoService, ReporteService")
+    print("✓ REPOSITORY → LibroRepository, SocioRepository, PrestamoRepository, ReporteRepository")
     print("✓ DAL        → DatabaseManager (Singleton)")
     print("✓ DATABASE   → biblioteca.db (SQLite)")
     
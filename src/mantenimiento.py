@@ -0,0 +1,112 @@
+"""
+Tareas de mantenimiento por lotes del sistema de biblioteca
+Uso: python mantenimiento.py vencimientos [--fecha AAAA-MM-DD] [--avisos archivo.csv]
+     python mantenimiento.py reconciliar [--solo-informar]
+     python mantenimiento.py reindexar
+"""
+import argparse
+import csv
+import sys
+from datetime import date
+from pathlib import Path
+
+# Agregar el directorio src al path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from repository.libro_repository import LibroRepository
+from service.prestamo_service import PrestamoService
+
+
+def procesar_vencimientos(args):
+    """Calcular multas de préstamos vencidos y, opcionalmente, exportar avisos"""
+    fecha_corte = date.fromisoformat(args.fecha) if args.fecha else date.today()
+    service = PrestamoService()
+    
+    resultado = service.procesar_vencimientos(fecha_corte)
+    if not resultado:
+        print("✗ No se pudo procesar los vencimientos")
+        return 1
+    
+    print(f"Fecha de corte:        {resultado['fecha_corte']}")
+    print(f"Préstamos vencidos:    {resultado['vencidos']}")
+    print(f"Multa total acumulada: ${resultado['multa_total']:.2f}")
+    print(f"Tiempo:                {resultado['segundos']:.3f} s "
+          f"({resultado['prestamos_por_segundo']:.0f} préstamos/s)")
+    
+    if args.avisos:
+        with open(args.avisos, "w", newline="", encoding="utf-8") as archivo:
+            escritor = None
+            cantidad = 0
+            for aviso in service.avisos_vencimiento(fecha_corte):
+                if escritor is None:
+                    escritor = csv.DictWriter(archivo, fieldnames=list(aviso))
+                    escritor.writeheader()
+                escritor.writerow(aviso)
+                cantidad += 1
+        print(f"✓ {cantidad} avisos exportados a {args.avisos}")
+    
+    return 0
+
+
+def reconciliar_contadores(args):
+    """Recalcular los contadores desnormalizados e informar las diferencias"""
+    service = PrestamoService()
+    
+    resultado = service.reconciliar_contadores(corregir=not args.solo_informar)
+    if not resultado:
+        print("✗ No se pudo reconciliar los contadores")
+        return 1
+    
+    for diferencia in resultado['libros']:
+        print(f"  Libro {diferencia['isbn']}: disponibles {diferencia['registrado']} "
+              f"→ {diferencia['esperado']}")
+    for diferencia in resultado['socios']:
+        print(f"  Socio {diferencia['id_socio']}: "
+              f"prestados {diferencia['libros_registrados']} → {diferencia['libros_esperados']}, "
+              f"multas ${diferencia['saldo_registrado']:.2f} → ${diferencia['saldo_esperado']:.2f}")
+    
+    accion = "corregidas" if resultado['corregido'] else "encontradas"
+    print(f"Diferencias {accion}: {len(resultado['libros'])} libros, "
+          f"{len(resultado['socios'])} socios ({resultado['segundos']:.3f} s)")
+    return 0
+
+
+def reindexar(args):
+    """Reconstruir el índice de búsqueda de texto del catálogo"""
+    if not LibroRepository().reconstruir_indice_texto():
+        print("✗ No se pudo reconstruir el índice de búsqueda")
+        return 1
+    print("✓ Índice de búsqueda reconstruido")
+    return 0
+
+
+def main():
+    """Punto de entrada de las tareas de mantenimiento"""
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de la biblioteca")
+    subparsers = parser.add_subparsers(dest="tarea", required=True)
+    
+    vencimientos = subparsers.add_parser(
+        "vencimientos", help="Calcular multas de todos los préstamos vencidos"
+    )
+    vencimientos.add_argument("--fecha", help="Fecha de corte (AAAA-MM-DD), por defecto hoy")
+    vencimientos.add_argument("--avisos", help="Archivo CSV donde exportar los avisos de vencimiento")
+    vencimientos.set_defaults(funcion=procesar_vencimientos)
+    
+    reconciliar = subparsers.add_parser(
+        "reconciliar", help="Recalcular ejemplares disponibles, libros prestados y saldos de multas"
+    )
+    reconciliar.add_argument("--solo-informar", action="store_true",
+                             help="Informar las diferencias sin corregirlas")
+    reconciliar.set_defaults(funcion=reconciliar_contadores)
+    
+    reindexar_parser = subparsers.add_parser(
+        "reindexar", help="Reconstruir el índice de búsqueda de texto del catálogo"
+    )
+    reindexar_parser.set_defaults(funcion=reindexar)
+    
+    args = parser.parse_args()
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
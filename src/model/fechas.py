@@ -0,0 +1,12 @@
+"""
+Conversión diferida de fechas de los modelos
+"""
+from datetime import date
+from typing import Optional, Union
+
+
+def a_fecha(valor: Optional[Union[date, str]]) -> Optional[date]:
+    """Convertir una fecha ISO leída de la BD ('AAAA-MM-DD') en date"""
+    if valor is None or isinstance(valor, date):
+        return valor
+    return date.fromisoformat(valor[:10])
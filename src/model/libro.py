@@ -6,6 +6,9 @@ Modelo de dominio: Libro
 class Libro:
     """Clase que representa un libro en el catálogo"""
     
+    __slots__ = ('isbn', 'titulo', 'autor', 'categoria',
+                 'total_ejemplares', 'ejemplares_disponibles')
+    
     def __init__(self, isbn: str, titulo: str, autor: str, 
                  categoria: str = "", total_ejemplares: int = 1,
                  ejemplares_disponibles: int = 1):
@@ -2,7 +2,8 @@
 Modelo de dominio: Préstamo
 """
 from datetime import date, timedelta
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Union
+from .fechas import a_fecha
 
 if TYPE_CHECKING:
     from .socio import Socio
@@ -15,22 +16,57 @@ class Prestamo:
     DIAS_PRESTAMO = 14
     MULTA_POR_DIA = 10.0  # Multa en pesos por día de retraso
     
+    __slots__ = ('id_prestamo', 'socio', 'libro', '_fecha_prestamo',
+                 '_fecha_devolucion_esperada', '_fecha_devolucion_real', 'estado')
+    
     def __init__(self, id_prestamo: int, socio: 'Socio', libro: 'Libro',
-                 fecha_prestamo: date = None,
-                 fecha_devolucion_esperada: date = None,
-                 fecha_devolucion_real: date = None,
+                 fecha_prestamo: Union[date, str] = None,
+                 fecha_devolucion_esperada: Union[date, str] = None,
+                 fecha_devolucion_real: Union[date, str] = None,
                  estado: str = "activo"):
         self.id_prestamo = id_prestamo
         self.socio = socio
         self.libro = libro
-        self.fecha_prestamo = fecha_prestamo or date.today()
-        self.fecha_devolucion_esperada = (
-            fecha_devolucion_esperada or 
-            self.fecha_prestamo + timedelta(days=self.DIAS_PRESTAMO)
-        )
-        self.fecha_devolucion_real = fecha_devolucion_real
+        # Las fechas pueden llegar como texto ISO desde la BD; se convierten al leerlas
+        self._fecha_prestamo = fecha_prestamo or date.today()
+        self._fecha_devolucion_esperada = fecha_devolucion_esperada
+        self._fecha_devolucion_real = fecha_devolucion_real
         self.estado = estado
     
+    @property
+    def fecha_prestamo(self) -> date:
+        if not isinstance(self._fecha_prestamo, date):
+            self._fecha_prestamo = a_fecha(self._fecha_prestamo)
+        return self._fecha_prestamo
+    
+    @fecha_prestamo.setter
+    def fecha_prestamo(self, valor: Union[date, str]):
+        self._fecha_prestamo = valor
+    
+    @property
+    def fecha_devolucion_esperada(self) -> date:
+        """Vencimiento (por defecto, DIAS_PRESTAMO después del préstamo)"""
+        if not isinstance(self._fecha_devolucion_esperada, date):
+            self._fecha_devolucion_esperada = (
+                a_fecha(self._fecha_devolucion_esperada) or
+                self.fecha_prestamo + timedelta(days=self.DIAS_PRESTAMO)
+            )
+        return self._fecha_devolucion_esperada
+    
+    @fecha_devolucion_esperada.setter
+    def fecha_devolucion_esperada(self, valor: Union[date, str]):
+        self._fecha_devolucion_esperada = valor
+    
+    @property
+    def fecha_devolucion_real(self) -> Optional[date]:
+        if self._fecha_devolucion_real is not None and not isinstance(self._fecha_devolucion_real, date):
+            self._fecha_devolucion_real = a_fecha(self._fecha_devolucion_real)
+        return self._fecha_devolucion_real
+    
+    @fecha_devolucion_real.setter
+    def fecha_devolucion_real(self, valor: Union[date, str]):
+        self._fecha_devolucion_real = valor
+    
     def esta_vencido(self) -> bool:
         """Verifica si el préstamo está vencido"""
         if self.estado == "devuelto":
@@ -2,6 +2,8 @@
 Modelo de dominio: Socio
 """
 from datetime import date
+from typing import Union
+from .fechas import a_fecha
 
 
 class Socio:
@@ -9,26 +11,42 @@ class Socio:
     
     MAX_LIBROS_PERMITIDOS = 3
     
+    __slots__ = ('id_socio', 'nombre', 'email', 'telefono', '_fecha_registro',
+                 'activo', 'libros_prestados', 'saldo_multas')
+    
     def __init__(self, id_socio: int, nombre: str, email: str,
-                 telefono: str = "", fecha_registro: date = None,
-                 activo: bool = True, libros_prestados: int = 0):
+                 telefono: str = "", fecha_registro: Union[date, str] = None,
+                 activo: bool = True, libros_prestados: int = 0,
+                 saldo_multas: float = 0.0):
         self.id_socio = id_socio
         self.nombre = nombre
         self.email = email
         self.telefono = telefono
-        self.fecha_registro = fecha_registro or date.today()
+        self._fecha_registro = fecha_registro  # Se convierte al leerla
         self.activo = activo
         self.libros_prestados = libros_prestados
+        self.saldo_multas = saldo_multas
+    
+    @property
+    def fecha_registro(self) -> date:
+        """Fecha de registro (hoy si no se indicó)"""
+        if not isinstance(self._fecha_registro, date):
+            self._fecha_registro = a_fecha(self._fecha_registro) or date.today()
+        return self._fecha_registro
+    
+    @fecha_registro.setter
+    def fecha_registro(self, valor: Union[date, str]):
+        self._fecha_registro = valor
     
     def puede_realizar_prestamo(self) -> bool:
         """Verifica si el socio puede realizar un préstamo"""
         return (self.activo and 
-                self.libros_prestados < self.MAX_LIBROS_PERMITIDOS)
+                self.libros_prestados < self.MAX_LIBROS_PERMITIDOS and
+                not self.tiene_multas_pendientes())
     
     def tiene_multas_pendientes(self) -> bool:
-        """Verifica si tiene multas pendientes"""
-        # Esta lógica se implementaría consultando la BD
-        return False
+        """Verifica si tiene multas pendientes (saldo mantenido en la BD)"""
+        return self.saldo_multas > 0
     
     def __repr__(self):
         return f"Socio(id={self.id_socio}, nombre='{self.nombre}', " \
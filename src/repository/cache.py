@@ -0,0 +1,89 @@
+"""
+Caché en memoria LRU con expiración opcional para los repositorios
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class CacheLRU:
+    """
+    Caché acotada con desalojo LRU y TTL opcional. Thread-safe.
+    Para no guardar datos leídos antes de una invalidación concurrente,
+    las lecturas toman una marca() antes de consultar la BD y la pasan
+    a guardar(); si hubo invalidaciones en el medio, el valor se descarta.
+    """
+
+    def __init__(self, tamano_maximo: int = 1024, ttl: Optional[float] = None):
+        self.tamano_maximo = tamano_maximo
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos = OrderedDict()  # clave -> (valor, vencimiento)
+        self._invalidaciones = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: Hashable) -> Optional[Any]:
+        """Devolver el valor cacheado o None si no está (o venció)"""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                valor, vencimiento = entrada
+                if vencimiento is None or vencimiento > time.monotonic():
+                    self._datos.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._datos[clave]
+            self.fallos += 1
+            return None
+
+    def marca(self) -> int:
+        """Marca de invalidaciones a tomar antes de leer de la BD"""
+        return self._invalidaciones
+
+    def guardar(self, clave: Hashable, valor: Any, marca: Optional[int] = None):
+        """Guardar un valor, desalojando el menos usado si se supera el tamaño"""
+        if self.tamano_maximo <= 0:
+            return
+        vencimiento = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if marca is not None and marca != self._invalidaciones:
+                return
+            self._datos[clave] = (valor, vencimiento)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.tamano_maximo:
+                self._datos.popitem(last=False)
+
+    def actualizar(self, clave: Hashable, funcion: Callable[[Any], None]):
+        """Aplicar una modificación al valor cacheado, si está (write-through)"""
+        with self._lock:
+            self._invalidaciones += 1
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                funcion(entrada[0])
+
+    def invalidar(self, clave: Hashable):
+        """Quitar una clave de la caché"""
+        with self._lock:
+            self._invalidaciones += 1
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        """Vaciar la caché (los contadores se conservan)"""
+        with self._lock:
+            self._invalidaciones += 1
+            self._datos.clear()
+
+    def estadisticas(self) -> dict:
+        """Tamaño actual y contadores de aciertos/fallos"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'tamano': len(self._datos),
+                'tamano_maximo': self.tamano_maximo,
+                'ttl': self.ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0
+            }
@@ -0,0 +1,203 @@
+"""
+Índice de trigramas en memoria para búsquedas tolerantes a errores de tipeo
+"""
+import heapq
+import re
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+PATRON_PALABRA = re.compile(r"[^\W\d_]+")  # Solo letras: los números no ayudan a encontrar a alguien
+
+
+def normalizar(texto: str) -> str:
+    """Pasar a minúsculas y quitar acentos"""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    return "".join(c for c in unicodedata.normalize("NFKD", texto)
+                   if not unicodedata.combining(c))
+
+
+def palabras(texto: str) -> List[str]:
+    """Palabras normalizadas de un texto"""
+    return PATRON_PALABRA.findall(normalizar(texto))
+
+
+def trigramas(palabra: str) -> Set[str]:
+    """Trigramas de una palabra, con relleno para dar peso al comienzo y al final"""
+    relleno = f"  {palabra} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class IndiceTrigramas:
+    """
+    Índice en dos niveles: trigramas -> palabras del vocabulario y
+    palabra -> ids de documentos. Cada palabra de la consulta se expande a
+    las palabras parecidas del vocabulario (similitud de trigramas) y un
+    documento suma la mejor similitud que obtiene con cada palabra de la
+    consulta. Como el vocabulario es mucho menor que la cantidad de
+    documentos, la búsqueda no recorre todos los documentos. Thread-safe.
+    """
+
+    MAX_EXPANSIONES = 20  # Palabras parecidas consideradas por palabra de la consulta
+    LARGO_MINIMO = 2  # Las iniciales sueltas coinciden con demasiados documentos
+
+    def __init__(self):
+        self.iniciado = False  # Desde que empieza la carga hay que indexar las altas
+        self.construido = False
+        self._vocabulario: Dict[str, int] = {}  # palabra -> id de palabra
+        self._tamanos = array("l")  # id de palabra -> cantidad de trigramas
+        self._trigramas: Dict[str, array] = {}  # trigrama -> ids de palabra
+        self._documentos: List[array] = []  # id de palabra -> ids de documento
+        self._indexados: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._indexados)
+
+    def _id_palabra(self, palabra: str) -> int:
+        """Id de una palabra, agregándola al vocabulario si es nueva"""
+        id_palabra = self._vocabulario.get(palabra)
+        if id_palabra is None:
+            id_palabra = len(self._documentos)
+            self._vocabulario[palabra] = id_palabra
+            self._documentos.append(array("l"))
+            claves = trigramas(palabra)
+            self._tamanos.append(len(claves))
+            for clave in claves:
+                ids = self._trigramas.get(clave)
+                if ids is None:
+                    self._trigramas[clave] = array("l", (id_palabra,))
+                else:
+                    ids.append(id_palabra)
+        return id_palabra
+
+    def _agregar(self, id_documento: int, texto: str):
+        if id_documento in self._indexados:
+            return
+        self._indexados.add(id_documento)
+        for palabra in set(palabras(texto)):
+            if len(palabra) < self.LARGO_MINIMO:
+                continue
+            self._documentos[self._id_palabra(palabra)].append(id_documento)
+
+    def agregar(self, id_documento: int, texto: str):
+        """Indexar un documento (los ids ya indexados se ignoran)"""
+        with self._lock:
+            self._agregar(id_documento, texto)
+
+    def construir(self, documentos: Iterable[Tuple[int, str]]):
+        """Cargar en bloque los documentos existentes"""
+        with self._lock:
+            self.iniciado = True
+            for id_documento, texto in documentos:
+                self._agregar(id_documento, texto)
+            self.construido = True
+
+    def limpiar(self):
+        """Vaciar el índice"""
+        with self._lock:
+            self._vocabulario = {}
+            self._tamanos = array("l")
+            self._trigramas = {}
+            self._documentos = []
+            self._indexados = set()
+            self.iniciado = False
+            self.construido = False
+
+    def _similares(self, palabra: str, umbral: float) -> List[Tuple[int, float]]:
+        """Palabras del vocabulario parecidas a `palabra`: (id, similitud de Jaccard)"""
+        consulta = trigramas(palabra)
+        coincidencias = Counter()
+        for clave in consulta:
+            coincidencias.update(self._trigramas.get(clave, ()))
+        # La similitud nunca supera comunes / len(consulta): al recorrer de
+        # más a menos trigramas en común se corta apenas no puede mejorar
+        similares = []
+        for id_palabra, comunes in coincidencias.most_common():
+            cota = comunes / len(consulta)
+            if cota < umbral or (len(similares) == self.MAX_EXPANSIONES and cota <= similares[0][0]):
+                break
+            similitud = comunes / (len(consulta) + self._tamanos[id_palabra] - comunes)
+            if similitud < umbral:
+                continue
+            if len(similares) < self.MAX_EXPANSIONES:
+                heapq.heappush(similares, (similitud, id_palabra))
+            elif similitud > similares[0][0]:
+                heapq.heapreplace(similares, (similitud, id_palabra))
+        return [(id_palabra, similitud) for similitud, id_palabra in similares]
+
+    def _expandir(self, palabra: str, umbral: float, limite: int) -> List[Tuple[array, float]]:
+        """
+        Listas de documentos de las palabras parecidas, de mayor a menor
+        similitud. Si la palabra existe tal cual y alcanza para `limite`
+        resultados, no hace falta buscar parecidas.
+        """
+        id_palabra = self._vocabulario.get(palabra)
+        if id_palabra is not None and len(self._documentos[id_palabra]) >= limite:
+            return [(self._documentos[id_palabra], 1.0)]
+        similares = sorted(self._similares(palabra, umbral), key=lambda par: par[1], reverse=True)
+        return [(self._documentos[id_palabra], similitud) for id_palabra, similitud in similares]
+
+    @staticmethod
+    def _primeros(listas: List[Tuple[array, float]], limite: int) -> Dict[int, float]:
+        """Los primeros `limite` documentos de las listas, con su mejor similitud"""
+        resultado = {}
+        for ids, similitud in listas:
+            for id_documento in ids:
+                if id_documento not in resultado:
+                    resultado[id_documento] = similitud
+                    if len(resultado) == limite:
+                        return resultado
+        return resultado
+
+    def buscar(self, texto: str, limite: int = 10,
+               umbral: float = 0.3) -> List[Tuple[int, float]]:
+        """
+        Devolver hasta `limite` pares (id, similitud) con similitud >= umbral,
+        de mayor a menor. La similitud es el promedio, entre las palabras de
+        la consulta, de la mejor coincidencia en el documento.
+        """
+        consulta = [palabra for palabra in dict.fromkeys(palabras(texto))
+                    if len(palabra) >= self.LARGO_MINIMO]
+        if not consulta or limite <= 0:
+            return []
+
+        with self._lock:
+            expandidas = [self._expandir(palabra, umbral, limite) for palabra in consulta]
+            if len(expandidas) == 1:
+                # Una sola palabra: las listas ya vienen ordenadas por similitud
+                return list(self._primeros(expandidas[0], limite).items())
+
+            # Para cada palabra: id de documento -> mejor similitud
+            por_palabra = []
+            for listas in expandidas:
+                similitudes = {}
+                for ids, similitud in reversed(listas):
+                    similitudes.update(dict.fromkeys(ids, similitud))
+                por_palabra.append(similitudes)
+
+            # Primero los documentos que coinciden con todas las palabras; si
+            # no alcanzan, también los mejores de cada palabra por separado
+            ordenadas = sorted(por_palabra, key=len)
+            candidatos = set(ordenadas[0])
+            for similitudes in ordenadas[1:]:
+                candidatos.intersection_update(similitudes.keys())
+            if len(candidatos) < limite:
+                for listas in expandidas:
+                    candidatos.update(self._primeros(listas, limite))
+
+        puntajes = {
+            id_documento: sum(similitudes.get(id_documento, 0.0)
+                              for similitudes in por_palabra) / len(por_palabra)
+            for id_documento in candidatos
+        }
+        mejores = heapq.nlargest(
+            limite, candidatos, key=lambda id_documento: (puntajes[id_documento], -id_documento)
+        )
+        return [(id_documento, puntajes[id_documento]) for id_documento in mejores
+                if puntajes[id_documento] >= umbral]
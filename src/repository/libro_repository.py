@@ -1,18 +1,75 @@
 """
 Repositorio para gestionar libros en la base de datos
 """
-from typing import List, Optional
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from model.libro import Libro
-from dal.database_manager import DatabaseManager
+from dal.database_manager import DatabaseManager, con_conexion
+from repository.cache import CacheLRU
+from repository.mapeo import COLUMNAS_LIBRO, columnas, libro_desde_fila, mapear
 
 
 class LibroRepository:
     """Repositorio para gestionar libros en la base de datos"""
     
+    # Caché de buscar_por_isbn compartida por todas las instancias. Otros
+    # procesos escriben sin avisar a esta caché: el TTL acota cuánto puede
+    # quedar desactualizada
+    TTL_CACHE = 30.0  # Segundos
+    cache = CacheLRU(tamano_maximo=10000, ttl=TTL_CACHE)
+    
+    SELECT_LIBROS = f"SELECT {columnas(COLUMNAS_LIBRO)} FROM libros"
+    
+    TAMANO_LOTE = 500  # Filas por fetchmany en los recorridos
+    
     def __init__(self):
         self.db_manager = DatabaseManager.get_instance()
         self.db_manager.connect()
     
+    @classmethod
+    def configurar_cache(cls, tamano_maximo: int, ttl: Optional[float] = TTL_CACHE):
+        """Ajustar el tamaño máximo y el TTL (segundos, None sin vencimiento) de la caché"""
+        cls.cache.tamano_maximo = tamano_maximo
+        cls.cache.ttl = ttl
+        cls.cache.limpiar()
+    
+    @classmethod
+    def estadisticas_cache(cls) -> dict:
+        """Aciertos, fallos y ocupación de la caché de libros"""
+        return cls.cache.estadisticas()
+    
+    def _invalidar(self, isbn: str):
+        """Quitar un libro de la caché ahora y de nuevo al confirmar la transacción"""
+        self.cache.invalidar(isbn)
+        self.db_manager.al_confirmar(lambda: self.cache.invalidar(isbn))
+    
+    def _escribir_disponibles(self, isbns: Iterable[str]):
+        """Reflejar en los libros cacheados los ejemplares disponibles al confirmar"""
+        isbns = list(isbns)
+        marcadores = ", ".join("?" * len(isbns))
+        cursor = self.db_manager.execute_query(
+            f"SELECT isbn, ejemplares_disponibles FROM libros WHERE isbn IN ({marcadores})",
+            tuple(isbns)
+        )
+        for row in cursor.fetchall():
+            self._escribir_en_cache(row['isbn'], row['ejemplares_disponibles'])
+    
+    def _escribir_en_cache(self, isbn: str, ejemplares_disponibles: int):
+        """Actualizar el libro cacheado cuando se confirme la transacción"""
+        def aplicar(libro: Libro):
+            libro.ejemplares_disponibles = ejemplares_disponibles
+        self.db_manager.al_confirmar(lambda: self.cache.actualizar(isbn, aplicar))
+    
+    def _indexar_nuevos(self, id_previo: int):
+        """Agregar al índice de texto los libros insertados después de `id_previo`"""
+        self.db_manager.execute_query(
+            '''
+            INSERT INTO libros_fts (rowid, titulo, autor, categoria)
+            SELECT id_libro, titulo, autor, categoria FROM libros WHERE id_libro > ?
+            ''',
+            (id_previo,)
+        )
+    
     def crear(self, libro: Libro) -> bool:
         """Crear un nuevo libro"""
         try:
@@ -21,93 +78,357 @@ class LibroRepository:
                                    total_ejemplares, ejemplares_disponibles)
                 VALUES (?, ?, ?, ?, ?, ?)
             '''
-            self.db_manager.execute_query(query, (
-                libro.isbn, libro.titulo, libro.autor, libro.categoria,
-                libro.total_ejemplares, libro.ejemplares_disponibles
-            ))
+            with self.db_manager.transaccion():
+                cursor = self.db_manager.execute_query(query, (
+                    libro.isbn, libro.titulo, libro.autor, libro.categoria,
+                    libro.total_ejemplares, libro.ejemplares_disponibles
+                ))
+                self.db_manager.execute_query(
+                    "INSERT INTO libros_fts (rowid, titulo, autor, categoria) VALUES (?, ?, ?, ?)",
+                    (cursor.lastrowid, libro.titulo, libro.autor, libro.categoria)
+                )
+                self._invalidar(libro.isbn)
+            return True
+        except Exception as e:
+            print(f"Error al crear libro: {e}")
+            return False
+    
+    def crear_lote(self, libros: List[Libro]) -> Optional[int]:
+        """Insertar varios libros con executemany, ignorando ISBN ya existentes"""
+        try:
+            query = '''
+                INSERT INTO libros (isbn, titulo, autor, categoria,
+                                   total_ejemplares, ejemplares_disponibles)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(isbn) DO NOTHING
+            '''
+            with self.db_manager.transaccion():
+                id_previo = self.db_manager.execute_query(
+                    "SELECT COALESCE(MAX(id_libro), 0) FROM libros"
+                ).fetchone()[0]
+                cursor = self.db_manager.execute_many(query, (
+                    (libro.isbn, libro.titulo, libro.autor, libro.categoria,
+                     libro.total_ejemplares, libro.ejemplares_disponibles)
+                    for libro in libros
+                ))
+                insertados = cursor.rowcount
+                self._indexar_nuevos(id_previo)
+            return insertados
+        except Exception as e:
+            print(f"Error al crear libros en lote: {e}")
+            return None
+    
+    @con_conexion
+    def buscar_texto(self, texto: str, limite: int = 20) -> List[Libro]:
+        """
+        Buscar libros por palabras del título, autor o categoría (FTS5).
+        Cada palabra se busca como prefijo, sin distinguir acentos, y los
+        resultados se ordenan por relevancia (bm25).
+        """
+        palabras = re.findall(r"\w+", texto)
+        if not palabras:
+            return []
+        # Las palabras de una letra se buscan completas: como prefijo
+        # coincidirían con casi todo el catálogo
+        consulta = " ".join(
+            f'"{palabra}"*' if len(palabra) > 1 else f'"{palabra}"' for palabra in palabras
+        )
+        query = f'''
+            SELECT {columnas(COLUMNAS_LIBRO, "l")}
+            FROM libros_fts f
+            JOIN libros l ON l.id_libro = f.rowid
+            WHERE libros_fts MATCH ?
+            ORDER BY f.rank
+            LIMIT ?
+        '''
+        cursor = self.db_manager.execute_query(query, (consulta, limite))
+        return mapear(cursor, libro_desde_fila).fetchall()
+    
+    @con_conexion
+    def reconstruir_indice_texto(self) -> bool:
+        """Reconstruir el índice de texto completo desde la tabla libros"""
+        try:
+            self.db_manager.execute_query("INSERT INTO libros_fts(libros_fts) VALUES ('rebuild')")
             self.db_manager.commit()
             return True
         except Exception as e:
             self.db_manager.rollback()
-            print(f"Error al crear libro: {e}")
+            print(f"Error al reconstruir el índice de búsqueda: {e}")
             return False
     
-    def buscar_por_isbn(self, isbn: str) -> Optional[Libro]:
-        """Buscar un libro por ISBN"""
-        query = "SELECT * FROM libros WHERE isbn = ?"
+    @con_conexion
+    def isbns_existentes(self, isbns: Iterable[str]) -> Set[str]:
+        """Devolver cuáles de los ISBN indicados ya están registrados"""
+        isbns = list(isbns)
+        if not isbns:
+            return set()
+        marcadores = ", ".join("?" * len(isbns))
+        query = f"SELECT isbn FROM libros WHERE isbn IN ({marcadores})"
+        cursor = self.db_manager.execute_query(query, tuple(isbns))
+        return {row['isbn'] for row in cursor.fetchall()}
+    
+    @staticmethod
+    def _copiar(origen: Libro, destino: Libro):
+        """Copiar los datos de un libro recién leído sobre el cacheado"""
+        for atributo in Libro.__slots__:
+            setattr(destino, atributo, getattr(origen, atributo))
+    
+    @con_conexion
+    def buscar_por_isbn(self, isbn: str, refrescar: bool = False) -> Optional[Libro]:
+        """
+        Buscar un libro por ISBN (con caché de lectura). Con `refrescar` la
+        fila se vuelve a leer y se copia sobre el libro cacheado: usarlo al
+        comienzo de una transacción, antes de modificar la fila.
+        """
+        cacheado = self.cache.obtener(isbn)
+        if cacheado is not None and not refrescar:
+            return cacheado
+        
+        marca = self.cache.marca()
+        query = f"{self.SELECT_LIBROS} WHERE isbn = ?"
         cursor = self.db_manager.execute_query(query, (isbn,))
-        row = cursor.fetchone()
+        libro = mapear(cursor, libro_desde_fila).fetchone()
         
-        if row:
-            return Libro(
-                isbn=row['isbn'],
-                titulo=row['titulo'],
-                autor=row['autor'],
-                categoria=row['categoria'],
-                total_ejemplares=row['total_ejemplares'],
-                ejemplares_disponibles=row['ejemplares_disponibles']
-            )
-        return None
+        if libro is None:
+            return None
+        if cacheado is not None:
+            self.cache.actualizar(isbn, lambda destino: self._copiar(libro, destino))
+            return cacheado
+        # Dentro de una transacción la fila puede no estar confirmada
+        # (salvo al refrescar, que se hace antes de modificarla)
+        if refrescar or not self.db_manager.en_transaccion():
+            self.cache.guardar(isbn, libro, marca)
+        return libro
     
-    def listar_todos(self) -> List[Libro]:
-        """Listar todos los libros"""
-        query = "SELECT * FROM libros ORDER BY titulo"
-        cursor = self.db_manager.execute_query(query)
+    @con_conexion
+    def buscar_por_isbns(self, isbns: Iterable[str], refrescar: bool = False) -> Dict[str, Libro]:
+        """Buscar varios libros a la vez (caché + una única consulta IN)"""
+        isbns = set(isbns)
+        libros = {}
+        cacheados = {}
+        for isbn in isbns:
+            libro = self.cache.obtener(isbn)
+            if libro is None:
+                continue
+            if refrescar:
+                cacheados[isbn] = libro
+            else:
+                libros[isbn] = libro
+        faltantes = [isbn for isbn in isbns if isbn not in libros]
+        if not faltantes:
+            return libros
         
-        libros = []
-        for row in cursor.fetchall():
-            libros.append(Libro(
-                isbn=row['isbn'],
-                titulo=row['titulo'],
-                autor=row['autor'],
-                categoria=row['categoria'],
-                total_ejemplares=row['total_ejemplares'],
-                ejemplares_disponibles=row['ejemplares_disponibles']
-            ))
+        marca = self.cache.marca()
+        marcadores = ", ".join("?" * len(faltantes))
+        query = f"{self.SELECT_LIBROS} WHERE isbn IN ({marcadores})"
+        cursor = self.db_manager.execute_query(query, tuple(faltantes))
+        # Dentro de una transacción la fila puede no estar confirmada
+        # (salvo al refrescar, que se hace antes de modificarla)
+        guardar = refrescar or not self.db_manager.en_transaccion()
+        leidos = []
+        for libro in mapear(cursor, libro_desde_fila):
+            if libro.isbn in cacheados:
+                leidos.append(libro)
+                libros[libro.isbn] = cacheados[libro.isbn]
+            else:
+                libros[libro.isbn] = libro
+                if guardar:
+                    self.cache.guardar(libro.isbn, libro, marca)
+        # Después de guardar: actualizar() cambia la marca de invalidaciones
+        for libro in leidos:
+            self.cache.actualizar(libro.isbn, lambda destino, origen=libro: self._copiar(origen, destino))
         return libros
     
+    def listar_todos(self) -> List[Libro]:
+        """Listar todos los libros"""
+        return list(self.iterar_todos())
+    
     def listar_disponibles(self) -> List[Libro]:
         """Listar libros disponibles"""
-        query = "SELECT * FROM libros WHERE ejemplares_disponibles > 0 ORDER BY titulo"
-        cursor = self.db_manager.execute_query(query)
+        return list(self.iterar_disponibles())
+    
+    def iterar_todos(self, tamano_lote: int = TAMANO_LOTE) -> Iterator[Libro]:
+        """Recorrer todos los libros sin cargarlos completos en memoria"""
+        query = f"{self.SELECT_LIBROS} ORDER BY titulo"
+        return self._iterar(query, tamano_lote)
+    
+    def iterar_disponibles(self, tamano_lote: int = TAMANO_LOTE) -> Iterator[Libro]:
+        """Recorrer los libros disponibles sin cargarlos completos en memoria"""
+        query = f"{self.SELECT_LIBROS} WHERE ejemplares_disponibles > 0 ORDER BY titulo"
+        return self._iterar(query, tamano_lote)
+    
+    @con_conexion
+    def _iterar(self, query: str, tamano_lote: int) -> Iterator[Libro]:
+        """Leer el resultado de a `tamano_lote` filas con fetchmany"""
+        cursor = mapear(self.db_manager.execute_query(query), libro_desde_fila)
+        while True:
+            libros = cursor.fetchmany(tamano_lote)
+            if not libros:
+                break
+            yield from libros
+    
+    @con_conexion
+    def listar_pagina(self, cursor: Optional[Tuple[str, str]] = None, limite: int = 20,
+                      solo_disponibles: bool = False) -> Tuple[List[Libro], Optional[Tuple[str, str]]]:
+        """
+        Listar una página de libros ordenados por título (paginación por clave).
+        `cursor` es la clave (titulo, isbn) del último libro de la página
+        anterior; devuelve los libros y el cursor de la página siguiente
+        (None si no hay más).
+        """
+        condiciones = []
+        params = []
+        if solo_disponibles:
+            condiciones.append("ejemplares_disponibles > 0")
+        if cursor:
+            condiciones.append("(titulo, isbn) > (?, ?)")
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        query = f"{self.SELECT_LIBROS} {where} ORDER BY titulo, isbn LIMIT ?"
+        params.append(limite + 1)
         
-        libros = []
-        for row in cursor.fetchall():
-            libros.append(Libro(
-                isbn=row['isbn'],
-                titulo=row['titulo'],
-                autor=row['autor'],
-                categoria=row['categoria'],
-                total_ejemplares=row['total_ejemplares'],
-                ejemplares_disponibles=row['ejemplares_disponibles']
-            ))
-        return libros
+        cursor = self.db_manager.execute_query(query, tuple(params))
+        libros = mapear(cursor, libro_desde_fila).fetchall()
+        siguiente = None
+        if len(libros) > limite:
+            libros = libros[:limite]
+            siguiente = (libros[-1].titulo, libros[-1].isbn)
+        return libros, siguiente
+    
+    def descontar_ejemplar(self, isbn: str) -> Optional[int]:
+        """
+        Descontar un ejemplar disponible (solo si queda alguno).
+        Devuelve los ejemplares disponibles restantes o None si no se pudo.
+        """
+        query = '''
+            UPDATE libros
+            SET ejemplares_disponibles = ejemplares_disponibles - 1
+            WHERE isbn = ? AND ejemplares_disponibles > 0
+            RETURNING ejemplares_disponibles
+        '''
+        return self._modificar_disponibles(query, isbn)
+    
+    def reponer_ejemplar(self, isbn: str) -> Optional[int]:
+        """
+        Reponer un ejemplar devuelto (sin superar el total).
+        Devuelve los ejemplares disponibles o None si no se pudo.
+        """
+        query = '''
+            UPDATE libros
+            SET ejemplares_disponibles = ejemplares_disponibles + 1
+            WHERE isbn = ? AND ejemplares_disponibles < total_ejemplares
+            RETURNING ejemplares_disponibles
+        '''
+        return self._modificar_disponibles(query, isbn)
+    
+    @con_conexion
+    def descontar_ejemplares(self, isbns: List[str]) -> bool:
+        """
+        Descontar un ejemplar por cada ISBN de la lista (executemany).
+        Devuelve False si alguno no tenía ejemplares disponibles; en ese
+        caso quien llama debe revertir la transacción.
+        """
+        try:
+            query = '''
+                UPDATE libros
+                SET ejemplares_disponibles = ejemplares_disponibles - 1
+                WHERE isbn = ? AND ejemplares_disponibles > 0
+            '''
+            cursor = self.db_manager.execute_many(query, ((isbn,) for isbn in isbns))
+            self._escribir_disponibles(set(isbns))
+            self.db_manager.commit()
+            return cursor.rowcount == len(isbns)
+        except Exception as e:
+            self.db_manager.rollback()
+            print(f"Error al descontar ejemplares: {e}")
+            return False
     
-    def actualizar_disponibilidad(self, libro: Libro) -> bool:
-        """Actualizar disponibilidad de ejemplares"""
+    @con_conexion
+    def reponer_ejemplares(self, cantidades: Dict[str, int]) -> bool:
+        """
+        Reponer varios ejemplares devueltos {isbn: cantidad} con executemany
+        (sin superar el total). Devuelve False si algún libro no lo admitía.
+        """
         try:
             query = '''
-                UPDATE libros 
-                SET ejemplares_disponibles = ?
-                WHERE isbn = ?
+                UPDATE libros
+                SET ejemplares_disponibles = ejemplares_disponibles + ?
+                WHERE isbn = ? AND ejemplares_disponibles + ? <= total_ejemplares
             '''
-            self.db_manager.execute_query(
-                query, 
-                (libro.ejemplares_disponibles, libro.isbn)
+            cursor = self.db_manager.execute_many(query, (
+                (cantidad, isbn, cantidad) for isbn, cantidad in cantidades.items()
+            ))
+            self._escribir_disponibles(cantidades)
+            self.db_manager.commit()
+            return cursor.rowcount == len(cantidades)
+        except Exception as e:
+            self.db_manager.rollback()
+            print(f"Error al reponer ejemplares: {e}")
+            return False
+    
+    @con_conexion
+    def reconciliar_disponibles(self, corregir: bool = True) -> Optional[List[dict]]:
+        """
+        Recalcular ejemplares_disponibles a partir de los préstamos activos
+        (total - activos) en una sola pasada. Devuelve los libros con
+        diferencias {'isbn', 'registrado', 'esperado'} y, si `corregir`,
+        los actualiza. None si hubo un error.
+        """
+        query = '''
+            SELECT isbn, registrado, esperado
+            FROM (
+                SELECT l.isbn,
+                       l.ejemplares_disponibles AS registrado,
+                       l.total_ejemplares - (
+                           SELECT COUNT(*) FROM prestamos p
+                           WHERE p.isbn = l.isbn AND p.estado = 'activo'
+                       ) AS esperado
+                FROM libros l
             )
+            WHERE registrado != esperado
+            ORDER BY isbn
+        '''
+        try:
+            diferencias = [dict(row) for row in self.db_manager.execute_query(query).fetchall()]
+            if corregir and diferencias:
+                self.db_manager.execute_many(
+                    "UPDATE libros SET ejemplares_disponibles = ? WHERE isbn = ?",
+                    ((diferencia['esperado'], diferencia['isbn']) for diferencia in diferencias)
+                )
+                self.db_manager.commit()
+                for diferencia in diferencias:
+                    self._invalidar(diferencia['isbn'])
+            return diferencias
+        except Exception as e:
+            self.db_manager.rollback()
+            print(f"Error al reconciliar disponibilidad: {e}")
+            return None
+    
+    @con_conexion
+    def _modificar_disponibles(self, query: str, isbn: str) -> Optional[int]:
+        """Ejecutar un UPDATE relativo de ejemplares disponibles"""
+        try:
+            filas = self.db_manager.execute_query(query, (isbn,)).fetchall()
             self.db_manager.commit()
-            return True
         except Exception as e:
             self.db_manager.rollback()
             print(f"Error al actualizar disponibilidad: {e}")
-            return False
+            return None
+        
+        if not filas:
+            return None
+        ejemplares_disponibles = filas[0]['ejemplares_disponibles']
+        self._escribir_en_cache(isbn, ejemplares_disponibles)
+        return ejemplares_disponibles
     
+    @con_conexion
     def eliminar(self, isbn: str) -> bool:
         """Eliminar un libro"""
         try:
             query = "DELETE FROM libros WHERE isbn = ?"
             self.db_manager.execute_query(query, (isbn,))
             self.db_manager.commit()
+            self._invalidar(isbn)
             return True
         except Exception as e:
             self.db_manager.rollback()
@@ -0,0 +1,65 @@
+"""
+Mapeo de filas de la BD a modelos por posición de columna
+
+Las consultas listan explícitamente las columnas de COLUMNAS_* (en ese
+orden) y el cursor construye el modelo directamente desde la tupla de la
+fila, sin pasar por sqlite3.Row ni buscar columnas por nombre.
+"""
+from typing import Callable, Sequence, TypeVar
+from model.libro import Libro
+from model.socio import Socio
+from model.prestamo import Prestamo
+
+T = TypeVar("T")
+
+COLUMNAS_LIBRO = ("isbn", "titulo", "autor", "categoria",
+                  "total_ejemplares", "ejemplares_disponibles")
+COLUMNAS_SOCIO = ("id_socio", "nombre", "email", "telefono", "fecha_registro",
+                  "activo", "libros_prestados", "saldo_multas")
+COLUMNAS_PRESTAMO = ("id_prestamo", "fecha_prestamo", "fecha_devolucion_esperada",
+                     "fecha_devolucion_real", "estado")
+
+
+def columnas(nombres: Sequence[str], alias: str = "") -> str:
+    """Lista de columnas para un SELECT, opcionalmente con alias de tabla"""
+    prefijo = f"{alias}." if alias else ""
+    return ", ".join(prefijo + nombre for nombre in nombres)
+
+
+def libro_desde_fila(fila: tuple) -> Libro:
+    """Libro desde una fila con COLUMNAS_LIBRO (mismo orden que el constructor)"""
+    return Libro(*fila)
+
+
+def socio_desde_fila(fila: tuple) -> Socio:
+    """Socio desde una fila con COLUMNAS_SOCIO"""
+    id_socio, nombre, email, telefono, fecha_registro, activo, prestados, saldo = fila
+    return Socio(id_socio, nombre, email, telefono, fecha_registro,
+                 bool(activo), prestados, saldo)
+
+
+def prestamo_desde_fila(fila: tuple, socio: Socio, libro: Libro) -> Prestamo:
+    """Préstamo desde una fila con COLUMNAS_PRESTAMO (fechas como texto ISO)"""
+    id_prestamo, fecha_prestamo, fecha_esperada, fecha_real, estado = fila
+    return Prestamo(id_prestamo, socio, libro, fecha_prestamo,
+                    fecha_esperada, fecha_real, estado)
+
+
+FIN_PRESTAMO = len(COLUMNAS_PRESTAMO)
+FIN_SOCIO = FIN_PRESTAMO + len(COLUMNAS_SOCIO)
+FIN_LIBRO = FIN_SOCIO + len(COLUMNAS_LIBRO)
+
+
+def prestamo_completo_desde_fila(fila: tuple) -> Prestamo:
+    """Préstamo con su socio y su libro desde una fila préstamo + socio + libro"""
+    return prestamo_desde_fila(
+        fila[:FIN_PRESTAMO],
+        socio_desde_fila(fila[FIN_PRESTAMO:FIN_SOCIO]),
+        libro_desde_fila(fila[FIN_SOCIO:FIN_LIBRO])
+    )
+
+
+def mapear(cursor, mapeador: Callable[[tuple], T]):
+    """Hacer que el cursor devuelva modelos (fetchone/fetchmany/fetchall o iterando)"""
+    cursor.row_factory = lambda _cursor, fila: mapeador(fila)
+    return cursor
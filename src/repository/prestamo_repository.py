@@ -1,21 +1,57 @@
 """
 Repositorio para gestionar préstamos en la base de datos
 """
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import date
 from model.prestamo import Prestamo
 from model.socio import Socio
 from model.libro import Libro
-from dal.database_manager import DatabaseManager
+from dal.database_manager import DatabaseManager, con_conexion
+from repository.mapeo import (COLUMNAS_LIBRO, COLUMNAS_PRESTAMO, COLUMNAS_SOCIO, columnas,
+                              mapear, prestamo_completo_desde_fila, prestamo_desde_fila)
 
 
 class PrestamoRepository:
     """Repositorio para gestionar préstamos"""
     
+    CONSULTA_ACTIVOS = '''
+        SELECT p.id_prestamo, p.id_socio, p.isbn, p.fecha_prestamo,
+               p.fecha_devolucion_esperada, p.estado,
+               s.nombre as socio_nombre, l.titulo as libro_titulo
+        FROM prestamos p
+        JOIN socios s ON p.id_socio = s.id_socio
+        JOIN libros l ON p.isbn = l.isbn
+        WHERE p.estado = 'activo'
+        ORDER BY p.fecha_devolucion_esperada
+    '''
+    CONSULTA_ACTIVOS_POR_SOCIO = (
+        "SELECT COUNT(*) as total FROM prestamos WHERE id_socio = ? AND estado = 'activo'"
+    )
+    
+    # Consultas frecuentes y el índice que deben usar
+    CONSULTAS_CRITICAS = [
+        (CONSULTA_ACTIVOS, (), "idx_prestamos_estado_vencimiento"),
+        (CONSULTA_ACTIVOS_POR_SOCIO, (0,), "idx_prestamos_socio_activos"),
+    ]
+    
+    TAMANO_LOTE = 500  # Filas por fetchmany en los recorridos
+    TAMANO_CONSULTA_IN = 500  # Parámetros por consulta IN (...)
+    
+    CONSULTA_ACTIVO_COMPLETO = f'''
+        SELECT {columnas(COLUMNAS_PRESTAMO, "p")},
+               {columnas(COLUMNAS_SOCIO, "s")},
+               {columnas(COLUMNAS_LIBRO, "l")}
+        FROM prestamos p
+        JOIN socios s ON p.id_socio = s.id_socio
+        JOIN libros l ON p.isbn = l.isbn
+        WHERE p.estado = 'activo' AND {{condicion}}
+    '''
+    
     def __init__(self):
         self.db_manager = DatabaseManager.get_instance()
         self.db_manager.connect()
     
+    @con_conexion
     def crear(self, prestamo: Prestamo) -> Optional[int]:
         """Crear un nuevo préstamo"""
         try:
@@ -38,58 +74,114 @@ class PrestamoRepository:
             print(f"Error al crear préstamo: {e}")
             return None
     
+    @con_conexion
     def buscar_por_id(self, id_prestamo: int, socio: Socio, libro: Libro) -> Optional[Prestamo]:
         """Buscar préstamo por ID"""
-        query = "SELECT * FROM prestamos WHERE id_prestamo = ?"
+        query = f"SELECT {columnas(COLUMNAS_PRESTAMO)} FROM prestamos WHERE id_prestamo = ?"
         cursor = self.db_manager.execute_query(query, (id_prestamo,))
         row = cursor.fetchone()
-        
-        if row:
-            fecha_devolucion_real = None
-            if row['fecha_devolucion_real']:
-                fecha_devolucion_real = datetime.fromisoformat(row['fecha_devolucion_real']).date()
-            
-            return Prestamo(
-                id_prestamo=row['id_prestamo'],
-                socio=socio,
-                libro=libro,
-                fecha_prestamo=datetime.fromisoformat(row['fecha_prestamo']).date(),
-                fecha_devolucion_esperada=datetime.fromisoformat(row['fecha_devolucion_esperada']).date(),
-                fecha_devolucion_real=fecha_devolucion_real,
-                estado=row['estado']
+        return prestamo_desde_fila(tuple(row), socio, libro) if row else None
+    
+    @con_conexion
+    def buscar_activo(self, id_prestamo: int) -> Optional[Prestamo]:
+        """Buscar un préstamo activo junto con su socio y su libro (una sola consulta)"""
+        query = self.CONSULTA_ACTIVO_COMPLETO.format(condicion="p.id_prestamo = ?")
+        cursor = self.db_manager.execute_query(query, (id_prestamo,))
+        return mapear(cursor, prestamo_completo_desde_fila).fetchone()
+    
+    @con_conexion
+    def buscar_activos(self, ids_prestamo: Iterable[int]) -> Dict[int, Prestamo]:
+        """
+        Buscar varios préstamos activos con su socio y su libro usando
+        consultas IN por tramos. Los préstamos de un mismo socio o libro
+        comparten el objeto.
+        """
+        ids = list(dict.fromkeys(ids_prestamo))
+        prestamos = {}
+        socios = {}
+        libros = {}
+        for inicio in range(0, len(ids), self.TAMANO_CONSULTA_IN):
+            tramo = ids[inicio:inicio + self.TAMANO_CONSULTA_IN]
+            marcadores = ", ".join("?" * len(tramo))
+            query = self.CONSULTA_ACTIVO_COMPLETO.format(
+                condicion=f"p.id_prestamo IN ({marcadores})"
             )
-        return None
+            cursor = self.db_manager.execute_query(query, tuple(tramo))
+            for prestamo in mapear(cursor, prestamo_completo_desde_fila):
+                prestamo.socio = socios.setdefault(prestamo.socio.id_socio, prestamo.socio)
+                prestamo.libro = libros.setdefault(prestamo.libro.isbn, prestamo.libro)
+                prestamos[prestamo.id_prestamo] = prestamo
+        return prestamos
+    
+    @staticmethod
+    def _resumen_activo(fila: tuple) -> dict:
+        """Datos básicos de un préstamo activo desde una fila de CONSULTA_ACTIVOS"""
+        (id_prestamo, id_socio, isbn, fecha_prestamo, fecha_devolucion_esperada,
+         estado, socio_nombre, libro_titulo) = fila
+        return {
+            'id_prestamo': id_prestamo,
+            'id_socio': id_socio,
+            'isbn': isbn,
+            'socio_nombre': socio_nombre,
+            'libro_titulo': libro_titulo,
+            'fecha_prestamo': date.fromisoformat(fecha_prestamo),
+            'fecha_devolucion_esperada': date.fromisoformat(fecha_devolucion_esperada),
+            'estado': estado
+        }
     
     def listar_activos(self) -> List[tuple]:
         """Listar préstamos activos (devuelve tuplas de datos básicos)"""
-        query = '''
+        return list(self.iterar_activos())
+    
+    @con_conexion
+    def iterar_activos(self, tamano_lote: int = TAMANO_LOTE) -> Iterator[dict]:
+        """Recorrer los préstamos activos sin cargarlos completos en memoria"""
+        cursor = mapear(self.db_manager.execute_query(self.CONSULTA_ACTIVOS), self._resumen_activo)
+        while True:
+            prestamos = cursor.fetchmany(tamano_lote)
+            if not prestamos:
+                break
+            yield from prestamos
+    
+    @con_conexion
+    def listar_activos_pagina(self, cursor: Optional[Tuple[str, int]] = None,
+                              limite: int = 20) -> Tuple[List[dict], Optional[Tuple[str, int]]]:
+        """
+        Listar una página de préstamos activos ordenados por vencimiento.
+        `cursor` es la clave (fecha_devolucion_esperada, id_prestamo) del último
+        préstamo de la página anterior; devuelve los préstamos y el cursor
+        de la página siguiente (None si no hay más).
+        """
+        condicion = ""
+        params = []
+        if cursor:
+            condicion = "AND (p.fecha_devolucion_esperada, p.id_prestamo) > (?, ?)"
+            params.extend(cursor)
+        query = f'''
             SELECT p.id_prestamo, p.id_socio, p.isbn, p.fecha_prestamo,
                    p.fecha_devolucion_esperada, p.estado,
                    s.nombre as socio_nombre, l.titulo as libro_titulo
             FROM prestamos p
             JOIN socios s ON p.id_socio = s.id_socio
             JOIN libros l ON p.isbn = l.isbn
-            WHERE p.estado = 'activo'
-            ORDER BY p.fecha_devolucion_esperada
+            WHERE p.estado = 'activo' {condicion}
+            ORDER BY p.fecha_devolucion_esperada, p.id_prestamo
+            LIMIT ?
         '''
-        cursor = self.db_manager.execute_query(query)
+        params.append(limite + 1)
         
-        prestamos = []
-        for row in cursor.fetchall():
-            prestamos.append({
-                'id_prestamo': row['id_prestamo'],
-                'id_socio': row['id_socio'],
-                'isbn': row['isbn'],
-                'socio_nombre': row['socio_nombre'],
-                'libro_titulo': row['libro_titulo'],
-                'fecha_prestamo': datetime.fromisoformat(row['fecha_prestamo']).date(),
-                'fecha_devolucion_esperada': datetime.fromisoformat(row['fecha_devolucion_esperada']).date(),
-                'estado': row['estado']
-            })
-        return prestamos
+        cursor = self.db_manager.execute_query(query, tuple(params))
+        prestamos = mapear(cursor, self._resumen_activo).fetchall()
+        siguiente = None
+        if len(prestamos) > limite:
+            prestamos = prestamos[:limite]
+            ultimo = prestamos[-1]
+            siguiente = (ultimo['fecha_devolucion_esperada'].isoformat(), ultimo['id_prestamo'])
+        return prestamos, siguiente
     
+    @con_conexion
     def actualizar_devolucion(self, prestamo: Prestamo) -> bool:
-        """Actualizar préstamo con devolución"""
+        """Actualizar préstamo con devolución (solo si sigue activo)"""
         try:
             multa = prestamo.calcular_multa()
             query = '''
@@ -97,25 +189,113 @@ class PrestamoRepository:
                 SET fecha_devolucion_real = ?,
                     estado = ?,
                     multa = ?
-                WHERE id_prestamo = ?
+                WHERE id_prestamo = ? AND estado = 'activo'
             '''
-            self.db_manager.execute_query(query, (
+            cursor = self.db_manager.execute_query(query, (
                 prestamo.fecha_devolucion_real.isoformat(),
                 prestamo.estado,
                 multa,
                 prestamo.id_prestamo
             ))
             self.db_manager.commit()
-            return True
+            return cursor.rowcount == 1
         except Exception as e:
             self.db_manager.rollback()
             print(f"Error al actualizar devolución: {e}")
             return False
     
+    @con_conexion
+    def actualizar_devoluciones(self, prestamos: List[Prestamo]) -> bool:
+        """
+        Registrar varias devoluciones con executemany. Devuelve False si
+        alguno ya no estaba activo; en ese caso quien llama debe revertir.
+        """
+        try:
+            query = '''
+                UPDATE prestamos
+                SET fecha_devolucion_real = ?,
+                    estado = ?,
+                    multa = ?
+                WHERE id_prestamo = ? AND estado = 'activo'
+            '''
+            cursor = self.db_manager.execute_many(query, (
+                (
+                    prestamo.fecha_devolucion_real.isoformat(),
+                    prestamo.estado,
+                    prestamo.calcular_multa(),
+                    prestamo.id_prestamo
+                )
+                for prestamo in prestamos
+            ))
+            self.db_manager.commit()
+            return cursor.rowcount == len(prestamos)
+        except Exception as e:
+            self.db_manager.rollback()
+            print(f"Error al actualizar devoluciones: {e}")
+            return False
+    
+    def verificar_indices(self):
+        """Verificar que las consultas críticas usen sus índices"""
+        self.db_manager.verificar_planes(self.CONSULTAS_CRITICAS)
+    
+    @con_conexion
+    def actualizar_multas_vencidas(self, fecha_corte: date, multa_por_dia: float) -> Optional[int]:
+        """
+        Calcular en una sola sentencia la multa acumulada de todos los
+        préstamos activos vencidos a la fecha de corte. Devuelve la
+        cantidad de préstamos actualizados o None si hubo un error.
+        """
+        try:
+            query = '''
+                UPDATE prestamos
+                SET multa = (julianday(?) - julianday(fecha_devolucion_esperada)) * ?
+                WHERE estado = 'activo' AND fecha_devolucion_esperada < ?
+            '''
+            corte = fecha_corte.isoformat()
+            cursor = self.db_manager.execute_query(query, (corte, multa_por_dia, corte))
+            self.db_manager.commit()
+            return cursor.rowcount
+        except Exception as e:
+            self.db_manager.rollback()
+            print(f"Error al actualizar multas: {e}")
+            return None
+    
+    @con_conexion
+    def totales_vencidos(self, fecha_corte: date) -> dict:
+        """Cantidad de préstamos vencidos y suma de multas acumuladas"""
+        query = '''
+            SELECT COUNT(*) AS vencidos, COALESCE(SUM(multa), 0) AS multa_total
+            FROM prestamos
+            WHERE estado = 'activo' AND fecha_devolucion_esperada < ?
+        '''
+        row = self.db_manager.execute_query(query, (fecha_corte.isoformat(),)).fetchone()
+        return dict(row)
+    
+    @con_conexion
+    def iterar_vencidos(self, fecha_corte: date, tamano_lote: int = TAMANO_LOTE) -> Iterator[dict]:
+        """Recorrer los préstamos vencidos con los datos para el aviso al socio"""
+        query = '''
+            SELECT p.id_prestamo, p.fecha_devolucion_esperada, p.multa,
+                   s.id_socio, s.nombre AS socio_nombre, s.email AS socio_email,
+                   l.isbn, l.titulo AS libro_titulo
+            FROM prestamos p
+            JOIN socios s ON p.id_socio = s.id_socio
+            JOIN libros l ON p.isbn = l.isbn
+            WHERE p.estado = 'activo' AND p.fecha_devolucion_esperada < ?
+            ORDER BY p.fecha_devolucion_esperada
+        '''
+        cursor = self.db_manager.execute_query(query, (fecha_corte.isoformat(),))
+        while True:
+            filas = cursor.fetchmany(tamano_lote)
+            if not filas:
+                break
+            for row in filas:
+                yield dict(row)
+    
+    @con_conexion
     def contar_prestamos_activos_por_socio(self, id_socio: int) -> int:
         """Contar préstamos activos de un socio"""
-        query = "SELECT COUNT(*) as total FROM prestamos WHERE id_socio = ? AND estado = 'activo'"
-        cursor = self.db_manager.execute_query(query, (id_socio,))
+        cursor = self.db_manager.execute_query(self.CONSULTA_ACTIVOS_POR_SOCIO, (id_socio,))
         row = cursor.fetchone()
         return row['total'] if row else 0
 
@@ -0,0 +1,122 @@
+"""
+Repositorio para consultas de reportes y estadísticas
+"""
+from datetime import date
+from typing import List, Optional, Tuple
+from dal.database_manager import DatabaseManager, con_conexion
+
+
+class ReporteRepository:
+    """Repositorio con consultas agregadas para reportes"""
+    
+    def __init__(self):
+        self.db_manager = DatabaseManager.get_instance()
+        self.db_manager.connect()
+    
+    @staticmethod
+    def _tramos(desde: date) -> Tuple[str, str, str]:
+        """
+        Partir una ventana que empieza en `desde` en días sueltos (del mes
+        de `desde`, si no empieza el día 1) y meses completos: devuelve
+        (desde, primer día del mes siguiente, ese mes como 'AAAA-MM')
+        """
+        if desde.day == 1:
+            corte = desde
+        elif desde.month == 12:
+            corte = date(desde.year + 1, 1, 1)
+        else:
+            corte = date(desde.year, desde.month + 1, 1)
+        return desde.isoformat(), corte.isoformat(), corte.strftime("%Y-%m")
+    
+    @con_conexion
+    def obtener_resumen(self) -> dict:
+        """Contadores generales del sistema en una única consulta agregada"""
+        query = '''
+            SELECT l.total_libros, l.libros_disponibles,
+                   l.total_ejemplares, l.ejemplares_disponibles,
+                   s.total_socios, s.socios_activos,
+                   p.prestamos_activos, p.prestamos_vencidos
+            FROM (SELECT COUNT(*) AS total_libros,
+                         COALESCE(SUM(ejemplares_disponibles > 0), 0) AS libros_disponibles,
+                         COALESCE(SUM(total_ejemplares), 0) AS total_ejemplares,
+                         COALESCE(SUM(ejemplares_disponibles), 0) AS ejemplares_disponibles
+                  FROM libros) l,
+                 (SELECT COUNT(*) AS total_socios,
+                         COALESCE(SUM(activo = 1), 0) AS socios_activos
+                  FROM socios) s,
+                 (SELECT COUNT(*) AS prestamos_activos,
+                         COALESCE(SUM(fecha_devolucion_esperada < date('now', 'localtime')), 0)
+                             AS prestamos_vencidos
+                  FROM prestamos
+                  WHERE estado = 'activo') p
+        '''
+        row = self.db_manager.execute_query(query).fetchone()
+        return dict(row)
+    
+    @con_conexion
+    def libros_mas_prestados(self, limite: int = 10, desde: Optional[date] = None) -> List[dict]:
+        """
+        Top de libros por cantidad de préstamos, leído de los contadores
+        incrementales (histórico) o de los contadores diarios y mensuales
+        desde una fecha.
+        """
+        if desde is None:
+            query = '''
+                SELECT e.isbn, l.titulo, l.autor, e.total_prestamos
+                FROM estadisticas_libros e
+                JOIN libros l ON l.isbn = e.isbn
+                ORDER BY e.total_prestamos DESC
+                LIMIT ?
+            '''
+            params = (limite,)
+        else:
+            query = '''
+                SELECT c.isbn, l.titulo, l.autor, SUM(c.cantidad) AS total_prestamos
+                FROM (SELECT isbn, cantidad FROM prestamos_diarios_libros
+                      WHERE fecha >= ? AND fecha < ?
+                      UNION ALL
+                      SELECT isbn, cantidad FROM prestamos_mensuales_libros
+                      WHERE mes >= ?) c
+                JOIN libros l ON l.isbn = c.isbn
+                GROUP BY c.isbn
+                ORDER BY total_prestamos DESC
+                LIMIT ?
+            '''
+            params = (*self._tramos(desde), limite)
+        
+        cursor = self.db_manager.execute_query(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @con_conexion
+    def socios_con_mas_prestamos(self, limite: int = 10, desde: Optional[date] = None) -> List[dict]:
+        """
+        Top de socios por cantidad de préstamos, leído de los contadores
+        incrementales (histórico) o de los contadores diarios y mensuales
+        desde una fecha.
+        """
+        if desde is None:
+            query = '''
+                SELECT e.id_socio, s.nombre, s.email, e.total_prestamos
+                FROM estadisticas_socios e
+                JOIN socios s ON s.id_socio = e.id_socio
+                ORDER BY e.total_prestamos DESC
+                LIMIT ?
+            '''
+            params = (limite,)
+        else:
+            query = '''
+                SELECT c.id_socio, s.nombre, s.email, SUM(c.cantidad) AS total_prestamos
+                FROM (SELECT id_socio, cantidad FROM prestamos_diarios_socios
+                      WHERE fecha >= ? AND fecha < ?
+                      UNION ALL
+                      SELECT id_socio, cantidad FROM prestamos_mensuales_socios
+                      WHERE mes >= ?) c
+                JOIN socios s ON s.id_socio = c.id_socio
+                GROUP BY c.id_socio
+                ORDER BY total_prestamos DESC
+                LIMIT ?
+            '''
+            params = (*self._tramos(desde), limite)
+        
+        cursor = self.db_manager.execute_query(query, params)
+        return [dict(row) for row in cursor.fetchall()]
@@ -1,18 +1,74 @@
 """
 Repositorio para gestionar socios en la base de datos
 """
-from typing import List, Optional
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from model.socio import Socio
-from dal.database_manager import DatabaseManager
+from dal.database_manager import DatabaseManager, con_conexion
+from repository.cache import CacheLRU
+from repository.indice_trigramas import IndiceTrigramas
+from repository.mapeo import COLUMNAS_SOCIO, columnas, mapear, socio_desde_fila
 
 
 class SocioRepository:
     """Repositorio para gestionar socios"""
     
+    # Mapa de identidad: un único objeto Socio por id_socio, compartido.
+    # Otros procesos (menú, mantenimiento, API) escriben sin avisar a esta
+    # caché: el TTL acota cuánto puede quedar desactualizada
+    TTL_CACHE = 30.0  # Segundos
+    cache = CacheLRU(tamano_maximo=10000, ttl=TTL_CACHE)
+    
+    # Índice de trigramas por nombre y email, compartido; se carga al
+    # hacer la primera búsqueda
+    indice = IndiceTrigramas()
+    _lock_indice = threading.Lock()
+    
+    SELECT_SOCIOS = f"SELECT {columnas(COLUMNAS_SOCIO)} FROM socios"
+    
+    TAMANO_LOTE = 500  # Filas por fetchmany en los recorridos
+    
     def __init__(self):
         self.db_manager = DatabaseManager.get_instance()
         self.db_manager.connect()
     
+    @classmethod
+    def estadisticas_cache(cls) -> dict:
+        """Aciertos, fallos y ocupación del mapa de identidad de socios"""
+        return cls.cache.estadisticas()
+    
+    def _escribir_en_cache(self, id_socio: int, **valores):
+        """Reflejar cambios en el socio cacheado cuando se confirme la transacción"""
+        def aplicar(socio: Socio):
+            for atributo, valor in valores.items():
+                setattr(socio, atributo, valor)
+        self.db_manager.al_confirmar(lambda: self.cache.actualizar(id_socio, aplicar))
+    
+    def _invalidar(self, id_socio: int):
+        """Quitar un socio del mapa de identidad al confirmar la transacción"""
+        self.db_manager.al_confirmar(lambda: self.cache.invalidar(id_socio))
+    
+    @staticmethod
+    def _texto_indexable(nombre: str, email: str) -> str:
+        """Texto de búsqueda de un socio (el dominio del email no distingue a nadie)"""
+        return f"{nombre} {email.split('@')[0]}"
+    
+    def _indexar(self, id_desde: int, id_hasta: int):
+        """Agregar al índice de búsqueda los socios de un rango de ids al confirmar"""
+        def agregar():
+            # Si el índice todavía no se empezó a cargar, la carga los leerá
+            if not self.indice.iniciado:
+                return
+            cursor = self.db_manager.execute_query(
+                "SELECT id_socio, nombre, email FROM socios WHERE id_socio BETWEEN ? AND ?",
+                (id_desde, id_hasta)
+            )
+            for row in cursor.fetchall():
+                self.indice.agregar(row['id_socio'],
+                                    self._texto_indexable(row['nombre'], row['email']))
+        self.db_manager.al_confirmar(agregar)
+    
+    @con_conexion
     def crear(self, socio: Socio) -> Optional[int]:
         """Crear un nuevo socio"""
         try:
@@ -24,88 +80,356 @@ class SocioRepository:
                 socio.nombre, socio.email, socio.telefono, socio.activo
             ))
             self.db_manager.commit()
+            self._indexar(cursor.lastrowid, cursor.lastrowid)
             return cursor.lastrowid
         except Exception as e:
             self.db_manager.rollback()
             print(f"Error al crear socio: {e}")
             return None
     
-    def buscar_por_id(self, id_socio: int) -> Optional[Socio]:
-        """Buscar socio por ID"""
-        query = "SELECT * FROM socios WHERE id_socio = ?"
+    def crear_lote(self, socios: List[Socio]) -> Optional[int]:
+        """Insertar varios socios con executemany, ignorando emails ya existentes"""
+        try:
+            query = '''
+                INSERT INTO socios (nombre, email, telefono, activo)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(email) DO NOTHING
+            '''
+            with self.db_manager.transaccion():
+                id_previo = self.db_manager.execute_query(
+                    "SELECT COALESCE(MAX(id_socio), 0) FROM socios"
+                ).fetchone()[0]
+                cursor = self.db_manager.execute_many(query, (
+                    (socio.nombre, socio.email, socio.telefono, socio.activo)
+                    for socio in socios
+                ))
+                insertados = cursor.rowcount
+                if insertados:
+                    self._indexar(id_previo + 1, self.db_manager.execute_query(
+                        "SELECT MAX(id_socio) FROM socios"
+                    ).fetchone()[0])
+            return insertados
+        except Exception as e:
+            print(f"Error al crear socios en lote: {e}")
+            return None
+    
+    @con_conexion
+    def emails_existentes(self, emails: Iterable[str]) -> Set[str]:
+        """Devolver cuáles de los emails indicados ya están registrados"""
+        emails = list(emails)
+        if not emails:
+            return set()
+        marcadores = ", ".join("?" * len(emails))
+        query = f"SELECT email FROM socios WHERE email IN ({marcadores})"
+        cursor = self.db_manager.execute_query(query, tuple(emails))
+        return {row['email'] for row in cursor.fetchall()}
+    
+    @con_conexion
+    def buscar_por_id(self, id_socio: int, refrescar: bool = False) -> Optional[Socio]:
+        """
+        Buscar socio por ID (desde el mapa de identidad si ya está cargado).
+        Con `refrescar` la fila se vuelve a leer y se copia sobre el socio
+        cacheado: usarlo al comienzo de una transacción, antes de modificar
+        la fila, para decidir con lo que otro proceso pudo haber confirmado.
+        """
+        cacheado = self.cache.obtener(id_socio)
+        if cacheado is not None and not refrescar:
+            return cacheado
+        
+        marca = self.cache.marca()
+        query = f"{self.SELECT_SOCIOS} WHERE id_socio = ?"
         cursor = self.db_manager.execute_query(query, (id_socio,))
-        row = cursor.fetchone()
+        socio = mapear(cursor, socio_desde_fila).fetchone()
         
-        if row:
-            return Socio(
-                id_socio=row['id_socio'],
-                nombre=row['nombre'],
-                email=row['email'],
-                telefono=row['telefono'],
-                activo=bool(row['activo']),
-                libros_prestados=row['libros_prestados']
-            )
-        return None
+        if socio is None:
+            return None
+        if cacheado is not None:
+            def copiar(destino: Socio):
+                for atributo in Socio.__slots__:
+                    setattr(destino, atributo, getattr(socio, atributo))
+            self.cache.actualizar(id_socio, copiar)
+            return cacheado
+        # Dentro de una transacción la fila puede no estar confirmada
+        # (salvo al refrescar, que se hace antes de modificarla)
+        if refrescar or not self.db_manager.en_transaccion():
+            self.cache.guardar(id_socio, socio, marca)
+        return socio
+    
+    @con_conexion
+    def buscar_similares(self, texto: str, limite: int = 10) -> List[Tuple[Socio, float]]:
+        """
+        Buscar socios por nombre o email tolerando errores de tipeo.
+        Devuelve pares (socio, similitud) de mayor a menor similitud.
+        """
+        if not self.indice.construido:
+            with self._lock_indice:
+                if not self.indice.construido:
+                    self.indice.construir(self._iterar_textos())
+        
+        resultados = []
+        for id_socio, similitud in self.indice.buscar(texto, limite):
+            socio = self.buscar_por_id(id_socio)
+            if socio:
+                resultados.append((socio, similitud))
+        return resultados
+    
+    @con_conexion
+    def _iterar_textos(self, tamano_lote: int = TAMANO_LOTE) -> Iterator[Tuple[int, str]]:
+        """Recorrer (id_socio, texto de búsqueda) de todos los socios"""
+        cursor = self.db_manager.execute_query("SELECT id_socio, nombre, email FROM socios")
+        while True:
+            filas = cursor.fetchmany(tamano_lote)
+            if not filas:
+                break
+            for row in filas:
+                yield row['id_socio'], self._texto_indexable(row['nombre'], row['email'])
     
     def listar_todos(self) -> List[Socio]:
         """Listar todos los socios"""
-        query = "SELECT * FROM socios ORDER BY nombre"
-        cursor = self.db_manager.execute_query(query)
-        
-        socios = []
-        for row in cursor.fetchall():
-            socios.append(Socio(
-                id_socio=row['id_socio'],
-                nombre=row['nombre'],
-                email=row['email'],
-                telefono=row['telefono'],
-                activo=bool(row['activo']),
-                libros_prestados=row['libros_prestados']
-            ))
-        return socios
+        return list(self.iterar_todos())
     
     def listar_activos(self) -> List[Socio]:
         """Listar socios activos"""
-        query = "SELECT * FROM socios WHERE activo = 1 ORDER BY nombre"
-        cursor = self.db_manager.execute_query(query)
+        return list(self.iterar_activos())
+    
+    def iterar_todos(self, tamano_lote: int = TAMANO_LOTE) -> Iterator[Socio]:
+        """Recorrer todos los socios sin cargarlos completos en memoria"""
+        query = f"{self.SELECT_SOCIOS} ORDER BY nombre"
+        return self._iterar(query, tamano_lote)
+    
+    def iterar_activos(self, tamano_lote: int = TAMANO_LOTE) -> Iterator[Socio]:
+        """Recorrer los socios activos sin cargarlos completos en memoria"""
+        query = f"{self.SELECT_SOCIOS} WHERE activo = 1 ORDER BY nombre"
+        return self._iterar(query, tamano_lote)
+    
+    @con_conexion
+    def _iterar(self, query: str, tamano_lote: int) -> Iterator[Socio]:
+        """Leer el resultado de a `tamano_lote` filas con fetchmany"""
+        cursor = mapear(self.db_manager.execute_query(query), socio_desde_fila)
+        while True:
+            socios = cursor.fetchmany(tamano_lote)
+            if not socios:
+                break
+            yield from socios
+    
+    @con_conexion
+    def listar_pagina(self, cursor: Optional[Tuple[str, int]] = None, limite: int = 20,
+                      solo_activos: bool = False) -> Tuple[List[Socio], Optional[Tuple[str, int]]]:
+        """
+        Listar una página de socios ordenados por nombre (paginación por clave).
+        `cursor` es la clave (nombre, id_socio) del último socio de la página
+        anterior; devuelve los socios y el cursor de la página siguiente
+        (None si no hay más).
+        """
+        condiciones = []
+        params = []
+        if solo_activos:
+            condiciones.append("activo = 1")
+        if cursor:
+            condiciones.append("(nombre, id_socio) > (?, ?)")
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        query = f"{self.SELECT_SOCIOS} {where} ORDER BY nombre, id_socio LIMIT ?"
+        params.append(limite + 1)
         
-        socios = []
-        for row in cursor.fetchall():
-            socios.append(Socio(
-                id_socio=row['id_socio'],
-                nombre=row['nombre'],
-                email=row['email'],
-                telefono=row['telefono'],
-                activo=bool(row['activo']),
-                libros_prestados=row['libros_prestados']
-            ))
-        return socios
+        cursor = self.db_manager.execute_query(query, tuple(params))
+        socios = mapear(cursor, socio_desde_fila).fetchall()
+        siguiente = None
+        if len(socios) > limite:
+            socios = socios[:limite]
+            siguiente = (socios[-1].nombre, socios[-1].id_socio)
+        return socios, siguiente
+    
+    def sumar_libro_prestado(self, id_socio: int, maximo: int) -> Optional[int]:
+        """
+        Sumar un libro prestado si el socio está activo, no supera el máximo
+        y no tiene multas pendientes.
+        Devuelve la nueva cantidad de libros prestados o None si no se pudo.
+        """
+        return self.sumar_libros_prestados(id_socio, 1, maximo)
+    
+    def sumar_libros_prestados(self, id_socio: int, cantidad: int, maximo: int) -> Optional[int]:
+        """
+        Sumar `cantidad` libros prestados con las mismas condiciones que
+        sumar_libro_prestado (el total no puede superar el máximo).
+        """
+        query = '''
+            UPDATE socios
+            SET libros_prestados = libros_prestados + ?
+            WHERE id_socio = ? AND activo = 1 AND libros_prestados + ? <= ?
+              AND saldo_multas <= 0
+            RETURNING libros_prestados
+        '''
+        params = (cantidad, id_socio, cantidad, maximo)
+        return self._modificar_libros_prestados(query, params, id_socio)
+    
+    def restar_libro_prestado(self, id_socio: int) -> Optional[int]:
+        """
+        Restar un libro prestado al socio.
+        Devuelve la nueva cantidad de libros prestados o None si no se pudo.
+        """
+        query = '''
+            UPDATE socios
+            SET libros_prestados = libros_prestados - 1
+            WHERE id_socio = ? AND libros_prestados > 0
+            RETURNING libros_prestados
+        '''
+        return self._modificar_libros_prestados(query, (id_socio,), id_socio)
     
-    def actualizar_libros_prestados(self, socio: Socio) -> bool:
-        """Actualizar contador de libros prestados"""
+    @con_conexion
+    def restar_libros_prestados(self, cantidades: Dict[int, int]) -> bool:
+        """
+        Restar libros devueltos {id_socio: cantidad} con executemany.
+        Devuelve False si algún socio tenía menos libros de los devueltos.
+        """
         try:
             query = '''
-                UPDATE socios 
-                SET libros_prestados = ?
-                WHERE id_socio = ?
+                UPDATE socios
+                SET libros_prestados = libros_prestados - ?
+                WHERE id_socio = ? AND libros_prestados >= ?
             '''
-            self.db_manager.execute_query(
-                query,
-                (socio.libros_prestados, socio.id_socio)
-            )
+            cursor = self.db_manager.execute_many(query, (
+                (cantidad, id_socio, cantidad) for id_socio, cantidad in cantidades.items()
+            ))
             self.db_manager.commit()
-            return True
+            for id_socio in cantidades:
+                self._invalidar(id_socio)
+            return cursor.rowcount == len(cantidades)
         except Exception as e:
             self.db_manager.rollback()
             print(f"Error al actualizar libros prestados: {e}")
             return False
     
+    @con_conexion
+    def _modificar_libros_prestados(self, query: str, params: tuple, id_socio: int) -> Optional[int]:
+        """Ejecutar un UPDATE relativo del contador y reflejarlo en la caché"""
+        try:
+            filas = self.db_manager.execute_query(query, params).fetchall()
+            self.db_manager.commit()
+        except Exception as e:
+            self.db_manager.rollback()
+            print(f"Error al actualizar libros prestados: {e}")
+            return None
+        
+        if not filas:
+            return None
+        libros_prestados = filas[0]['libros_prestados']
+        self._escribir_en_cache(id_socio, libros_prestados=libros_prestados)
+        return libros_prestados
+    
+    def registrar_movimiento_multa(self, id_socio: int, tipo: str, monto: float,
+                                   id_prestamo: Optional[int] = None) -> Optional[float]:
+        """
+        Registrar un cargo (monto positivo) o un pago (monto negativo) en el
+        libro de multas y actualizar el saldo del socio en la misma transacción.
+        Devuelve el nuevo saldo o None si hubo un error.
+        """
+        try:
+            with self.db_manager.transaccion():
+                self.db_manager.execute_query(
+                    '''
+                    INSERT INTO multas_movimientos (id_socio, id_prestamo, tipo, monto)
+                    VALUES (?, ?, ?, ?)
+                    ''',
+                    (id_socio, id_prestamo, tipo, monto)
+                )
+                filas = self.db_manager.execute_query(
+                    '''
+                    UPDATE socios
+                    SET saldo_multas = saldo_multas + ?
+                    WHERE id_socio = ?
+                    RETURNING saldo_multas
+                    ''',
+                    (monto, id_socio)
+                ).fetchall()
+                if not filas:
+                    self.db_manager.rollback()
+                    return None
+        except Exception as e:
+            print(f"Error al registrar movimiento de multa: {e}")
+            return None
+        
+        saldo_multas = float(filas[0]['saldo_multas'])
+        self._escribir_en_cache(id_socio, saldo_multas=saldo_multas)
+        return saldo_multas
+    
+    def registrar_cargos_multa(self, cargos: List[Tuple[int, int, float]]) -> bool:
+        """
+        Registrar varios cargos (id_socio, id_prestamo, monto) en el libro
+        de multas y sumarlos al saldo de cada socio, con executemany.
+        """
+        saldos = {}
+        for id_socio, _, monto in cargos:
+            saldos[id_socio] = saldos.get(id_socio, 0.0) + monto
+        try:
+            with self.db_manager.transaccion():
+                self.db_manager.execute_many(
+                    '''
+                    INSERT INTO multas_movimientos (id_socio, id_prestamo, tipo, monto)
+                    VALUES (?, ?, 'cargo', ?)
+                    ''',
+                    cargos
+                )
+                self.db_manager.execute_many(
+                    "UPDATE socios SET saldo_multas = saldo_multas + ? WHERE id_socio = ?",
+                    ((monto, id_socio) for id_socio, monto in saldos.items())
+                )
+                for id_socio in saldos:
+                    self._invalidar(id_socio)
+        except Exception as e:
+            print(f"Error al registrar multas: {e}")
+            return False
+        return True
+    
+    @con_conexion
+    def reconciliar_contadores(self, corregir: bool = True) -> Optional[List[dict]]:
+        """
+        Recalcular libros_prestados (préstamos activos) y saldo_multas
+        (libro de multas) en una sola pasada. Devuelve los socios con
+        diferencias y, si `corregir`, los actualiza. None si hubo un error.
+        """
+        query = '''
+            SELECT id_socio, libros_registrados, libros_esperados,
+                   saldo_registrado, saldo_esperado
+            FROM (
+                SELECT s.id_socio,
+                       s.libros_prestados AS libros_registrados,
+                       (SELECT COUNT(*) FROM prestamos p
+                        WHERE p.id_socio = s.id_socio AND p.estado = 'activo') AS libros_esperados,
+                       s.saldo_multas AS saldo_registrado,
+                       (SELECT COALESCE(SUM(m.monto), 0.0) FROM multas_movimientos m
+                        WHERE m.id_socio = s.id_socio) AS saldo_esperado
+                FROM socios s
+            )
+            WHERE libros_registrados != libros_esperados
+               OR ABS(saldo_registrado - saldo_esperado) > 0.005
+            ORDER BY id_socio
+        '''
+        try:
+            diferencias = [dict(row) for row in self.db_manager.execute_query(query).fetchall()]
+            if corregir and diferencias:
+                self.db_manager.execute_many(
+                    "UPDATE socios SET libros_prestados = ?, saldo_multas = ? WHERE id_socio = ?",
+                    ((diferencia['libros_esperados'], diferencia['saldo_esperado'],
+                      diferencia['id_socio']) for diferencia in diferencias)
+                )
+                self.db_manager.commit()
+                for diferencia in diferencias:
+                    self._invalidar(diferencia['id_socio'])
+            return diferencias
+        except Exception as e:
+            self.db_manager.rollback()
+            print(f"Error al reconciliar contadores de socios: {e}")
+            return None
+    
+    @con_conexion
     def actualizar_estado(self, id_socio: int, activo: bool) -> bool:
         """Actualizar estado de un socio"""
         try:
             query = "UPDATE socios SET activo = ? WHERE id_socio = ?"
             self.db_manager.execute_query(query, (activo, id_socio))
             self.db_manager.commit()
+            self._escribir_en_cache(id_socio, activo=activo)
             return True
         except Exception as e:
             self.db_manager.rollback()
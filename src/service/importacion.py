@@ -0,0 +1,69 @@
+"""
+Lectores de archivos para importaciones masivas (CSV y JSONL)
+"""
+import csv
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+
+class FilaInvalida:
+    """Línea que no se pudo leer; se informa como fila rechazada"""
+    
+    def __init__(self, motivo: str):
+        self.motivo = motivo
+
+
+def leer_csv(ruta: str, delimitador: str = ",") -> Iterator[Dict[str, str]]:
+    """Leer un CSV con encabezado fila por fila, sin cargarlo completo en memoria"""
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        for fila in csv.DictReader(archivo, delimiter=delimitador):
+            yield fila
+
+
+def leer_jsonl(ruta: str) -> Iterator[Union[dict, FilaInvalida]]:
+    """
+    Leer un archivo JSONL (un objeto JSON por línea). Las líneas mal
+    formadas o que no son un objeto se devuelven como FilaInvalida, sin
+    cortar la lectura.
+    """
+    with open(ruta, encoding="utf-8") as archivo:
+        for numero_linea, linea in enumerate(archivo, 1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                fila = json.loads(linea)
+            except json.JSONDecodeError as e:
+                yield FilaInvalida(f"Línea {numero_linea}: JSON inválido ({e.msg})")
+                continue
+            if isinstance(fila, dict):
+                yield fila
+            else:
+                yield FilaInvalida(f"Línea {numero_linea}: se esperaba un objeto JSON")
+
+
+def motivo_fila_invalida(fila: Any) -> Optional[str]:
+    """Motivo por el que una fila leída no se puede procesar (None si se puede)"""
+    if isinstance(fila, FilaInvalida):
+        return fila.motivo
+    if not isinstance(fila, dict):
+        return "La fila no es un objeto con campos"
+    return None
+
+
+def leer_archivo(ruta: str) -> Iterator[dict]:
+    """Elegir el lector según la extensión del archivo"""
+    if ruta.lower().endswith((".jsonl", ".ndjson")):
+        return leer_jsonl(ruta)
+    return leer_csv(ruta)
+
+
+def en_lotes(filas: Iterable, tamano: int) -> Iterator[List]:
+    """Agrupar un iterable en listas de a lo sumo `tamano` elementos"""
+    iterador = iter(filas)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
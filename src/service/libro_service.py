@@ -1,16 +1,21 @@
 """
 Servicio de lógica de negocio para Libros
 """
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
 from model.libro import Libro
 from repository.libro_repository import LibroRepository
+from dal.database_manager import DatabaseManager
+from service.importacion import en_lotes, leer_archivo, motivo_fila_invalida
 
 
 class LibroService:
     """Servicio que gestiona la lógica de negocio de libros"""
     
+    TAMANO_LOTE_IMPORTACION = 1000
+    
     def __init__(self):
         self.repo = LibroRepository()
+        self.db_manager = DatabaseManager.get_instance()
     
     def crear_libro(self, isbn: str, titulo: str, autor: str, 
                    categoria: str = "", total_ejemplares: int = 1) -> bool:
@@ -42,10 +47,100 @@ class LibroService:
         
         return self.repo.crear(libro)
     
+    def importar_libros(self, filas: Iterable[dict],
+                        tamano_lote: int = TAMANO_LOTE_IMPORTACION) -> dict:
+        """
+        Importar libros en lote (filas de CSV/JSONL) en una única transacción.
+        Devuelve un resumen con las filas importadas y las rechazadas.
+        """
+        resumen = {'procesadas': 0, 'importadas': 0, 'rechazadas': []}
+        rechazadas = resumen['rechazadas']
+        numero_fila = 0
+        
+        with self.db_manager.transaccion():
+            for lote in en_lotes(filas, tamano_lote):
+                # Validar el lote y descartar ISBN repetidos dentro del archivo
+                validos = []
+                vistos = set()
+                for fila in lote:
+                    numero_fila += 1
+                    error = motivo_fila_invalida(fila)
+                    if error:
+                        rechazadas.append({'fila': numero_fila, 'isbn': None, 'motivo': error})
+                        continue
+                    libro, error = self._libro_desde_fila(fila)
+                    if error:
+                        rechazadas.append({'fila': numero_fila, 'isbn': fila.get('isbn'), 'motivo': error})
+                    elif libro.isbn in vistos:
+                        rechazadas.append({'fila': numero_fila, 'isbn': libro.isbn, 'motivo': "ISBN repetido en el archivo"})
+                    else:
+                        vistos.add(libro.isbn)
+                        validos.append((numero_fila, libro))
+                
+                # Descartar los ISBN que ya están en el catálogo
+                existentes = self.repo.isbns_existentes(vistos)
+                nuevos = []
+                for numero, libro in validos:
+                    if libro.isbn in existentes:
+                        rechazadas.append({'fila': numero, 'isbn': libro.isbn, 'motivo': "ISBN ya registrado"})
+                    else:
+                        nuevos.append(libro)
+                
+                insertados = self.repo.crear_lote(nuevos)
+                if insertados is None:
+                    print("Error: Importación cancelada, no se registró ningún libro")
+                    self.db_manager.rollback()
+                    resumen['procesadas'] = numero_fila
+                    resumen['importadas'] = 0
+                    return resumen
+                resumen['importadas'] += insertados
+        
+        resumen['procesadas'] = numero_fila
+        print(f"Importación finalizada: {resumen['importadas']} libros importados, "
+              f"{len(rechazadas)} rechazados")
+        return resumen
+    
+    def importar_libros_desde_archivo(self, ruta: str) -> dict:
+        """Importar libros desde un archivo CSV o JSONL"""
+        return self.importar_libros(leer_archivo(ruta))
+    
+    @staticmethod
+    def _libro_desde_fila(fila: dict) -> Tuple[Optional[Libro], Optional[str]]:
+        """Validar una fila de importación y construir el libro"""
+        isbn = str(fila.get('isbn') or "").strip()
+        titulo = str(fila.get('titulo') or "").strip()
+        autor = str(fila.get('autor') or "").strip()
+        if not isbn or not titulo or not autor:
+            return None, "ISBN, título y autor son obligatorios"
+        
+        try:
+            total_ejemplares = int(fila.get('total_ejemplares') or 1)
+        except (TypeError, ValueError):
+            return None, "Número de ejemplares inválido"
+        if total_ejemplares < 1:
+            return None, "Debe haber al menos un ejemplar"
+        
+        libro = Libro(
+            isbn=isbn,
+            titulo=titulo,
+            autor=autor,
+            categoria=str(fila.get('categoria') or "").strip(),
+            total_ejemplares=total_ejemplares,
+            ejemplares_disponibles=total_ejemplares
+        )
+        return libro, None
+    
     def buscar_libro(self, isbn: str) -> Optional[Libro]:
         """Buscar libro por ISBN"""
         return self.repo.buscar_por_isbn(isbn)
     
+    def buscar_libros(self, texto: str, limite: int = 20) -> List[Libro]:
+        """Buscar libros por título, autor o categoría, ordenados por relevancia"""
+        if not texto or not texto.strip():
+            print("Error: Debe ingresar un texto a buscar")
+            return []
+        return self.repo.buscar_texto(texto, limite)
+    
     def listar_todos_los_libros(self) -> List[Libro]:
         """Listar todos los libros"""
         return self.repo.listar_todos()
@@ -54,6 +149,15 @@ class LibroService:
         """Listar libros con ejemplares disponibles"""
         return self.repo.listar_disponibles()
     
+    def listar_libros_pagina(self, cursor: Optional[Tuple[str, str]] = None, limite: int = 20,
+                             solo_disponibles: bool = False) -> Tuple[List[Libro], Optional[Tuple[str, str]]]:
+        """Listar una página de libros y el cursor de la siguiente"""
+        return self.repo.listar_pagina(cursor, limite, solo_disponibles)
+    
+    def estadisticas_cache(self) -> dict:
+        """Aciertos, fallos y ocupación de la caché de libros"""
+        return self.repo.estadisticas_cache()
+    
     def eliminar_libro(self, isbn: str) -> bool:
         """Eliminar un libro"""
         libro = self.repo.buscar_por_isbn(isbn)
@@ -1,11 +1,16 @@
 """
 Servicio de lógica de negocio para Préstamos
 """
-from typing import Optional, List
+import time
+from collections import Counter
+from datetime import date
+from typing import Iterator, Optional, List, Tuple
 from model.prestamo import Prestamo
+from model.socio import Socio
 from repository.prestamo_repository import PrestamoRepository
 from repository.libro_repository import LibroRepository
 from repository.socio_repository import SocioRepository
+from dal.database_manager import DatabaseManager
 
 
 class PrestamoService:
@@ -15,55 +20,80 @@ class PrestamoService:
         self.repo_prestamo = PrestamoRepository()
         self.repo_libro = LibroRepository()
         self.repo_socio = SocioRepository()
+        self.db_manager = DatabaseManager.get_instance()
     
-    def realizar_prestamo(self, id_socio: int, isbn: str) -> Optional[Prestamo]:
-        """Realiza un préstamo de libro"""
-        # 1. Buscar socio
-        socio = self.repo_socio.buscar_por_id(id_socio)
-        if not socio:
+    @staticmethod
+    def _motivo_rechazo(socio: Socio, cantidad: int = 1) -> Optional[str]:
+        """Motivo por el que el socio no puede llevarse `cantidad` libros más (None si puede)"""
+        if not socio.activo:
+            return "El socio no está activo"
+        if socio.tiene_multas_pendientes():
+            return f"El socio tiene multas pendientes (${socio.saldo_multas:.2f})"
+        if socio.libros_prestados + cantidad > socio.MAX_LIBROS_PERMITIDOS:
+            if cantidad == 1:
+                return f"El socio ha alcanzado el límite de {socio.MAX_LIBROS_PERMITIDOS} libros"
+            return (f"El préstamo supera el límite de {socio.MAX_LIBROS_PERMITIDOS} libros "
+                    f"(tiene {socio.libros_prestados})")
+        return None
+    
+    def _informar_rechazo_socio(self, id_socio: int, cantidad: int = 1):
+        """Releer el socio cuyo contador no se pudo actualizar e informar la causa real"""
+        socio = self.repo_socio.buscar_por_id(id_socio, refrescar=True)
+        if socio is None:
             print("Error: Socio no encontrado")
-            return None
-        
-        # 2. Verificar si el socio puede realizar préstamo
-        if not socio.puede_realizar_prestamo():
-            if not socio.activo:
-                print("Error: El socio no está activo")
-            else:
-                print(f"Error: El socio ha alcanzado el límite de {socio.MAX_LIBROS_PERMITIDOS} libros")
-            return None
-        
-        # 3. Buscar libro
-        libro = self.repo_libro.buscar_por_isbn(isbn)
-        if not libro:
-            print("Error: Libro no encontrado")
-            return None
-        
-        # 4. Verificar disponibilidad
-        if not libro.esta_disponible():
-            print("Error: No hay ejemplares disponibles de este libro")
-            return None
-        
-        # 5. Crear préstamo
-        prestamo = Prestamo(
-            id_prestamo=0,  # Se asignará al insertar
-            socio=socio,
-            libro=libro
-        )
-        
-        id_prestamo = self.repo_prestamo.crear(prestamo)
-        if not id_prestamo:
-            print("Error: No se pudo registrar el préstamo")
-            return None
-        
-        prestamo.id_prestamo = id_prestamo
-        
-        # 6. Actualizar disponibilidad del libro
-        libro.ejemplares_disponibles -= 1
-        self.repo_libro.actualizar_disponibilidad(libro)
+        else:
+            print(f"Error: {self._motivo_rechazo(socio, cantidad) or 'No se pudo actualizar el socio'}")
+    
+    def realizar_prestamo(self, id_socio: int, isbn: str) -> Optional[Prestamo]:
+        """Realiza un préstamo de libro (una única transacción)"""
+        with self.db_manager.transaccion():
+            # 1. Buscar socio (releído: otro proceso pudo cambiarlo)
+            socio = self.repo_socio.buscar_por_id(id_socio, refrescar=True)
+            if not socio:
+                print("Error: Socio no encontrado")
+                return None
+            
+            # 2. Verificar si el socio puede realizar préstamo
+            if not socio.puede_realizar_prestamo():
+                print(f"Error: {self._motivo_rechazo(socio)}")
+                return None
+            
+            # 3. Buscar libro (releído, como el socio)
+            libro = self.repo_libro.buscar_por_isbn(isbn, refrescar=True)
+            if not libro:
+                print("Error: Libro no encontrado")
+                return None
+            
+            # 4. Descontar un ejemplar (solo si queda alguno disponible)
+            disponibles = self.repo_libro.descontar_ejemplar(isbn)
+            if disponibles is None:
+                print("Error: No hay ejemplares disponibles de este libro")
+                self.db_manager.rollback()
+                return None
+            
+            # 5. Sumar el libro al socio (respetando el límite)
+            prestados = self.repo_socio.sumar_libro_prestado(id_socio, socio.MAX_LIBROS_PERMITIDOS)
+            if prestados is None:
+                self._informar_rechazo_socio(id_socio)
+                self.db_manager.rollback()
+                return None
+            
+            # 6. Crear préstamo
+            prestamo = Prestamo(
+                id_prestamo=0,  # Se asignará al insertar
+                socio=socio,
+                libro=libro
+            )
+            
+            id_prestamo = self.repo_prestamo.crear(prestamo)
+            if not id_prestamo:
+                print("Error: No se pudo registrar el préstamo")
+                self.db_manager.rollback()
+                return None
+            
+            prestamo.id_prestamo = id_prestamo
         
-        # 7. Actualizar contador de libros del socio
-        socio.libros_prestados += 1
-        self.repo_socio.actualizar_libros_prestados(socio)
+        # Socio y libro ya reflejan los contadores confirmados (write-through de la caché)
         
         print(f"✓ Préstamo realizado exitosamente")
         print(f"  ID Préstamo: {prestamo.id_prestamo}")
@@ -71,48 +101,118 @@ class PrestamoService:
         
         return prestamo
     
-    def registrar_devolucion(self, id_prestamo: int) -> bool:
-        """Registra la devolución de un libro"""
-        # Buscar datos del préstamo
-        query = "SELECT id_socio, isbn FROM prestamos WHERE id_prestamo = ? AND estado = 'activo'"
-        cursor = self.repo_prestamo.db_manager.execute_query(query, (id_prestamo,))
-        row = cursor.fetchone()
-        
-        if not row:
-            print("Error: Préstamo no encontrado o ya fue devuelto")
-            return False
-        
-        # Buscar socio y libro
-        socio = self.repo_socio.buscar_por_id(row['id_socio'])
-        libro = self.repo_libro.buscar_por_isbn(row['isbn'])
-        
-        if not socio or not libro:
-            print("Error: Datos inconsistentes")
-            return False
+    def realizar_prestamos(self, id_socio: int, isbns: List[str]) -> Optional[List[Prestamo]]:
+        """
+        Presta varios libros a un mismo socio en una única transacción:
+        se realizan todos los préstamos o ninguno.
+        """
+        if not isbns:
+            print("Error: Debe indicar al menos un libro")
+            return None
+        cantidades = Counter(isbns)
         
-        # Buscar préstamo completo
-        prestamo = self.repo_prestamo.buscar_por_id(id_prestamo, socio, libro)
-        if not prestamo:
-            print("Error: No se pudo recuperar el préstamo")
-            return False
+        with self.db_manager.transaccion():
+            # 1. Buscar socio una sola vez (releído: otro proceso pudo cambiarlo)
+            socio = self.repo_socio.buscar_por_id(id_socio, refrescar=True)
+            if not socio:
+                print("Error: Socio no encontrado")
+                return None
+            
+            # 2. Verificar que el socio pueda llevarse todos los libros
+            motivo = self._motivo_rechazo(socio, len(isbns))
+            if motivo:
+                print(f"Error: {motivo}")
+                return None
+            
+            # 3. Buscar todos los libros con una sola consulta
+            libros = self.repo_libro.buscar_por_isbns(cantidades, refrescar=True)
+            faltantes = [isbn for isbn in cantidades if isbn not in libros]
+            if faltantes:
+                print(f"Error: Libro no encontrado: {', '.join(faltantes)}")
+                return None
+            sin_ejemplares = [isbn for isbn, cantidad in cantidades.items()
+                              if libros[isbn].ejemplares_disponibles < cantidad]
+            if sin_ejemplares:
+                print(f"Error: No hay ejemplares disponibles de: {', '.join(sin_ejemplares)}")
+                return None
+            
+            # 4. Descontar ejemplares y sumar libros al socio
+            if not self.repo_libro.descontar_ejemplares(isbns):
+                print("Error: No hay ejemplares disponibles de alguno de los libros")
+                self.db_manager.rollback()
+                return None
+            prestados = self.repo_socio.sumar_libros_prestados(
+                id_socio, len(isbns), socio.MAX_LIBROS_PERMITIDOS
+            )
+            if prestados is None:
+                self._informar_rechazo_socio(id_socio, len(isbns))
+                self.db_manager.rollback()
+                return None
+            
+            # 5. Crear los préstamos
+            prestamos = []
+            for isbn in isbns:
+                prestamo = Prestamo(id_prestamo=0, socio=socio, libro=libros[isbn])
+                id_prestamo = self.repo_prestamo.crear(prestamo)
+                if not id_prestamo:
+                    print("Error: No se pudieron registrar los préstamos")
+                    self.db_manager.rollback()
+                    return None
+                prestamo.id_prestamo = id_prestamo
+                prestamos.append(prestamo)
         
-        # Registrar devolución
-        prestamo.registrar_devolucion()
+        # Socio y libros ya reflejan los contadores confirmados (write-through de la caché)
         
-        # Actualizar en BD
-        if not self.repo_prestamo.actualizar_devolucion(prestamo):
-            return False
+        print(f"✓ {len(prestamos)} préstamos realizados exitosamente")
+        for prestamo in prestamos:
+            print(f"  ID Préstamo: {prestamo.id_prestamo} - {prestamo.libro.titulo}")
+        print(f"  Fecha devolución: {prestamos[0].fecha_devolucion_esperada}")
         
-        # Actualizar disponibilidad del libro
-        libro.ejemplares_disponibles += 1
-        self.repo_libro.actualizar_disponibilidad(libro)
+        return prestamos
+    
+    def registrar_devolucion(self, id_prestamo: int) -> bool:
+        """Registra la devolución de un libro (una única transacción)"""
+        with self.db_manager.transaccion():
+            # Buscar préstamo activo con su socio y libro
+            prestamo = self.repo_prestamo.buscar_activo(id_prestamo)
+            if not prestamo:
+                print("Error: Préstamo no encontrado o ya fue devuelto")
+                return False
+            
+            # Registrar devolución
+            prestamo.registrar_devolucion()
+            
+            # Actualizar en BD
+            if not self.repo_prestamo.actualizar_devolucion(prestamo):
+                print("Error: Préstamo no encontrado o ya fue devuelto")
+                self.db_manager.rollback()
+                return False
+            
+            # Reponer el ejemplar y descontar el libro del socio
+            disponibles = self.repo_libro.reponer_ejemplar(prestamo.libro.isbn)
+            prestados = self.repo_socio.restar_libro_prestado(prestamo.socio.id_socio)
+            if disponibles is None or prestados is None:
+                print("Error: Datos inconsistentes")
+                self.db_manager.rollback()
+                return False
+            
+            # Cargar la multa por retraso en el saldo del socio
+            multa = prestamo.calcular_multa()
+            saldo_multas = prestamo.socio.saldo_multas
+            if multa > 0:
+                saldo_multas = self.repo_socio.registrar_movimiento_multa(
+                    prestamo.socio.id_socio, 'cargo', multa, id_prestamo
+                )
+                if saldo_multas is None:
+                    print("Error: No se pudo registrar la multa")
+                    self.db_manager.rollback()
+                    return False
         
-        # Actualizar contador de libros del socio
-        socio.libros_prestados -= 1
-        self.repo_socio.actualizar_libros_prestados(socio)
+        prestamo.libro.ejemplares_disponibles = disponibles
+        prestamo.socio.libros_prestados = prestados
+        prestamo.socio.saldo_multas = saldo_multas
         
         # Mostrar información de multa si corresponde
-        multa = prestamo.calcular_multa()
         print(f"✓ Devolución registrada exitosamente")
         if multa > 0:
             print(f"  ⚠ Multa por retraso: ${multa:.2f}")
@@ -121,10 +221,126 @@ class PrestamoService:
         
         return True
     
+    def registrar_devoluciones(self, ids_prestamo: List[int]) -> List[dict]:
+        """
+        Registra la devolución de varios préstamos en una única transacción.
+        Devuelve un resultado por préstamo: {'id_prestamo', 'devuelto',
+        'multa', 'motivo'}; los que no estaban activos se informan sin
+        afectar a los demás.
+        """
+        ids = list(dict.fromkeys(ids_prestamo))
+        resultados = []
+        
+        with self.db_manager.transaccion():
+            # Resolver todos los préstamos con su socio y libro
+            prestamos = self.repo_prestamo.buscar_activos(ids)
+            devueltos = [prestamos[id_prestamo] for id_prestamo in ids if id_prestamo in prestamos]
+            for prestamo in devueltos:
+                prestamo.registrar_devolucion()
+            
+            if devueltos:
+                # Aplicar devoluciones, contadores y multas en bloque
+                libros = Counter(prestamo.libro.isbn for prestamo in devueltos)
+                socios = Counter(prestamo.socio.id_socio for prestamo in devueltos)
+                cargos = [
+                    (prestamo.socio.id_socio, prestamo.id_prestamo, prestamo.calcular_multa())
+                    for prestamo in devueltos if prestamo.calcular_multa() > 0
+                ]
+                if not (self.repo_prestamo.actualizar_devoluciones(devueltos)
+                        and self.repo_libro.reponer_ejemplares(libros)
+                        and self.repo_socio.restar_libros_prestados(socios)
+                        and (not cargos or self.repo_socio.registrar_cargos_multa(cargos))):
+                    print("Error: Datos inconsistentes, no se registró ninguna devolución")
+                    self.db_manager.rollback()
+                    return []
+        
+        for id_prestamo in ids:
+            prestamo = prestamos.get(id_prestamo)
+            if prestamo:
+                resultados.append({
+                    'id_prestamo': id_prestamo,
+                    'devuelto': True,
+                    'multa': prestamo.calcular_multa(),
+                    'motivo': None
+                })
+            else:
+                resultados.append({
+                    'id_prestamo': id_prestamo,
+                    'devuelto': False,
+                    'multa': 0.0,
+                    'motivo': "Préstamo no encontrado o ya fue devuelto"
+                })
+        
+        multa_total = sum(resultado['multa'] for resultado in resultados)
+        print(f"✓ {len(devueltos)} de {len(ids)} devoluciones registradas")
+        if multa_total > 0:
+            print(f"  ⚠ Multas por retraso: ${multa_total:.2f}")
+        
+        return resultados
+    
     def listar_prestamos_activos(self) -> List[dict]:
         """Listar todos los préstamos activos"""
         return self.repo_prestamo.listar_activos()
     
+    def listar_prestamos_activos_pagina(self, cursor: Optional[Tuple[str, int]] = None,
+                                        limite: int = 20) -> Tuple[List[dict], Optional[Tuple[str, int]]]:
+        """Listar una página de préstamos activos y el cursor de la siguiente"""
+        return self.repo_prestamo.listar_activos_pagina(cursor, limite)
+    
+    def procesar_vencimientos(self, fecha_corte: Optional[date] = None) -> dict:
+        """
+        Proceso por lotes: calcula en SQL las multas acumuladas de todos los
+        préstamos activos vencidos y las guarda en prestamos.multa.
+        Devuelve cantidades, multa total y rendimiento del proceso.
+        """
+        fecha_corte = fecha_corte or date.today()
+        inicio = time.perf_counter()
+        
+        with self.db_manager.transaccion():
+            actualizados = self.repo_prestamo.actualizar_multas_vencidas(
+                fecha_corte, Prestamo.MULTA_POR_DIA
+            )
+            if actualizados is None:
+                self.db_manager.rollback()
+                return {}
+            totales = self.repo_prestamo.totales_vencidos(fecha_corte)
+        
+        segundos = time.perf_counter() - inicio
+        return {
+            'fecha_corte': fecha_corte,
+            'vencidos': totales['vencidos'],
+            'multa_total': totales['multa_total'],
+            'segundos': segundos,
+            'prestamos_por_segundo': actualizados / segundos if segundos > 0 else 0.0
+        }
+    
+    def reconciliar_contadores(self, corregir: bool = True) -> dict:
+        """
+        Recalcula los contadores desnormalizados (ejemplares disponibles,
+        libros prestados y saldo de multas) desde préstamos y el libro de
+        multas, en una única transacción. Informa las diferencias
+        encontradas y, si `corregir`, las repara.
+        """
+        inicio = time.perf_counter()
+        
+        with self.db_manager.transaccion():
+            libros = self.repo_libro.reconciliar_disponibles(corregir)
+            socios = self.repo_socio.reconciliar_contadores(corregir)
+            if libros is None or socios is None:
+                self.db_manager.rollback()
+                return {}
+        
+        return {
+            'libros': libros,
+            'socios': socios,
+            'corregido': corregir,
+            'segundos': time.perf_counter() - inicio
+        }
+    
+    def avisos_vencimiento(self, fecha_corte: Optional[date] = None) -> Iterator[dict]:
+        """Recorrer los préstamos vencidos para generar avisos a los socios"""
+        return self.repo_prestamo.iterar_vencidos(fecha_corte or date.today())
+    
     def verificar_disponibilidad(self, isbn: str) -> bool:
         """Verifica si un libro está disponible"""
         libro = self.repo_libro.buscar_por_isbn(isbn)
@@ -0,0 +1,42 @@
+"""
+Servicio de reportes y estadísticas
+"""
+from datetime import date, timedelta
+from typing import List, Optional
+from repository.reporte_repository import ReporteRepository
+
+
+class ReporteService:
+    """Servicio que arma los reportes del sistema"""
+    
+    PERIODOS = {
+        'historico': "Histórico",
+        'ultimos_30_dias': "Últimos 30 días",
+        'anio_en_curso': "Año en curso",
+    }
+    
+    def __init__(self):
+        self.repo = ReporteRepository()
+    
+    def resumen_general(self) -> dict:
+        """Contadores de libros, socios y préstamos (calculados en SQL)"""
+        return self.repo.obtener_resumen()
+    
+    def libros_mas_prestados(self, limite: int = 10, periodo: str = 'historico') -> List[dict]:
+        """Top de libros más prestados en el período indicado"""
+        return self.repo.libros_mas_prestados(limite, self._fecha_desde(periodo))
+    
+    def socios_con_mas_prestamos(self, limite: int = 10, periodo: str = 'historico') -> List[dict]:
+        """Top de socios con más préstamos en el período indicado"""
+        return self.repo.socios_con_mas_prestamos(limite, self._fecha_desde(periodo))
+    
+    def _fecha_desde(self, periodo: str) -> Optional[date]:
+        """Fecha de inicio de la ventana de un período (None = histórico)"""
+        hoy = date.today()
+        if periodo == 'ultimos_30_dias':
+            return hoy - timedelta(days=30)
+        if periodo == 'anio_en_curso':
+            return date(hoy.year, 1, 1)
+        if periodo != 'historico':
+            raise ValueError(f"Período desconocido: {periodo}")
+        return None
@@ -1,22 +1,28 @@
 """
 Servicio de lógica de negocio para Socios
 """
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
 from model.socio import Socio
 from repository.socio_repository import SocioRepository
+from dal.database_manager import DatabaseManager
+from service.importacion import en_lotes, leer_archivo, motivo_fila_invalida
 import re
 
+PATRON_EMAIL = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+
 
 class SocioService:
     """Servicio que gestiona la lógica de negocio de socios"""
     
+    TAMANO_LOTE_REGISTRO = 1000
+    
     def __init__(self):
         self.repo = SocioRepository()
+        self.db_manager = DatabaseManager.get_instance()
     
     def _validar_email(self, email: str) -> bool:
         """Validar formato de email"""
-        patron = r'^[\w\.-]+@[\w\.-]+\.\w+$'
-        return re.match(patron, email) is not None
+        return PATRON_EMAIL.match(email) is not None
     
     def registrar_socio(self, nombre: str, email: str, telefono: str = "") -> Optional[int]:
         """Registrar un nuevo socio"""
@@ -45,10 +51,86 @@ class SocioService:
         
         return id_socio
     
+    def registrar_socios(self, filas: Iterable[dict],
+                         tamano_lote: int = TAMANO_LOTE_REGISTRO) -> dict:
+        """
+        Registrar socios en lote (filas de CSV/JSONL).
+        Cada lote se guarda en su propia transacción; devuelve un resumen
+        con la cantidad de filas aceptadas y el detalle de las rechazadas.
+        """
+        resumen = {'procesadas': 0, 'aceptadas': 0, 'rechazadas': []}
+        rechazadas = resumen['rechazadas']
+        emails_vistos = set()
+        numero_fila = 0
+        validar = PATRON_EMAIL.match
+        
+        for lote in en_lotes(filas, tamano_lote):
+            # Validar el lote y descartar emails repetidos en la entrada
+            validos = []
+            for fila in lote:
+                numero_fila += 1
+                error = motivo_fila_invalida(fila)
+                if error:
+                    rechazadas.append({'fila': numero_fila, 'email': None, 'motivo': error})
+                    continue
+                nombre = str(fila.get('nombre') or "").strip()
+                email = str(fila.get('email') or "").strip()
+                if not nombre or not email:
+                    rechazadas.append({'fila': numero_fila, 'email': email, 'motivo': "Nombre y email son obligatorios"})
+                elif validar(email) is None:
+                    rechazadas.append({'fila': numero_fila, 'email': email, 'motivo': "Email inválido"})
+                elif email in emails_vistos:
+                    rechazadas.append({'fila': numero_fila, 'email': email, 'motivo': "Email repetido en el archivo"})
+                else:
+                    emails_vistos.add(email)
+                    socio = Socio(
+                        id_socio=0,
+                        nombre=nombre,
+                        email=email,
+                        telefono=str(fila.get('telefono') or "").strip(),
+                        activo=True,
+                        libros_prestados=0
+                    )
+                    validos.append((numero_fila, socio))
+            
+            with self.db_manager.transaccion():
+                # Descartar los emails que ya están registrados
+                existentes = self.repo.emails_existentes(socio.email for _, socio in validos)
+                nuevos = []
+                for numero, socio in validos:
+                    if socio.email in existentes:
+                        rechazadas.append({'fila': numero, 'email': socio.email, 'motivo': "Email ya registrado"})
+                    else:
+                        nuevos.append((numero, socio))
+                
+                insertados = self.repo.crear_lote([socio for _, socio in nuevos])
+                if insertados is None:
+                    self.db_manager.rollback()
+                    for numero, socio in nuevos:
+                        rechazadas.append({'fila': numero, 'email': socio.email, 'motivo': "Error al guardar el lote"})
+                else:
+                    resumen['aceptadas'] += insertados
+        
+        resumen['procesadas'] = numero_fila
+        print(f"Registro masivo finalizado: {resumen['aceptadas']} socios registrados, "
+              f"{len(rechazadas)} rechazados")
+        return resumen
+    
+    def registrar_socios_desde_archivo(self, ruta: str) -> dict:
+        """Registrar socios desde un archivo CSV o JSONL"""
+        return self.registrar_socios(leer_archivo(ruta))
+    
     def buscar_socio(self, id_socio: int) -> Optional[Socio]:
         """Buscar socio por ID"""
         return self.repo.buscar_por_id(id_socio)
     
+    def buscar_socios(self, texto: str, limite: int = 10) -> List[Tuple[Socio, float]]:
+        """Buscar socios por nombre o email, tolerando errores de tipeo"""
+        if not texto or not texto.strip():
+            print("Error: Debe ingresar un nombre o email a buscar")
+            return []
+        return self.repo.buscar_similares(texto, limite)
+    
     def listar_todos_los_socios(self) -> List[Socio]:
         """Listar todos los socios"""
         return self.repo.listar_todos()
@@ -57,6 +139,33 @@ class SocioService:
         """Listar socios activos"""
         return self.repo.listar_activos()
     
+    def listar_socios_pagina(self, cursor: Optional[Tuple[str, int]] = None, limite: int = 20,
+                             solo_activos: bool = False) -> Tuple[List[Socio], Optional[Tuple[str, int]]]:
+        """Listar una página de socios y el cursor de la siguiente"""
+        return self.repo.listar_pagina(cursor, limite, solo_activos)
+    
+    def pagar_multa(self, id_socio: int, monto: float) -> bool:
+        """Registrar un pago de multas del socio"""
+        socio = self.repo.buscar_por_id(id_socio)
+        if not socio:
+            print(f"Error: No existe socio con ID {id_socio}")
+            return False
+        
+        if monto <= 0:
+            print("Error: El monto debe ser mayor a cero")
+            return False
+        
+        if monto > socio.saldo_multas:
+            print(f"Error: El monto supera el saldo pendiente (${socio.saldo_multas:.2f})")
+            return False
+        
+        saldo = self.repo.registrar_movimiento_multa(id_socio, 'pago', -monto)
+        if saldo is None:
+            return False
+        
+        print(f"Pago registrado. Saldo pendiente: ${saldo:.2f}")
+        return True
+    
     def desactivar_socio(self, id_socio: int) -> bool:
         """Desactivar un socio"""
         socio = self.repo.buscar_por_id(id_socio)
@@ -6,15 +6,19 @@ from datetime import date
 from controller.libro_controller import LibroController
 from controller.socio_controller import SocioController
 from controller.prestamo_controller import PrestamoController
+from controller.reporte_controller import ReporteController
 
 
 class Menu:
     """Clase que gestiona el menú de usuario"""
     
+    TAMANO_PAGINA = 20
+    
     def __init__(self):
         self.libro_controller = LibroController()
         self.socio_controller = SocioController()
         self.prestamo_controller = PrestamoController()
+        self.reporte_controller = ReporteController()
     
     def limpiar_pantalla(self):
         """Limpiar la pantalla"""
@@ -30,6 +34,34 @@ class Menu:
         print(f"  {titulo}")
         print("="*60)
     
+    def mostrar_paginado(self, obtener_pagina, encabezado: str, mostrar_fila, mensaje_vacio: str):
+        """
+        Mostrar un listado página por página. `obtener_pagina(cursor)` devuelve
+        (elementos, cursor_siguiente); solo se carga en memoria la página actual.
+        """
+        cursor = None
+        pagina = 1
+        while True:
+            elementos, cursor = obtener_pagina(cursor)
+            if pagina == 1 and not elementos:
+                print(f"\n{mensaje_vacio}")
+                break
+            
+            print(f"\nPágina {pagina}\n")
+            print(encabezado)
+            print("-"*90)
+            for elemento in elementos:
+                mostrar_fila(elemento)
+            
+            if cursor is None:
+                break
+            opcion = input("\n[Enter] Página siguiente  [0] Volver: ").strip()
+            if opcion == "0":
+                return
+            pagina += 1
+        
+        self.pausar()
+    
     # ==================== MENÚ PRINCIPAL ====================
     
     def mostrar_menu_principal(self):
@@ -60,6 +92,8 @@ class Menu:
             print("3. Listar libros disponibles")
             print("4. Buscar libro por ISBN")
             print("5. Eliminar libro")
+            print("6. Importar libros desde archivo (CSV/JSONL)")
+            print("7. Buscar libros por título, autor o categoría")
             print("0. Volver al menú principal")
             
             opcion = input("\nSeleccione una opción: ").strip()
@@ -74,6 +108,10 @@ class Menu:
                 self.buscar_libro()
             elif opcion == "5":
                 self.eliminar_libro()
+            elif opcion == "6":
+                self.importar_libros()
+            elif opcion == "7":
+                self.buscar_libros()
             elif opcion == "0":
                 break
             else:
@@ -126,37 +164,32 @@ class Menu:
         """Listar todos los libros"""
         self.mostrar_titulo("LISTADO DE TODOS LOS LIBROS")
         
-        libros = self.libro_controller.listar_todos()
-        
-        if not libros:
-            print("\nNo hay libros registrados")
-        else:
-            print(f"\nTotal de libros: {len(libros)}\n")
-            print(f"{'ISBN':<20} {'Título':<30} {'Autor':<25} {'Disp/Total':<10}")
-            print("-"*90)
-            for libro in libros:
-                print(f"{libro.isbn:<20} {libro.titulo[:29]:<30} {libro.autor[:24]:<25} "
-                      f"{libro.ejemplares_disponibles}/{libro.total_ejemplares:<10}")
+        def mostrar_libro(libro):
+            print(f"{libro.isbn:<20} {libro.titulo[:29]:<30} {libro.autor[:24]:<25} "
+                  f"{libro.ejemplares_disponibles}/{libro.total_ejemplares:<10}")
         
-        self.pausar()
+        self.mostrar_paginado(
+            lambda cursor: self.libro_controller.listar_pagina(cursor, self.TAMANO_PAGINA),
+            f"{'ISBN':<20} {'Título':<30} {'Autor':<25} {'Disp/Total':<10}",
+            mostrar_libro,
+            "No hay libros registrados"
+        )
     
     def listar_libros_disponibles(self):
         """Listar libros disponibles"""
         self.mostrar_titulo("LIBROS DISPONIBLES")
         
-        libros = self.libro_controller.listar_disponibles()
-        
-        if not libros:
-            print("\nNo hay libros disponibles en este momento")
-        else:
-            print(f"\nLibros disponibles: {len(libros)}\n")
-            print(f"{'ISBN':<20} {'Título':<30} {'Autor':<25} {'Disponibles':<12}")
-            print("-"*90)
-            for libro in libros:
-                print(f"{libro.isbn:<20} {libro.titulo[:29]:<30} {libro.autor[:24]:<25} "
-                      f"{libro.ejemplares_disponibles:<12}")
-        
-        self.pausar()
+        def mostrar_libro(libro):
+            print(f"{libro.isbn:<20} {libro.titulo[:29]:<30} {libro.autor[:24]:<25} "
+                  f"{libro.ejemplares_disponibles:<12}")
+        
+        self.mostrar_paginado(
+            lambda cursor: self.libro_controller.listar_pagina(
+                cursor, self.TAMANO_PAGINA, solo_disponibles=True),
+            f"{'ISBN':<20} {'Título':<30} {'Autor':<25} {'Disponibles':<12}",
+            mostrar_libro,
+            "No hay libros disponibles en este momento"
+        )
     
     def buscar_libro(self):
         """Buscar libro por ISBN"""
@@ -179,6 +212,24 @@ class Menu:
         
         self.pausar()
     
+    def buscar_libros(self):
+        """Buscar libros por título, autor o categoría"""
+        self.mostrar_titulo("BUSCAR LIBROS")
+        
+        texto = input("\nTexto a buscar: ").strip()
+        libros = self.libro_controller.buscar_libros(texto, self.TAMANO_PAGINA)
+        
+        if libros:
+            print(f"\n{'ISBN':<20} {'Título':<30} {'Autor':<25} {'Disp/Total':<10}")
+            print("-"*90)
+            for libro in libros:
+                print(f"{libro.isbn:<20} {libro.titulo[:29]:<30} {libro.autor[:24]:<25} "
+                      f"{libro.ejemplares_disponibles}/{libro.total_ejemplares:<10}")
+        elif texto:
+            print(f"\n✗ No se encontraron libros para: {texto}")
+        
+        self.pausar()
+    
     def eliminar_libro(self):
         """Eliminar un libro"""
         self.mostrar_titulo("ELIMINAR LIBRO")
@@ -205,6 +256,30 @@ class Menu:
         
         self.pausar()
     
+    def importar_libros(self):
+        """Importar libros desde un archivo CSV o JSONL"""
+        self.mostrar_titulo("IMPORTAR LIBROS")
+        
+        print("\nColumnas: isbn, titulo, autor, categoria, total_ejemplares")
+        ruta = input("Ruta del archivo: ").strip()
+        if not os.path.isfile(ruta):
+            print(f"Error: No existe el archivo {ruta}")
+            self.pausar()
+            return
+        
+        resumen = self.libro_controller.importar_libros(ruta)
+        
+        print(f"\nFilas procesadas:  {resumen['procesadas']}")
+        print(f"Libros importados: {resumen['importadas']}")
+        print(f"Filas rechazadas:  {len(resumen['rechazadas'])}")
+        for rechazo in resumen['rechazadas'][:20]:
+            clave = f" ({rechazo['isbn']})" if rechazo['isbn'] else ""
+            print(f"  Fila {rechazo['fila']}{clave}: {rechazo['motivo']}")
+        if len(resumen['rechazadas']) > 20:
+            print(f"  ... y {len(resumen['rechazadas']) - 20} más")
+        
+        self.pausar()
+    
     # ==================== GESTIÓN DE SOCIOS ====================
     
     def menu_socios(self):
@@ -218,6 +293,9 @@ class Menu:
             print("4. Buscar socio por ID")
             print("5. Desactivar socio")
             print("6. Activar socio")
+            print("7. Importar socios desde archivo (CSV/JSONL)")
+            print("8. Registrar pago de multa")
+            print("9. Buscar socio por nombre o email")
             print("0. Volver al menú principal")
             
             opcion = input("\nSeleccione una opción: ").strip()
@@ -234,6 +312,12 @@ class Menu:
                 self.desactivar_socio()
             elif opcion == "6":
                 self.activar_socio()
+            elif opcion == "7":
+                self.importar_socios()
+            elif opcion == "8":
+                self.pagar_multa()
+            elif opcion == "9":
+                self.buscar_socios()
             elif opcion == "0":
                 break
             else:
@@ -271,38 +355,33 @@ class Menu:
         """Listar todos los socios"""
         self.mostrar_titulo("LISTADO DE TODOS LOS SOCIOS")
         
-        socios = self.socio_controller.listar_todos()
-        
-        if not socios:
-            print("\nNo hay socios registrados")
-        else:
-            print(f"\nTotal de socios: {len(socios)}\n")
-            print(f"{'ID':<5} {'Nombre':<30} {'Email':<30} {'Estado':<10} {'Préstamos':<10}")
-            print("-"*90)
-            for socio in socios:
-                estado = "Activo" if socio.activo else "Inactivo"
-                print(f"{socio.id_socio:<5} {socio.nombre[:29]:<30} {socio.email[:29]:<30} "
-                      f"{estado:<10} {socio.libros_prestados:<10}")
-        
-        self.pausar()
+        def mostrar_socio(socio):
+            estado = "Activo" if socio.activo else "Inactivo"
+            print(f"{socio.id_socio:<5} {socio.nombre[:29]:<30} {socio.email[:29]:<30} "
+                  f"{estado:<10} {socio.libros_prestados:<10}")
+        
+        self.mostrar_paginado(
+            lambda cursor: self.socio_controller.listar_pagina(cursor, self.TAMANO_PAGINA),
+            f"{'ID':<5} {'Nombre':<30} {'Email':<30} {'Estado':<10} {'Préstamos':<10}",
+            mostrar_socio,
+            "No hay socios registrados"
+        )
     
     def listar_socios_activos(self):
         """Listar socios activos"""
         self.mostrar_titulo("SOCIOS ACTIVOS")
         
-        socios = self.socio_controller.listar_activos()
-        
-        if not socios:
-            print("\nNo hay socios activos")
-        else:
-            print(f"\nSocios activos: {len(socios)}\n")
-            print(f"{'ID':<5} {'Nombre':<30} {'Email':<30} {'Préstamos':<10}")
-            print("-"*80)
-            for socio in socios:
-                print(f"{socio.id_socio:<5} {socio.nombre[:29]:<30} {socio.email[:29]:<30} "
-                      f"{socio.libros_prestados:<10}")
-        
-        self.pausar()
+        def mostrar_socio(socio):
+            print(f"{socio.id_socio:<5} {socio.nombre[:29]:<30} {socio.email[:29]:<30} "
+                  f"{socio.libros_prestados:<10}")
+        
+        self.mostrar_paginado(
+            lambda cursor: self.socio_controller.listar_pagina(
+                cursor, self.TAMANO_PAGINA, solo_activos=True),
+            f"{'ID':<5} {'Nombre':<30} {'Email':<30} {'Préstamos':<10}",
+            mostrar_socio,
+            "No hay socios activos"
+        )
     
     def buscar_socio(self):
         """Buscar socio por ID"""
@@ -325,12 +404,31 @@ class Menu:
             print(f"  Teléfono:          {socio.telefono or 'N/A'}")
             print(f"  Estado:            {'Activo' if socio.activo else 'Inactivo'}")
             print(f"  Libros prestados:  {socio.libros_prestados}")
+            print(f"  Multas pendientes: ${socio.saldo_multas:.2f}")
             print(f"  Puede prestar:     {'✓ Sí' if socio.puede_realizar_prestamo() else '✗ No'}")
         else:
             print(f"\n✗ No se encontró socio con ID: {id_socio}")
         
         self.pausar()
     
+    def buscar_socios(self):
+        """Buscar socios por nombre o email (tolera errores de tipeo)"""
+        self.mostrar_titulo("BUSCAR SOCIO POR NOMBRE")
+        
+        texto = input("\nNombre o email: ").strip()
+        resultados = self.socio_controller.buscar_socios(texto)
+        
+        if resultados:
+            print(f"\n{'ID':<5} {'Nombre':<30} {'Email':<30} {'Coincidencia':<12}")
+            print("-"*90)
+            for socio, similitud in resultados:
+                print(f"{socio.id_socio:<5} {socio.nombre[:29]:<30} {socio.email[:29]:<30} "
+                      f"{similitud:>11.0%}")
+        elif texto:
+            print(f"\n✗ No se encontraron socios para: {texto}")
+        
+        self.pausar()
+    
     def desactivar_socio(self):
         """Desactivar un socio"""
         self.mostrar_titulo("DESACTIVAR SOCIO")
@@ -367,6 +465,68 @@ class Menu:
         
         self.pausar()
     
+    def pagar_multa(self):
+        """Registrar un pago de multas"""
+        self.mostrar_titulo("REGISTRAR PAGO DE MULTA")
+        
+        try:
+            id_socio = int(input("\nID del socio: ").strip())
+        except ValueError:
+            print("Error: ID inválido")
+            self.pausar()
+            return
+        
+        socio = self.socio_controller.buscar_socio(id_socio)
+        if not socio:
+            print(f"\n✗ No se encontró socio con ID: {id_socio}")
+            self.pausar()
+            return
+        
+        print(f"\nSocio: {socio.nombre}")
+        print(f"Saldo pendiente: ${socio.saldo_multas:.2f}")
+        if socio.saldo_multas <= 0:
+            print("\nEl socio no tiene multas pendientes")
+            self.pausar()
+            return
+        
+        try:
+            monto = float(input("Monto a pagar: ").strip())
+        except ValueError:
+            print("Error: Monto inválido")
+            self.pausar()
+            return
+        
+        if self.socio_controller.pagar_multa(id_socio, monto):
+            print("\n✓ Pago registrado exitosamente")
+        else:
+            print("\n✗ No se pudo registrar el pago")
+        
+        self.pausar()
+    
+    def importar_socios(self):
+        """Registrar socios en lote desde un archivo CSV o JSONL"""
+        self.mostrar_titulo("IMPORTAR SOCIOS")
+        
+        print("\nColumnas: nombre, email, telefono")
+        ruta = input("Ruta del archivo: ").strip()
+        if not os.path.isfile(ruta):
+            print(f"Error: No existe el archivo {ruta}")
+            self.pausar()
+            return
+        
+        resumen = self.socio_controller.registrar_socios(ruta)
+        
+        print(f"\nFilas procesadas:   {resumen['procesadas']}")
+        print(f"Socios registrados: {resumen['aceptadas']}")
+        print(f"Filas rechazadas:   {len(resumen['rechazadas'])}")
+        for rechazo in resumen['rechazadas'][:20]:
+            clave = f" ({rechazo['email']})" if rechazo['email'] else ""
+            print(f"  Fila {rechazo['fila']}{clave}: {rechazo['motivo']}")
+        if len(resumen['rechazadas']) > 20:
+            print(f"  ... y {len(resumen['rechazadas']) - 20} más")
+        
+        self.pausar()
+    
     # ==================== GESTIÓN DE PRÉSTAMOS ====================
     
     def menu_prestamos(self):
@@ -377,6 +537,8 @@ class Menu:
             print("\n1. Realizar préstamo")
             print("2. Registrar devolución")
             print("3. Listar préstamos activos")
+            print("4. Realizar préstamo de varios libros")
+            print("5. Registrar devolución de varios libros")
             print("0. Volver al menú principal")
             
             opcion = input("\nSeleccione una opción: ").strip()
@@ -387,6 +549,10 @@ class Menu:
                 self.registrar_devolucion()
             elif opcion == "3":
                 self.listar_prestamos_activos()
+            elif opcion == "4":
+                self.realizar_prestamos()
+            elif opcion == "5":
+                self.registrar_devoluciones()
             elif opcion == "0":
                 break
             else:
@@ -413,6 +579,27 @@ class Menu:
         
         self.pausar()
     
+    def realizar_prestamos(self):
+        """Realizar varios préstamos a un mismo socio"""
+        self.mostrar_titulo("PRÉSTAMO DE VARIOS LIBROS")
+        
+        try:
+            id_socio = int(input("\nID del socio: ").strip())
+        except ValueError:
+            print("Error: ID inválido")
+            self.pausar()
+            return
+        
+        isbns = [isbn.strip() for isbn in input("ISBN de los libros (separados por coma): ").split(",")
+                 if isbn.strip()]
+        
+        prestamos = self.prestamo_controller.realizar_prestamos(id_socio, isbns)
+        
+        if not prestamos:
+            print("\n✗ No se pudo realizar el préstamo (no se registró ningún libro)")
+        
+        self.pausar()
+    
     def registrar_devolucion(self):
         """Registrar devolución"""
         self.mostrar_titulo("REGISTRAR DEVOLUCIÓN")
@@ -429,28 +616,49 @@ class Menu:
         
         self.pausar()
     
-    def listar_prestamos_activos(self):
-        """Listar préstamos activos"""
-        self.mostrar_titulo("PRÉSTAMOS ACTIVOS")
+    def registrar_devoluciones(self):
+        """Registrar la devolución de varios libros (buzón de devoluciones)"""
+        self.mostrar_titulo("DEVOLUCIÓN DE VARIOS LIBROS")
+        
+        try:
+            ids = [int(valor) for valor in input("\nIDs de préstamo (separados por coma): ").split(",")
+                   if valor.strip()]
+        except ValueError:
+            print("Error: ID inválido")
+            self.pausar()
+            return
         
-        prestamos = self.prestamo_controller.listar_prestamos_activos()
+        resultados = self.prestamo_controller.registrar_devoluciones(ids)
         
-        if not prestamos:
-            print("\nNo hay préstamos activos")
-        else:
-            print(f"\nPréstamos activos: {len(prestamos)}\n")
-            print(f"{'ID':<5} {'Socio':<25} {'Libro':<30} {'Vence':<12} {'Estado':<10}")
-            print("-"*90)
-            
-            hoy = date.today()
-            for p in prestamos:
-                vencido = "⚠ VENCIDO" if p['fecha_devolucion_esperada'] < hoy else "Activo"
-                print(f"{p['id_prestamo']:<5} {p['socio_nombre'][:24]:<25} "
-                      f"{p['libro_titulo'][:29]:<30} {p['fecha_devolucion_esperada']:<12} "
-                      f"{vencido:<10}")
+        for resultado in resultados:
+            if resultado['devuelto']:
+                detalle = f"multa ${resultado['multa']:.2f}" if resultado['multa'] > 0 else "sin multa"
+                print(f"  ✓ {resultado['id_prestamo']}: {detalle}")
+            else:
+                print(f"  ✗ {resultado['id_prestamo']}: {resultado['motivo']}")
         
         self.pausar()
     
+    def listar_prestamos_activos(self):
+        """Listar préstamos activos"""
+        self.mostrar_titulo("PRÉSTAMOS ACTIVOS")
+        
+        hoy = date.today()
+        
+        def mostrar_prestamo(p):
+            vencido = "⚠ VENCIDO" if p['fecha_devolucion_esperada'] < hoy else "Activo"
+            print(f"{p['id_prestamo']:<5} {p['socio_nombre'][:24]:<25} "
+                  f"{p['libro_titulo'][:29]:<30} {p['fecha_devolucion_esperada']:<12} "
+                  f"{vencido:<10}")
+        
+        self.mostrar_paginado(
+            lambda cursor: self.prestamo_controller.listar_prestamos_activos_pagina(
+                cursor, self.TAMANO_PAGINA),
+            f"{'ID':<5} {'Socio':<25} {'Libro':<30} {'Vence':<12} {'Estado':<10}",
+            mostrar_prestamo,
+            "No hay préstamos activos"
+        )
+    
     # ==================== REPORTES ====================
     
     def menu_reportes(self):
@@ -468,11 +676,9 @@ class Menu:
             if opcion == "1":
                 self.mostrar_resumen_general()
             elif opcion == "2":
-                print("\nFuncionalidad en desarrollo...")
-                self.pausar()
+                self.mostrar_libros_mas_prestados()
             elif opcion == "3":
-                print("\nFuncionalidad en desarrollo...")
-                self.pausar()
+                self.mostrar_socios_con_mas_prestamos()
             elif opcion == "0":
                 break
             else:
@@ -483,22 +689,74 @@ class Menu:
         """Mostrar resumen general del sistema"""
         self.mostrar_titulo("RESUMEN GENERAL")
         
-        total_libros = len(self.libro_controller.listar_todos())
-        libros_disponibles = len(self.libro_controller.listar_disponibles())
-        total_socios = len(self.socio_controller.listar_todos())
-        socios_activos = len(self.socio_controller.listar_activos())
-        prestamos_activos = len(self.prestamo_controller.listar_prestamos_activos())
+        resumen = self.reporte_controller.resumen_general()
         
         print(f"\n📚 LIBROS")
-        print(f"   Total de títulos:      {total_libros}")
-        print(f"   Títulos disponibles:   {libros_disponibles}")
+        print(f"   Total de títulos:      {resumen['total_libros']}")
+        print(f"   Títulos disponibles:   {resumen['libros_disponibles']}")
+        print(f"   Ejemplares (disp/tot): {resumen['ejemplares_disponibles']}/{resumen['total_ejemplares']}")
         
         print(f"\n👥 SOCIOS")
-        print(f"   Total de socios:       {total_socios}")
-        print(f"   Socios activos:        {socios_activos}")
+        print(f"   Total de socios:       {resumen['total_socios']}")
+        print(f"   Socios activos:        {resumen['socios_activos']}")
         
         print(f"\n📖 PRÉSTAMOS")
-        print(f"   Préstamos activos:     {prestamos_activos}")
+        print(f"   Préstamos activos:     {resumen['prestamos_activos']}")
+        print(f"   Préstamos vencidos:    {resumen['prestamos_vencidos']}")
+        
+        self.pausar()
+    
+    def elegir_periodo(self):
+        """Pedir el período de un reporte; devuelve None si la opción es inválida"""
+        print("\n1. Histórico")
+        print("2. Últimos 30 días")
+        print("3. Año en curso")
+        opcion = input("\nSeleccione el período (default 1): ").strip() or "1"
+        return {"1": 'historico', "2": 'ultimos_30_dias', "3": 'anio_en_curso'}.get(opcion)
+    
+    def mostrar_libros_mas_prestados(self):
+        """Mostrar el top de libros más prestados"""
+        self.mostrar_titulo("LIBROS MÁS PRESTADOS")
+        
+        periodo = self.elegir_periodo()
+        if not periodo:
+            print("Opción inválida")
+            self.pausar()
+            return
+        
+        libros = self.reporte_controller.libros_mas_prestados(10, periodo)
+        
+        if not libros:
+            print("\nNo hay préstamos registrados en el período")
+        else:
+            print(f"\n{'#':<4} {'ISBN':<20} {'Título':<30} {'Autor':<25} {'Préstamos':<10}")
+            print("-"*90)
+            for posicion, libro in enumerate(libros, 1):
+                print(f"{posicion:<4} {libro['isbn']:<20} {libro['titulo'][:29]:<30} "
+                      f"{libro['autor'][:24]:<25} {libro['total_prestamos']:<10}")
+        
+        self.pausar()
+    
+    def mostrar_socios_con_mas_prestamos(self):
+        """Mostrar el top de socios con más préstamos"""
+        self.mostrar_titulo("SOCIOS CON MÁS PRÉSTAMOS")
+        
+        periodo = self.elegir_periodo()
+        if not periodo:
+            print("Opción inválida")
+            self.pausar()
+            return
+        
+        socios = self.reporte_controller.socios_con_mas_prestamos(10, periodo)
+        
+        if not socios:
+            print("\nNo hay préstamos registrados en el período")
+        else:
+            print(f"\n{'#':<4} {'ID':<5} {'Nombre':<30} {'Email':<30} {'Préstamos':<10}")
+            print("-"*90)
+            for posicion, socio in enumerate(socios, 1):
+                print(f"{posicion:<4} {socio['id_socio']:<5} {socio['nombre'][:29]:<30} "
+                      f"{socio['email'][:29]:<30} {socio['total_prestamos']:<10}")
         
         self.pausar()
     